@@ -1,8 +1,11 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from flask_cors import CORS
-import threading
-import time
-from trading_bot import TradingBot
+from engine import Engine
+from engine_client import EngineClient, EngineError
+from binance_api import BinanceAPI
+from candle_store import CandleStore
+from candles import Candles
+from events import EventBroadcaster
 import os
 from dotenv import load_dotenv
 import logging
@@ -16,15 +19,42 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-bot = None
-bot_thread = None
-running_cycles = {}
+candle_store = CandleStore()
 
+# ENGINE_MODE=remote: the bot runs in its own process (python engine.py) and this app only
+# serves it, so it can run under any number of WSGI workers. Otherwise it runs in-process
+REMOTE_ENGINE = os.getenv('ENGINE_MODE', 'local') == 'remote'
+engine = EngineClient() if REMOTE_ENGINE else Engine(candle_store)
 
-def run_bot_cycle(bot_instance, symbol, interval):
-    while bot_instance.is_running and running_cycles.get(f"{symbol}_{interval}", False):
-        bot_instance.run_cycle(symbol, interval)
-        time.sleep(60)
+START_PARAMS = ('strategy', 'test_mode', 'symbols', 'symbol', 'interval', 'feed', 'intrabar', 'strategy_params',
+                'max_workers')
+
+
+def get_api():
+    return engine.api or BinanceAPI.shared()
+
+
+def live_snapshot():
+    if REMOTE_ENGINE:
+        # Trades reach this process through the snapshot rather than as bot events
+        for event, data in engine.new_events():
+            live_updates.publish(event, data)
+    snapshot = engine.snapshot()
+    return {
+        'status': snapshot['status'],
+        'positions': {'positions': snapshot['positions']},
+        'statistics': snapshot['statistics']
+    }
+
+
+live_updates = EventBroadcaster(live_snapshot, interval=float(os.getenv('LIVE_UPDATE_INTERVAL', 3)))
+if not REMOTE_ENGINE:
+    engine.add_listener(live_updates.notify)
+
+
+@app.errorhandler(EngineError)
+def engine_unavailable(e):
+    return jsonify({'success': False, 'message': str(e)}), 503
 
 
 @app.route('/')
@@ -34,43 +64,17 @@ def index():
 
 @app.route('/api/status')
 def get_status():
-    global bot
-    if bot:
-        return jsonify(bot.get_status())
-    return jsonify({'is_running': False, 'message': 'Bot not initialized'})
+    return jsonify(engine.status())
 
 
 @app.route('/api/start', methods=['POST'])
 def start_bot():
-    global bot, bot_thread, running_cycles
-    
     data = request.json
-    strategy = data.get('strategy', 'combined')
-    test_mode = data.get('test_mode', True)
-    symbol = data.get('symbol', 'BTCUSDT')
-    interval = data.get('interval', '15m')
     
     try:
-        if not bot:
-            bot = TradingBot(strategy=strategy, test_mode=test_mode)
-        
-        if not bot.is_running:
-            bot.start()
-            
-            cycle_key = f"{symbol}_{interval}"
-            if cycle_key not in running_cycles or not running_cycles[cycle_key]:
-                running_cycles[cycle_key] = True
-                bot_thread = threading.Thread(
-                    target=run_bot_cycle, 
-                    args=(bot, symbol, interval),
-                    daemon=True
-                )
-                bot_thread.start()
-            
-            return jsonify({'success': True, 'message': 'Bot started successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Bot is already running'})
-            
+        result = engine.start(**{name: data[name] for name in START_PARAMS if name in data})
+        live_updates.refresh()
+        return jsonify(result)
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -78,23 +82,86 @@ def start_bot():
 
 @app.route('/api/stop', methods=['POST'])
 def stop_bot():
-    global bot, running_cycles
+    try:
+        result = engine.stop()
+        live_updates.refresh()
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error stopping bot: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/stream')
+def stream():
+    """Server-Sent Events feed of status, positions, statistics and trades"""
+    client = live_updates.subscribe()
+    return Response(live_updates.stream(client), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    """The engine's latency histograms and counters in Prometheus text format (?format=json for p50/p99 summaries)"""
+    if request.args.get('format') == 'json':
+        return jsonify(engine.metrics(format='json'))
+    return Response(engine.metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/signals')
+def get_signals():
+    return jsonify(engine.signals())
+
+
+@app.route('/api/scheduler')
+def get_scheduler_metrics():
+    return jsonify(engine.scheduler_metrics())
+
+
+@app.route('/api/candles/<symbol>')
+def get_candles(symbol):
+    interval = request.args.get('interval', '15m')
+    limit = min(int(request.args.get('limit', 500)), 5000)
     
-    if bot and bot.is_running:
-        bot.stop()
-        running_cycles.clear()
-        return jsonify({'success': True, 'message': 'Bot stopped successfully'})
-    return jsonify({'success': False, 'message': 'Bot is not running'})
+    try:
+        candles = candle_store.read(symbol, interval, limit=limit)
+        if not len(candles):
+            klines = get_api().get_klines(symbol, interval, limit=min(limit, 1000))
+            # The candle store has a single writer: the engine, wherever it runs
+            if not REMOTE_ENGINE:
+                candle_store.append(symbol, interval, klines[:-1])
+            candles = Candles.from_klines(klines)
+        return jsonify({
+            'symbol': symbol,
+            'interval': interval,
+            'open_time': candles.open_time.tolist(),
+            'open': candles.open.tolist(),
+            'high': candles.high.tolist(),
+            'low': candles.low.tolist(),
+            'close': candles.close.tolist(),
+            'volume': candles.volume.tolist()
+        })
+    except Exception as e:
+        logger.error(f"Error getting candles for {symbol}: {e}")
+        return jsonify({'symbol': symbol, 'interval': interval, 'message': str(e)})
+
+
+@app.route('/api/screen')
+def screen_symbols():
+    """Current strategy signal for many symbols at once (default: the USDT universe)"""
+    interval = request.args.get('interval', '15m')
+    limit = min(int(request.args.get('limit', 100)), 1000)
+    symbols = request.args.get('symbols')
+    
+    return jsonify(engine.screen(symbols.split(',') if symbols else None, interval, limit))
 
 
 @app.route('/api/symbols')
 def get_symbols():
     try:
-        temp_api = BinanceAPI()
-        exchange_info = temp_api.get_exchange_info()
-        if exchange_info:
-            symbols = [s['symbol'] for s in exchange_info['symbols'] 
-                      if s['status'] == 'TRADING' and s['quoteAsset'] == 'USDT']
+        symbols = get_api().get_trading_symbols('USDT')
+        if symbols:
             return jsonify({'symbols': symbols[:50]})
     except Exception as e:
         logger.error(f"Error getting symbols: {e}")
@@ -104,8 +171,7 @@ def get_symbols():
 @app.route('/api/balance')
 def get_balance():
     try:
-        temp_api = BinanceAPI()
-        account = temp_api.get_account_info()
+        account = get_api().get_account_info()
         if account:
             balances = [b for b in account['balances'] if float(b['free']) > 0 or float(b['locked']) > 0]
             return jsonify({'balances': balances})
@@ -116,80 +182,24 @@ def get_balance():
 
 @app.route('/api/config', methods=['GET', 'POST'])
 def handle_config():
-    global bot
-    
     if request.method == 'POST':
-        if bot:
-            data = request.json
-            bot.config.update(data)
-            bot.save_state()
-            return jsonify({'success': True, 'message': 'Configuration updated'})
-        return jsonify({'success': False, 'message': 'Bot not initialized'})
-    
-    else:
-        if bot:
-            return jsonify(bot.config)
-        return jsonify({
-            'max_position_size': 0.1,
-            'stop_loss_percentage': 0.02,
-            'take_profit_percentage': 0.03,
-            'min_order_amount': 10.0
-        })
+        return jsonify(engine.update_config(request.json))
+    return jsonify(engine.config())
 
 
 @app.route('/api/positions')
 def get_positions():
-    global bot
-    if bot:
-        positions_data = []
-        for symbol, position in bot.positions.items():
-            ticker = bot.api.get_symbol_ticker(symbol)
-            if ticker:
-                current_price = float(ticker['price'])
-                position_value = position['quantity'] * current_price
-                positions_data.append({
-                    'symbol': symbol,
-                    'quantity': position['quantity'],
-                    'entry_price': position['entry_price'],
-                    'current_price': current_price,
-                    'value': position_value,
-                    'pnl': (current_price - position['entry_price']) * position['quantity'],
-                    'pnl_percentage': ((current_price - position['entry_price']) / position['entry_price']) * 100,
-                    'stop_loss': position.get('stop_loss', 0),
-                    'take_profit': position.get('take_profit', 0),
-                    'entry_time': position.get('entry_time', '')
-                })
-        return jsonify({'positions': positions_data})
-    return jsonify({'positions': []})
+    return jsonify({'positions': engine.positions()})
 
 
 @app.route('/api/positions/<symbol>', methods=['PUT'])
 def update_position(symbol):
-    global bot
-    if not bot:
-        return jsonify({'success': False, 'message': 'Bot not initialized'})
-    
-    if symbol not in bot.positions:
-        return jsonify({'success': False, 'message': 'Position not found'})
-    
     data = request.json
-    position = bot.positions[symbol]
-    
-    if 'stop_loss' in data:
-        position['stop_loss'] = float(data['stop_loss'])
-    if 'take_profit' in data:
-        position['take_profit'] = float(data['take_profit'])
-    
-    bot.save_state()
-    return jsonify({'success': True, 'message': 'Position updated'})
+    return jsonify(engine.update_position(symbol, data.get('stop_loss'), data.get('take_profit')))
 
 
 @app.route('/api/positions', methods=['POST'])
 def create_position():
-    global bot
-    if not bot:
-        return jsonify({'success': False, 'message': 'Bot not initialized'})
-    
     data = request.json
     symbol = data.get('symbol')
     quantity = data.get('quantity')
@@ -198,81 +208,17 @@ def create_position():
     if not all([symbol, quantity, entry_price]):
         return jsonify({'success': False, 'message': 'Missing required fields'})
     
-    try:
-        if bot.create_position(symbol, float(quantity), float(entry_price)):
-            return jsonify({'success': True, 'message': f'Position created for {symbol}'})
-    except Exception as e:
-        logger.error(f"Error creating position: {e}")
-        return jsonify({'success': False, 'message': str(e)})
+    return jsonify(engine.create_position(symbol, quantity, entry_price))
 
 
 @app.route('/api/positions/<symbol>', methods=['DELETE'])
 def close_position(symbol):
-    global bot
-    if not bot:
-        return jsonify({'success': False, 'message': 'Bot not initialized'})
-    
-    if symbol not in bot.positions:
-        return jsonify({'success': False, 'message': 'Position not found'})
-    
-    try:
-        ticker = bot.api.get_symbol_ticker(symbol)
-        if ticker:
-            current_price = float(ticker['price'])
-            bot.execute_trade(symbol, 'SELL', current_price, 100)
-            return jsonify({'success': True, 'message': f'Position closed for {symbol}'})
-    except Exception as e:
-        logger.error(f"Error closing position: {e}")
-        return jsonify({'success': False, 'message': str(e)})
+    return jsonify(engine.close_position(symbol))
 
 
 @app.route('/api/statistics')
 def get_statistics():
-    global bot
-    if not bot:
-        return jsonify({
-            'total_trades': 0,
-            'winning_trades': 0,
-            'losing_trades': 0,
-            'total_profit': 0,
-            'win_rate': 0,
-            'average_profit': 0,
-            'best_trade': 0,
-            'worst_trade': 0
-        })
-    
-    trades_with_profit = [t for t in bot.trades_history if t.get('profit') is not None]
-    
-    if not trades_with_profit:
-        return jsonify({
-            'total_trades': len(bot.trades_history),
-            'winning_trades': 0,
-            'losing_trades': 0,
-            'total_profit': 0,
-            'win_rate': 0,
-            'average_profit': 0,
-            'best_trade': 0,
-            'worst_trade': 0
-        })
-    
-    profits = [t['profit'] for t in trades_with_profit]
-    winning_trades = [p for p in profits if p > 0]
-    losing_trades = [p for p in profits if p < 0]
-    
-    statistics = {
-        'total_trades': len(trades_with_profit),
-        'winning_trades': len(winning_trades),
-        'losing_trades': len(losing_trades),
-        'total_profit': sum(profits),
-        'win_rate': (len(winning_trades) / len(trades_with_profit) * 100) if trades_with_profit else 0,
-        'average_profit': sum(profits) / len(profits) if profits else 0,
-        'best_trade': max(profits) if profits else 0,
-        'worst_trade': min(profits) if profits else 0,
-        'total_volume': sum(t.get('quantity', 0) * t.get('price', 0) for t in bot.trades_history),
-        'active_positions': len(bot.positions)
-    }
-    
-    return jsonify(statistics)
+    return jsonify(engine.statistics())
 
 
 @app.route('/dashboard')
@@ -281,6 +227,5 @@ def dashboard():
 
 
 if __name__ == '__main__':
-    from binance_api import BinanceAPI
     port = int(os.getenv('FLASK_PORT', 5000))
-    app.run(debug=True, port=port, host='0.0.0.0')
\ No newline at end of file
+    app.run(debug=True, port=port, host='0.0.0.0', threaded=True)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import hmac
+import time
+import asyncio
+import hashlib
+import threading
+import logging
+from urllib.parse import urlencode
+import aiohttp
+from rest_client import WeightLimiter, endpoint_weight, is_retryable, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBinanceAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class AsyncBinanceAPI:
+    """asyncio counterpart of BinanceAPI for fanning requests out over many symbols.
+
+    Mirrors get_klines, get_symbol_ticker, get_balance and place_order with the
+    same falsy-on-error returns. At most max_concurrency requests are in flight
+    at once, and every request draws from the same kind of weight budget as the
+    synchronous client (pass its limiter to share one budget between both).
+    """
+
+    def __init__(self, api_key=None, api_secret=None, base_url=None, max_concurrency=10,
+                 limiter=None, timeout=10, max_retries=3):
+        self.api_key = api_key or os.getenv('BINANCE_API_KEY')
+        self.api_secret = api_secret or os.getenv('BINANCE_API_SECRET')
+        self.base_url = (base_url or os.getenv('BINANCE_API_URL', 'https://api.binance.com')).rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter or WeightLimiter(int(os.getenv('BINANCE_WEIGHT_LIMIT', 1200)))
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def get_klines(self, symbol, interval, limit=100, start_time=None, end_time=None):
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        if end_time is not None:
+            params['endTime'] = int(end_time)
+        try:
+            return await self._request('GET', '/api/v3/klines', params)
+        except Exception as e:
+            logger.error(f"Error getting klines for {symbol}: {e}")
+            return []
+
+    async def get_symbol_ticker(self, symbol):
+        try:
+            return await self._request('GET', '/api/v3/ticker/price', {'symbol': symbol})
+        except Exception as e:
+            logger.error(f"Error getting ticker for {symbol}: {e}")
+            return None
+
+    async def get_balance(self, symbol='USDT'):
+        try:
+            account = await self._request('GET', '/api/v3/account', signed=True)
+            for balance in account.get('balances', []):
+                if balance['asset'] == symbol:
+                    return float(balance['free'])
+            return 0.0
+        except Exception as e:
+            logger.error(f"Error getting balance for {symbol}: {e}")
+            return 0.0
+
+    async def place_order(self, symbol, side, quantity, order_type='MARKET'):
+        params = {'symbol': symbol, 'side': side, 'type': order_type, 'quantity': quantity}
+        try:
+            return await self._request('POST', '/api/v3/order', params, signed=True)
+        except Exception as e:
+            logger.error(f"Error placing {side} order for {symbol}: {e}")
+            return None
+
+    async def get_klines_many(self, pairs, limit=100):
+        """{(symbol, interval): klines} for every pair, fetched concurrently"""
+        pairs = list(pairs)
+        results = await asyncio.gather(*(self.get_klines(symbol, interval, limit) for symbol, interval in pairs))
+        return dict(zip(pairs, results))
+
+    async def get_symbol_tickers(self, symbols):
+        """{symbol: price} for every symbol, fetched concurrently"""
+        symbols = list(symbols)
+        tickers = await asyncio.gather(*(self.get_symbol_ticker(symbol) for symbol in symbols))
+        return {symbol: float(t['price']) for symbol, t in zip(symbols, tickers) if t}
+
+    async def _request(self, method, path, params=None, signed=False):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={'X-MBX-APIKEY': self.api_key} if self.api_key else {},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        weight = endpoint_weight(path, params)
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                wait = self.limiter.try_acquire(weight)
+                while wait > 0:
+                    await asyncio.sleep(min(wait, 1.0))
+                    wait = self.limiter.try_acquire(weight)
+
+                query = dict(params or {})
+                if signed:
+                    query['timestamp'] = int(time.time() * 1000)
+                    query['signature'] = self._sign(query)
+
+                async with self._session.request(method, self.base_url + path, params=query) as response:
+                    used_weight = response.headers.get('x-mbx-used-weight-1m')
+                    if used_weight is not None:
+                        self.limiter.observe(int(used_weight))
+
+                    if not is_retryable(method, response.status) or attempt == self.max_retries:
+                        if response.status >= 400:
+                            raise AsyncBinanceAPIError(response.status, await response.text())
+                        return await response.json(content_type=None)
+
+                    delay = retry_delay(response.headers, attempt)
+                    if response.status in (429, 418):
+                        self.limiter.pause(delay)
+                logger.warning(f"{response.status} from {path}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _sign(self, params):
+        return hmac.new(self.api_secret.encode(), urlencode(params).encode(), hashlib.sha256).hexdigest()
+
+
+class EventLoopThread:
+    """An event loop on a daemon thread, so synchronous code (the bot, Flask views) can run coroutines"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,139 @@
+import numpy as np
+from strategies import BUY, SELL
+from config import DEFAULT_CONFIG
+
+
+class BacktestResult:
+    def __init__(self, trades, equity, initial_balance):
+        self.trades = trades
+        self.equity = equity
+        self.initial_balance = initial_balance
+
+    @property
+    def final_balance(self):
+        return float(self.equity[-1]) if len(self.equity) else self.initial_balance
+
+    @property
+    def max_drawdown(self):
+        if not len(self.equity):
+            return 0.0
+        peaks = np.maximum.accumulate(self.equity)
+        return float(np.max((peaks - self.equity) / peaks) * 100)
+
+    def statistics(self):
+        profits = np.array([t['profit'] for t in self.trades], dtype=np.float64)
+        wins = profits[profits > 0]
+        losses = profits[profits < 0]
+        return {
+            'total_trades': len(profits),
+            'winning_trades': len(wins),
+            'losing_trades': len(losses),
+            'total_profit': float(profits.sum()),
+            'return_percentage': (self.final_balance - self.initial_balance) / self.initial_balance * 100,
+            'win_rate': len(wins) / len(profits) * 100 if len(profits) else 0,
+            'average_profit': float(profits.mean()) if len(profits) else 0,
+            'best_trade': float(profits.max()) if len(profits) else 0,
+            'worst_trade': float(profits.min()) if len(profits) else 0,
+            'max_drawdown': self.max_drawdown,
+            'final_balance': self.final_balance
+        }
+
+
+def run_backtest(strategy, candles, config=None, initial_balance=1000.0, fee_rate=0.0,
+                 min_confidence=50, symbol_filters=None):
+    """Replay TradingBot's live trading rules over candles.
+
+    Signals for every bar come from one strategy.signal_series() pass. A BUY
+    above min_confidence opens a position sized like execute_trade, then the
+    position is closed on the first later bar with a SELL signal or a close
+    through its stop-loss/take-profit level, as the live PositionMonitor would.
+    """
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    signals, confidences = strategy.signal_series(candles)
+    return simulate(candles, signals, confidences, config, initial_balance, fee_rate, min_confidence, symbol_filters)
+
+
+def simulate(candles, signals, confidences, config, initial_balance=1000.0, fee_rate=0.0,
+             min_confidence=50, symbol_filters=None):
+    close = candles.close
+    n = len(close)
+    active = confidences > min_confidence
+    entries = np.flatnonzero((signals == BUY) & active)
+    sell_signal = (signals == SELL) & active
+
+    trades = []
+    cash_delta = np.zeros(n + 1)
+    held_delta = np.zeros(n + 1)
+    balance = initial_balance
+    i = 0
+
+    while True:
+        k = np.searchsorted(entries, i)
+        if k >= len(entries):
+            break
+        entry = int(entries[k])
+        price = close[entry]
+
+        amount = balance * config['max_position_size']
+        if amount < config['min_order_amount']:
+            break
+        quantity = _quantize(amount, price, symbol_filters)
+        if quantity <= 0:
+            i = entry + 1
+            continue
+
+        stop_loss = price * (1 - config['stop_loss_percentage'])
+        take_profit = price * (1 + config['take_profit_percentage'])
+        exit_index, reason = _find_exit(close, sell_signal, entry + 1, stop_loss, take_profit)
+        if exit_index is None:
+            exit_index, reason = n - 1, 'End of Data'
+        exit_price = close[exit_index]
+
+        cost = quantity * price * (1 + fee_rate)
+        proceeds = quantity * exit_price * (1 - fee_rate)
+        profit = proceeds - cost
+        balance += profit
+
+        cash_delta[entry] -= cost
+        cash_delta[exit_index] += proceeds
+        held_delta[entry] += quantity
+        held_delta[exit_index] -= quantity
+
+        trades.append({
+            'entry_time': int(candles.open_time[entry]),
+            'exit_time': int(candles.open_time[exit_index]),
+            'entry_price': float(price),
+            'exit_price': float(exit_price),
+            'quantity': float(quantity),
+            'profit': float(profit),
+            'reason': reason
+        })
+        i = exit_index + 1
+
+    equity = initial_balance + np.cumsum(cash_delta[:n]) + np.cumsum(held_delta[:n]) * close
+    return BacktestResult(trades, equity, initial_balance)
+
+
+def _find_exit(close, sell_signal, start, stop_loss, take_profit):
+    """First index >= start where the position would be sold, scanning in growing chunks"""
+    n = len(close)
+    chunk = 256
+    while start < n:
+        end = min(start + chunk, n)
+        window = close[start:end]
+        hits = sell_signal[start:end] | (window <= stop_loss) | (window >= take_profit)
+        found = np.flatnonzero(hits)
+        if len(found):
+            j = start + int(found[0])
+            if sell_signal[j]:
+                return j, 'Signal'
+            return j, 'Stop Loss' if close[j] <= stop_loss else 'Take Profit'
+        start = end
+        chunk *= 2
+    return None, None
+
+
+def _quantize(amount, price, symbol_filters):
+    if symbol_filters is None:
+        return amount / price
+    return float(symbol_filters.sizer.order_quantity(amount, price))
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import logging
+from datetime import datetime, timedelta
+from unittest import mock
+import numpy as np
+from strategies import create_strategy
+from exchange_info import SymbolFilters
+from price_cache import PriceCache
+from state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+KLINE_LENGTHS = (100, 500, 1000, 5000)
+TRADE_COUNTS = (1000, 100000)
+SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'ADAUSDT', 'SOLUSDT')
+
+SYMBOL_INFO = {
+    'symbol': 'BTCUSDT',
+    'status': 'TRADING',
+    'baseAsset': 'BTC',
+    'quoteAsset': 'USDT',
+    'baseAssetPrecision': 8,
+    'quotePrecision': 8,
+    'filters': [
+        {'filterType': 'PRICE_FILTER', 'minPrice': '0.01000000', 'maxPrice': '1000000.00000000', 'tickSize': '0.01000000'},
+        {'filterType': 'LOT_SIZE', 'minQty': '0.00001000', 'maxQty': '9000.00000000', 'stepSize': '0.00001000'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'}
+    ]
+}
+
+
+def synthetic_klines(n, seed=0, start_price=30000.0, interval_ms=60000):
+    """n klines in the raw Binance list format from a seeded random walk"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.uniform(1, 100, n)
+    start = 1699920000000  # midnight UTC, so every interval bucket lines up
+    return [
+        [start + i * interval_ms, f"{open_[i]:.2f}", f"{high[i]:.2f}", f"{low[i]:.2f}", f"{close[i]:.2f}",
+         f"{volume[i]:.4f}", start + (i + 1) * interval_ms - 1, '0', 0, '0', '0', '0']
+        for i in range(n)
+    ]
+
+
+def synthetic_trades(n, seed=0):
+    """n trade records shaped like TradingBot.record_trade's, alternating BUY and SELL"""
+    rng = np.random.default_rng(seed)
+    started = datetime(2024, 1, 1)
+    trades = []
+    for i in range(n):
+        action = 'BUY' if i % 2 == 0 else 'SELL'
+        trade = {
+            'timestamp': (started + timedelta(minutes=15 * i)).isoformat(),
+            'symbol': SYMBOLS[i % len(SYMBOLS)],
+            'action': action,
+            'price': float(rng.uniform(100, 50000)),
+            'quantity': 0.001,
+            'test_mode': True,
+            'strategy': 'combined'
+        }
+        if action == 'SELL':
+            trade['profit'] = float(rng.normal(0.5, 5))
+        trades.append(trade)
+    return trades
+
+
+class MockBinanceAPI:
+    """Stand-in for BinanceAPI that answers from memory, so benchmarks measure the bot and not the network"""
+
+    def __init__(self, prices=None, balance=1000.0):
+        self.balance = balance
+        self.price_table = dict(prices or {symbol: 100.0 * (i + 1) for i, symbol in enumerate(SYMBOLS)})
+        self.prices = PriceCache(self.get_symbol_tickers)
+        self.symbol_filters = SymbolFilters(SYMBOL_INFO)
+
+    def get_klines(self, symbol, interval, limit=100, start_time=None, end_time=None):
+        return synthetic_klines(limit)
+
+    def get_symbol_tickers(self, symbols=None):
+        return [{'symbol': symbol, 'price': str(self.price_table[symbol])}
+                for symbol in (symbols or self.price_table) if symbol in self.price_table]
+
+    def get_price(self, symbol):
+        return self.prices.get(symbol)
+
+    def get_balance(self, symbol='USDT'):
+        return self.balance
+
+    def get_symbol_filters(self, symbol):
+        return self.symbol_filters
+
+    def get_order_sizer(self, symbol):
+        return self.symbol_filters.sizer
+
+    def place_order(self, symbol, side, quantity, order_type='MARKET'):
+        return {'symbol': symbol, 'side': side, 'executedQty': quantity, 'status': 'FILLED'}
+
+
+def make_bot(state_directory, strategy='combined', api=None):
+    """TradingBot over a MockBinanceAPI and a StateStore in state_directory"""
+    from trading_bot import TradingBot
+    api = api or MockBinanceAPI()
+    if StateStore(state_directory).is_empty:
+        # An empty store would import ./bot_state.json on load
+        fill_store(state_directory, [])
+    return TradingBot(strategy=strategy, test_mode=True, state_store=StateStore(state_directory, fsync='never'), api=api)
+
+
+def fill_store(directory, trades):
+    store = StateStore(directory, fsync='never', compact_every=10 ** 9)
+    store.load()
+    for trade in trades:
+        store.append_trade(trade)
+    store.compact()
+    store.close()
+
+
+def measure(func, repeat=5, min_time=0.05):
+    """Per-call timings of func: calls are batched until a batch takes min_time, then repeat batches are timed"""
+    number = 1
+    while True:
+        elapsed = _time_batch(func, number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    per_call = [_time_batch(func, number) / number for _ in range(repeat)]
+    return {
+        'min': min(per_call),
+        'median': statistics.median(per_call),
+        'mean': statistics.fmean(per_call),
+        'stdev': statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        'number': number,
+        'repeat': repeat
+    }
+
+
+def _time_batch(func, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - started
+
+
+def bench_strategies(lengths, repeat):
+    results = {}
+    for length in lengths:
+        klines = synthetic_klines(length, seed=length)
+        for name in ('sma', 'rsi', 'bollinger', 'combined'):
+            strategy = create_strategy(name)
+            results[f"strategy.{name}.analyze[{length}]"] = measure(lambda: strategy.analyze(klines), repeat)
+
+        # Streaming case: one keyed strategy sees each new candle once, so only the last bar is new work
+        strategy = create_strategy('combined')
+        strategy.analyze(klines, key='bench')
+        results[f"strategy.combined.analyze_keyed[{length}]"] = measure(lambda: strategy.analyze(klines, key='bench'), repeat)
+
+    candles = {symbol: synthetic_klines(max(lengths), seed=i) for i, symbol in enumerate(SYMBOLS)}
+    strategy = create_strategy('combined')
+
+    def end_to_end():
+        for symbol, klines in candles.items():
+            strategy.analyze(klines)
+    results[f"strategy.combined.end_to_end[{len(candles)}x{max(lengths)}]"] = measure(end_to_end, repeat)
+    return results
+
+
+def bench_state(trade_counts, repeat):
+    results = {}
+    for count in trade_counts:
+        directory = tempfile.mkdtemp(prefix='bench-state-')
+        try:
+            fill_store(directory, synthetic_trades(count))
+            bot = make_bot(directory)
+
+            results[f"state.save_state[{count}]"] = measure(bot.save_state, repeat)
+
+            def load_state():
+                bot.store.close()
+                bot.store = StateStore(directory, fsync='never')
+                bot.load_state()
+            results[f"state.load_state[{count}]"] = measure(load_state, repeat)
+
+            # Without a snapshot, loading replays (and re-aggregates) the whole journal
+            os.remove(os.path.join(directory, 'snapshot.json'))
+            results[f"state.load_state_replay[{count}]"] = measure(load_state, repeat)
+            bot.store.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_sizing(repeat):
+    # The OrderSizer calls execute_trade makes for an entry and an exit
+    sizer = MockBinanceAPI().get_order_sizer('BTCUSDT')
+    return {
+        'sizing.order_quantity': measure(lambda: sizer.order_quantity(100.0, 30123.45), repeat),
+        'sizing.floor_quantity': measure(lambda: sizer.floor_quantity(0.0123456789), repeat)
+    }
+
+
+def bench_endpoints(repeat, trades=1000):
+    import app as web
+    from engine import EngineServer
+    from engine_client import EngineClient
+
+    directory = tempfile.mkdtemp(prefix='bench-app-')
+    try:
+        fill_store(directory, synthetic_trades(trades))
+        bot = make_bot(directory)
+        for symbol in SYMBOLS[:3]:
+            bot.set_position(symbol, {'quantity': 0.01, 'entry_price': bot.api.price_table[symbol] * 0.99,
+                                      'stop_loss': 0, 'take_profit': 0})
+
+        client = web.app.test_client()
+        results = {}
+        with mock.patch.object(web.engine, 'bot', bot):
+            for path in ('/api/status', '/api/statistics'):
+                assert client.get(path).status_code == 200
+                results[f"endpoint.{path}"] = measure(lambda: client.get(path), repeat)
+
+            # The same reads in a web worker of a separate engine process (ENGINE_MODE=remote)
+            server = EngineServer(web.engine, snapshot_path=os.path.join(directory, 'engine_snapshot.json'))
+            server.write_snapshot()
+        with mock.patch.object(web, 'engine', EngineClient(snapshot_path=server.snapshot_path)):
+            for path in ('/api/status', '/api/statistics'):
+                assert client.get(path).status_code == 200
+                results[f"endpoint.remote.{path}"] = measure(lambda: client.get(path), repeat)
+        bot.store.close()
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(groups=None, repeat=5, quick=False, pattern=None):
+    lengths = KLINE_LENGTHS[:2] if quick else KLINE_LENGTHS
+    trade_counts = TRADE_COUNTS[:1] if quick else TRADE_COUNTS
+    suites = {
+        'strategies': lambda: bench_strategies(lengths, repeat),
+        'state': lambda: bench_state(trade_counts, repeat),
+        'sizing': lambda: bench_sizing(repeat),
+        'endpoints': lambda: bench_endpoints(repeat)
+    }
+
+    results = {}
+    for group, suite in suites.items():
+        if groups and group not in groups:
+            continue
+        logger.info(f"Running {group} benchmarks")
+        results.update(suite())
+    if pattern:
+        results = {name: result for name, result in results.items() if pattern in name}
+
+    return {'meta': environment(repeat, quick), 'results': results}
+
+
+def environment(repeat, quick):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'quick': quick
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """(name, baseline median, current median, relative change, regressed) for every benchmark in both runs"""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = result['median'] / before['median'] - 1 if before['median'] else 0.0
+        rows.append((name, before['median'], result['median'], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark strategies, state persistence, sizing and API endpoints")
+    parser.add_argument('--output', '-o', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="Baseline JSON from an earlier run to compare medians against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Relative slowdown counted as a regression with --compare (default 0.1)")
+    parser.add_argument('--group', action='append', choices=['strategies', 'state', 'sizing', 'endpoints'],
+                        help="Only run these groups (repeatable)")
+    parser.add_argument('--filter', help="Only report benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Shorter kline lengths and 1k trades only")
+    args = parser.parse_args(argv)
+
+    report = run(args.group, args.repeat, args.quick, args.filter)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, 'r') as f:
+        baseline = json.load(f)
+    regressions = 0
+    for name, before, after, change, regressed in compare(baseline, report, args.threshold):
+        regressions += regressed
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:55} {before * 1e3:10.3f}ms {after * 1e3:10.3f}ms {change:+8.1%}{flag}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,7 +1,12 @@
 import os
-from binance.client import Client
+import json
+import threading
 from binance.exceptions import BinanceAPIException
 from dotenv import load_dotenv
+from exchange_info import ExchangeInfoCache
+from price_cache import PriceCache
+from rest_client import PooledClient
+from metrics import timed
 import logging
 
 load_dotenv()
@@ -10,6 +15,17 @@ logger = logging.getLogger(__name__)
 
 
 class BinanceAPI:
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls):
+        """Process-wide instance, so every caller reuses one pooled HTTP session and one weight budget"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
     def __init__(self):
         api_key = os.getenv('BINANCE_API_KEY')
         api_secret = os.getenv('BINANCE_API_SECRET')
@@ -17,8 +33,15 @@ class BinanceAPI:
         if not api_key or not api_secret:
             raise ValueError("Please set BINANCE_API_KEY and BINANCE_API_SECRET in .env file")
         
-        self.client = Client(api_key, api_secret)
+        self.client = PooledClient(api_key, api_secret)
+        self.exchange_info = ExchangeInfoCache(
+            self.get_exchange_info,
+            ttl=int(os.getenv('EXCHANGE_INFO_TTL', 3600)),
+            snapshot_path=os.getenv('EXCHANGE_INFO_SNAPSHOT', 'data/exchange_info.json')
+        )
+        self.prices = PriceCache(self.get_symbol_tickers, max_age=float(os.getenv('PRICE_MAX_AGE', 5)))
         
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_account_info')
     def get_account_info(self):
         try:
             return self.client.get_account()
@@ -26,6 +49,7 @@ class BinanceAPI:
             logger.error(f"Error getting account info: {e}")
             return None
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_balance')
     def get_balance(self, symbol='USDT'):
         try:
             balance = self.client.get_asset_balance(asset=symbol)
@@ -34,6 +58,7 @@ class BinanceAPI:
             logger.error(f"Error getting balance for {symbol}: {e}")
             return 0.0
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_symbol_ticker')
     def get_symbol_ticker(self, symbol):
         try:
             return self.client.get_symbol_ticker(symbol=symbol)
@@ -41,13 +66,35 @@ class BinanceAPI:
             logger.error(f"Error getting ticker for {symbol}: {e}")
             return None
     
-    def get_klines(self, symbol, interval, limit=100):
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_symbol_tickers')
+    def get_symbol_tickers(self, symbols=None):
+        """Prices for many symbols (or all of them) in one request"""
         try:
-            return self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+            if symbols:
+                return self.client.get_symbol_ticker(symbols=json.dumps(sorted(symbols), separators=(',', ':')))
+            return self.client.get_all_tickers()
+        except BinanceAPIException as e:
+            logger.error(f"Error getting tickers: {e}")
+            return []
+    
+    def get_price(self, symbol):
+        """Last price from the shared price cache, or None if unknown"""
+        return self.prices.get(symbol)
+    
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_klines')
+    def get_klines(self, symbol, interval, limit=100, start_time=None, end_time=None):
+        try:
+            params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+            if start_time is not None:
+                params['startTime'] = int(start_time)
+            if end_time is not None:
+                params['endTime'] = int(end_time)
+            return self.client.get_klines(**params)
         except BinanceAPIException as e:
             logger.error(f"Error getting klines for {symbol}: {e}")
             return []
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='place_order')
     def place_order(self, symbol, side, quantity, order_type='MARKET'):
         try:
             if order_type == 'MARKET':
@@ -60,6 +107,7 @@ class BinanceAPI:
             logger.error(f"Error placing {side} order for {symbol}: {e}")
             return None
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_open_orders')
     def get_open_orders(self, symbol=None):
         try:
             if symbol:
@@ -69,6 +117,7 @@ class BinanceAPI:
             logger.error(f"Error getting open orders: {e}")
             return []
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='cancel_order')
     def cancel_order(self, symbol, order_id):
         try:
             return self.client.cancel_order(symbol=symbol, orderId=order_id)
@@ -76,6 +125,7 @@ class BinanceAPI:
             logger.error(f"Error canceling order {order_id}: {e}")
             return None
     
+    @timed('binance_api_seconds', 'BinanceAPI call latency', method='get_exchange_info')
     def get_exchange_info(self):
         try:
             return self.client.get_exchange_info()
@@ -85,12 +135,25 @@ class BinanceAPI:
     
     def get_symbol_info(self, symbol):
         try:
-            exchange_info = self.get_exchange_info()
-            if exchange_info:
-                for s in exchange_info['symbols']:
-                    if s['symbol'] == symbol:
-                        return s
-            return None
+            return self.exchange_info.get(symbol)
         except Exception as e:
             logger.error(f"Error getting symbol info for {symbol}: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_symbol_filters(self, symbol):
+        try:
+            return self.exchange_info.get_filters(symbol)
+        except Exception as e:
+            logger.error(f"Error getting symbol filters for {symbol}: {e}")
+            return None
+    
+    def get_order_sizer(self, symbol):
+        symbol_filters = self.get_symbol_filters(symbol)
+        return symbol_filters.sizer if symbol_filters else None
+    
+    def get_trading_symbols(self, quote_asset='USDT'):
+        try:
+            return self.exchange_info.list_symbols(quote_asset=quote_asset)
+        except Exception as e:
+            logger.error(f"Error getting trading symbols: {e}")
+            return []
\ No newline at end of file
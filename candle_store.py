@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import logging
+import numpy as np
+from candles import Candles, interval_seconds
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    ('open_time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64)
+)
+
+
+class CandleStore:
+    """On-disk closed candles, one directory per symbol/interval with one binary file per column.
+
+    Writes only ever append to the column files; reads memory-map them, so a
+    range read returns array views without copying. Candles that would not
+    extend the series in order (backfilling before the first stored candle)
+    go through a rewrite of the files instead.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv('CANDLE_STORE_PATH', 'data/candles')
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def series(self):
+        if not os.path.isdir(self.root):
+            return
+        for symbol in sorted(os.listdir(self.root)):
+            for interval in sorted(os.listdir(os.path.join(self.root, symbol))):
+                yield symbol, interval
+
+    def count(self, symbol, interval):
+        with self._lock(symbol, interval):
+            return self._count(symbol, interval)
+
+    def first_open_time(self, symbol, interval):
+        candles = self.read(symbol, interval)
+        return int(candles.open_time[0]) if len(candles) else None
+
+    def last_open_time(self, symbol, interval):
+        candles = self.read(symbol, interval)
+        return int(candles.open_time[-1]) if len(candles) else None
+
+    def read(self, symbol, interval, start_time=None, end_time=None, limit=None):
+        """Candles with open time in [start_time, end_time], as memory-mapped views"""
+        with self._lock(symbol, interval):
+            n = self._count(symbol, interval)
+            if n == 0:
+                return Candles.empty()
+            columns = {
+                name: np.memmap(self._file(symbol, interval, name), dtype=dtype, mode='r', shape=(n,))
+                for name, dtype in COLUMNS
+            }
+
+        open_time = columns['open_time']
+        lo = 0 if start_time is None else int(np.searchsorted(open_time, start_time, side='left'))
+        hi = n if end_time is None else int(np.searchsorted(open_time, end_time, side='right'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return Candles(**columns)[lo:hi]
+
+    def append(self, symbol, interval, candles):
+        """Append candles newer than the last stored one; returns how many were written"""
+        candles = Candles.from_klines(candles)
+        if not len(candles):
+            return 0
+
+        with self._lock(symbol, interval):
+            n = self._count(symbol, interval)
+            last = self._last_open_time(symbol, interval, n)
+            if last is not None:
+                candles = candles[int(np.searchsorted(candles.open_time, last, side='right')):]
+            if not len(candles):
+                return 0
+
+            if last is not None:
+                expected = last + interval_seconds(interval) * 1000
+                if candles.open_time[0] > expected:
+                    logger.warning(f"Gap in {symbol} {interval} candles: {expected} to {int(candles.open_time[0])}")
+
+            os.makedirs(self.path(symbol, interval), exist_ok=True)
+            for name, dtype in COLUMNS:
+                with open(self._file(symbol, interval, name), 'ab') as f:
+                    f.write(np.ascontiguousarray(getattr(candles, name), dtype=dtype).tobytes())
+            return len(candles)
+
+    def merge(self, symbol, interval, candles):
+        """Insert candles anywhere in the series (e.g. older history or gap fills) by rewriting the files"""
+        candles = Candles.from_klines(candles)
+        if not len(candles):
+            return 0
+
+        with self._lock(symbol, interval):
+            existing = self._read_copy(symbol, interval)
+            open_time = np.concatenate([existing['open_time'], candles.open_time])
+            _, order = np.unique(open_time[::-1], return_index=True)
+            # np.unique keeps the first occurrence; reversing makes the new candles win
+            order = len(open_time) - 1 - order
+            added = len(order) - len(existing['open_time'])
+
+            os.makedirs(self.path(symbol, interval), exist_ok=True)
+            for name, dtype in COLUMNS:
+                column = np.concatenate([existing[name], getattr(candles, name).astype(dtype)])[order]
+                path = self._file(symbol, interval, name)
+                with open(f"{path}.tmp", 'wb') as f:
+                    f.write(column.tobytes())
+                os.replace(f"{path}.tmp", path)
+            return added
+
+    def find_gaps(self, symbol, interval, start_time=None, end_time=None):
+        """(first_missing_open_time, last_missing_open_time) ranges inside the stored series"""
+        open_time = self.read(symbol, interval, start_time, end_time).open_time
+        step = interval_seconds(interval) * 1000
+        if len(open_time) < 2:
+            return []
+        breaks = np.flatnonzero(np.diff(open_time) > step)
+        return [(int(open_time[i]) + step, int(open_time[i + 1]) - step) for i in breaks]
+
+    def backfill(self, api, symbol, interval, start_time, end_time=None, limit=1000):
+        """Download closed candles over REST for [start_time, end_time] and store them"""
+        end_time = end_time or int(time.time() * 1000)
+        first = self.first_open_time(symbol, interval)
+        last = self.last_open_time(symbol, interval)
+
+        written = 0
+        if first is not None and start_time < first:
+            written += self.merge(symbol, interval, self._download(api, symbol, interval, start_time, first - 1, limit))
+        if last is not None:
+            start_time = max(start_time, last + 1)
+        written += self.append(symbol, interval, self._download(api, symbol, interval, start_time, end_time, limit))
+        return written
+
+    def fill_gaps(self, api, symbol, interval, limit=1000):
+        written = 0
+        for gap_start, gap_end in self.find_gaps(symbol, interval):
+            written += self.merge(symbol, interval, self._download(api, symbol, interval, gap_start, gap_end, limit))
+        return written
+
+    def _download(self, api, symbol, interval, start_time, end_time, limit):
+        now = int(time.time() * 1000)
+        rows = []
+        cursor = start_time
+        while cursor <= end_time:
+            klines = api.get_klines(symbol, interval, limit=limit, start_time=cursor, end_time=end_time)
+            if not klines:
+                break
+            rows.extend(k for k in klines if int(k[6]) < now)
+            cursor = int(klines[-1][0]) + 1
+            if len(klines) < limit:
+                break
+        return Candles.from_klines(rows)
+
+    def _lock(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _file(self, symbol, interval, name):
+        return os.path.join(self.path(symbol, interval), f"{name}.bin")
+
+    def _count(self, symbol, interval):
+        """Rows present in every column; a torn append is truncated back to the shortest column"""
+        sizes = []
+        for name, dtype in COLUMNS:
+            path = self._file(symbol, interval, name)
+            sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        n = min(sizes)
+        if n != max(sizes):
+            for name, dtype in COLUMNS:
+                path = self._file(symbol, interval, name)
+                if os.path.exists(path):
+                    os.truncate(path, n * np.dtype(dtype).itemsize)
+        return n
+
+    def _last_open_time(self, symbol, interval, n):
+        if n == 0:
+            return None
+        with open(self._file(symbol, interval, 'open_time'), 'rb') as f:
+            f.seek((n - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+
+    def _read_copy(self, symbol, interval):
+        n = self._count(symbol, interval)
+        return {
+            name: np.fromfile(self._file(symbol, interval, name), dtype=dtype, count=n) if n else np.empty(0, dtype)
+            for name, dtype in COLUMNS
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local candle store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill = subparsers.add_parser('backfill', help="Download history into the store")
+    backfill.add_argument('symbol')
+    backfill.add_argument('interval')
+    backfill.add_argument('--days', type=float, default=30)
+
+    gaps = subparsers.add_parser('gaps', help="List and optionally fill gaps")
+    gaps.add_argument('symbol')
+    gaps.add_argument('interval')
+    gaps.add_argument('--fill', action='store_true')
+
+    subparsers.add_parser('list', help="List stored series")
+
+    args = parser.parse_args(argv)
+    store = CandleStore()
+
+    if args.command == 'list':
+        for symbol, interval in store.series():
+            print(f"{symbol} {interval}: {store.count(symbol, interval)} candles")
+        return 0
+
+    from binance_api import BinanceAPI
+    api = BinanceAPI()
+    if args.command == 'backfill':
+        start_time = int((time.time() - args.days * 86400) * 1000)
+        written = store.backfill(api, args.symbol, args.interval, start_time)
+        print(f"Stored {written} new {args.symbol} {args.interval} candles")
+    elif args.command == 'gaps':
+        for gap_start, gap_end in store.find_gaps(args.symbol, args.interval):
+            print(f"Missing {gap_start} - {gap_end}")
+        if args.fill:
+            print(f"Filled {store.fill_gaps(api, args.symbol, args.interval)} candles")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
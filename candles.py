@@ -0,0 +1,87 @@
+import numpy as np
+
+INTERVAL_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200,
+    '1d': 86400, '3d': 259200, '1w': 604800
+}
+
+# Weekly candles open on Monday; the Unix epoch was a Thursday
+_INTERVAL_OFFSET_SECONDS = {'1w': 4 * 86400}
+
+
+def interval_seconds(interval):
+    try:
+        return INTERVAL_SECONDS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+
+def candle_open_time(timestamp, interval):
+    """Open time (seconds) of the candle containing timestamp (seconds)"""
+    period = interval_seconds(interval)
+    offset = _INTERVAL_OFFSET_SECONDS.get(interval, 0)
+    return (timestamp - offset) // period * period + offset
+
+
+class Candles:
+    """OHLCV columns parsed once from raw Binance kline rows.
+
+    Prices and volume are float64 arrays, open/close times are int64 millisecond
+    timestamps. Slicing returns views, so strategies can share one instance.
+    """
+
+    __slots__ = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+
+    def __init__(self, open_time, open, high, low, close, volume, close_time):
+        self.open_time = open_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.close_time = close_time
+
+    @classmethod
+    def from_klines(cls, klines):
+        if isinstance(klines, cls):
+            return klines
+        if not len(klines):
+            return cls.empty()
+
+        # One conversion for the whole block; rows become contiguous columns
+        columns = np.array([k[:7] for k in klines], dtype=np.float64).T.copy()
+        return cls(
+            columns[0].astype(np.int64),
+            columns[1],
+            columns[2],
+            columns[3],
+            columns[4],
+            columns[5],
+            columns[6].astype(np.int64)
+        )
+
+    @classmethod
+    def empty(cls):
+        times = np.empty(0, dtype=np.int64)
+        prices = np.empty(0, dtype=np.float64)
+        return cls(times, prices, prices, prices, prices, prices, times)
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("Candles only support slice indexing")
+        return Candles(*(getattr(self, name)[index] for name in self.__slots__))
+
+
+def stack(candles_list, column='close', length=None):
+    """(len(candles_list) x length) matrix of one column, aligned on the latest candle and left-padded with NaN"""
+    length = length or max((len(c) for c in candles_list), default=0)
+    matrix = np.full((len(candles_list), length), np.nan)
+    for row, candles in enumerate(candles_list):
+        values = getattr(candles, column)[-length:]
+        if len(values):
+            matrix[row, length - len(values):] = values
+    return matrix
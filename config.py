@@ -0,0 +1,8 @@
+# Default trading parameters, shared by the live bot, the engine, the risk coordinator and backtests.
+# Saved or API-updated config is layered on top of these.
+DEFAULT_CONFIG = {
+    'max_position_size': 0.1,
+    'stop_loss_percentage': 0.02,
+    'take_profit_percentage': 0.03,
+    'min_order_amount': 10.0
+}
@@ -0,0 +1,367 @@
+import os
+import json
+import time
+import itertools
+import threading
+import logging
+from collections import deque
+from multiprocessing.connection import Listener
+from dotenv import load_dotenv
+from trading_bot import TradingBot
+from market_stream import KlineStream
+from scheduler import CycleScheduler
+from candle_store import CandleStore
+from metrics import REGISTRY
+from config import DEFAULT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+EMPTY_STATISTICS = {
+    'total_trades': 0,
+    'winning_trades': 0,
+    'losing_trades': 0,
+    'total_profit': 0,
+    'win_rate': 0,
+    'average_profit': 0,
+    'best_trade': 0,
+    'worst_trade': 0,
+    'total_volume': 0,
+    'active_positions': 0
+}
+
+
+def engine_address():
+    return os.getenv('ENGINE_SOCKET', 'data/engine.sock')
+
+
+def engine_snapshot_path():
+    return os.getenv('ENGINE_SNAPSHOT', 'data/engine_snapshot.json')
+
+
+def authkey():
+    return os.getenv('ENGINE_AUTHKEY', os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')).encode()
+
+
+class Engine:
+    """The trading bot together with its market data feed, driven by commands.
+
+    app.py either runs one in its own process or talks to one served by
+    EngineServer through engine_client.EngineClient, which has the same
+    methods. Every method takes and returns plain JSON-able values.
+    """
+
+    COMMANDS = ('start', 'stop', 'update_config', 'update_position', 'create_position', 'close_position',
+                'screen', 'metrics')
+
+    def __init__(self, candle_store=None, bot_options=None):
+        self.bot = None
+        self.bot_options = bot_options or {}
+        self.scheduler = None
+        self.kline_stream = None
+        self.candle_store = candle_store or CandleStore()
+        self.running_cycles = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def api(self):
+        return self.bot.api if self.bot else None
+
+    def add_listener(self, callback):
+        """Register callback(event, data) for the events of the bot, including one created later"""
+        self.listeners.append(callback)
+        if self.bot:
+            self.bot.add_listener(callback)
+
+    def start(self, strategy='combined', test_mode=True, symbols=None, symbol='BTCUSDT', interval='15m',
+              feed='stream', intrabar=False, strategy_params=None, max_workers=8):
+        symbols = symbols if symbols is not None else [symbol]
+        with self._lock:
+            if not self.bot:
+                self.bot = TradingBot(strategy=strategy, test_mode=test_mode, strategy_params=strategy_params,
+                                      intrabar=intrabar, **self.bot_options)
+                for callback in self.listeners:
+                    self.bot.add_listener(callback)
+                self.bot.add_listener(self._on_bot_event)
+
+            bot = self.bot
+            if bot.is_running:
+                return {'success': False, 'message': 'Bot is already running'}
+
+            bot.start()
+            if feed == 'stream':
+                if not self.kline_stream:
+                    self.kline_stream = KlineStream(bot.api, on_candle=bot.evaluate, on_ticker=bot.api.prices.update,
+                                                    evaluate_on='tick' if bot.intrabar else 'close',
+                                                    store=self.candle_store)
+                for symbol in symbols:
+                    self.kline_stream.subscribe(symbol, interval)
+                    # Higher timeframes come from the same per-symbol 1m stream
+                    for timeframe in bot.strategy.timeframes:
+                        self.kline_stream.subscribe(symbol, timeframe, notify=False)
+                bot.candle_source = self.kline_stream.get_candles
+                # Keep prices of open positions on pairs that are not being watched live as well
+                for symbol in set(bot.positions) - set(symbols):
+                    self.kline_stream.subscribe_ticker(symbol)
+                self.kline_stream.start()
+            else:
+                if not self.scheduler:
+                    self.scheduler = CycleScheduler(bot, max_workers=int(max_workers))
+                for symbol in symbols:
+                    self.scheduler.add(symbol, interval, run_now=True)
+                self.scheduler.start()
+
+            for symbol in symbols:
+                self.running_cycles[f"{symbol}_{interval}"] = True
+        return {'success': True, 'message': 'Bot started successfully'}
+
+    def stop(self):
+        with self._lock:
+            bot = self.bot
+            if not bot or not bot.is_running:
+                return {'success': False, 'message': 'Bot is not running'}
+            bot.stop()
+            if self.kline_stream:
+                self.kline_stream.stop()
+                self.kline_stream = None
+                bot.candle_source = None
+            if self.scheduler:
+                self.scheduler.stop()
+                self.scheduler = None
+            self.running_cycles.clear()
+        return {'success': True, 'message': 'Bot stopped successfully'}
+
+    def _on_bot_event(self, event, data):
+        # Positions opened while running (e.g. via POST /api/positions) need live prices for their stops
+        kline_stream = self.kline_stream
+        if event == 'position' and data['position'] and kline_stream:
+            kline_stream.subscribe_ticker(data['symbol'])
+
+    # Reads
+
+    def status(self):
+        if not self.bot:
+            return {'is_running': False, 'message': 'Bot not initialized'}
+        return self.bot.get_status()
+
+    def positions(self):
+        return self.bot.get_positions() if self.bot else []
+
+    def statistics(self):
+        if not self.bot:
+            return dict(EMPTY_STATISTICS)
+        return self.bot.get_statistics()
+
+    def config(self):
+        return dict(self.bot.config) if self.bot else dict(DEFAULT_CONFIG)
+
+    def signals(self):
+        return self.bot.get_signals() if self.bot else {}
+
+    def scheduler_metrics(self):
+        scheduler = self.scheduler
+        return {
+            'pairs': list(self.running_cycles),
+            'metrics': scheduler.get_metrics() if scheduler else {}
+        }
+
+    def snapshot(self):
+        """Everything the web tier reads, computed once"""
+        status = self.status()
+        return {
+            'status': status,
+            'positions': status.get('positions', []),
+            'statistics': self.statistics(),
+            'config': self.config(),
+            'signals': self.signals(),
+            'scheduler': self.scheduler_metrics()
+        }
+
+    # Commands
+
+    def update_config(self, changes):
+        if not self.bot:
+            return {'success': False, 'message': 'Bot not initialized'}
+        self.bot.update_config(changes)
+        return {'success': True, 'message': 'Configuration updated'}
+
+    def update_position(self, symbol, stop_loss=None, take_profit=None):
+        if not self.bot:
+            return {'success': False, 'message': 'Bot not initialized'}
+        if not self.bot.update_position(symbol, stop_loss, take_profit):
+            return {'success': False, 'message': 'Position not found'}
+        return {'success': True, 'message': 'Position updated'}
+
+    def create_position(self, symbol, quantity, entry_price):
+        if not self.bot:
+            return {'success': False, 'message': 'Bot not initialized'}
+        try:
+            if self.bot.create_position(symbol, float(quantity), float(entry_price)):
+                return {'success': True, 'message': f'Position created for {symbol}'}
+        except Exception as e:
+            logger.error(f"Error creating position: {e}")
+            return {'success': False, 'message': str(e)}
+
+    def close_position(self, symbol):
+        bot = self.bot
+        if not bot:
+            return {'success': False, 'message': 'Bot not initialized'}
+        if symbol not in bot.positions:
+            return {'success': False, 'message': 'Position not found'}
+        try:
+            current_price = bot.api.prices.get(symbol, max_age=1)
+            if current_price is not None:
+                bot.execute_trade(symbol, 'SELL', current_price, 100)
+                return {'success': True, 'message': f'Position closed for {symbol}'}
+        except Exception as e:
+            logger.error(f"Error closing position: {e}")
+            return {'success': False, 'message': str(e)}
+        return {'success': False, 'message': f'No current price for {symbol}'}
+
+    def screen(self, symbols=None, interval='15m', limit=100):
+        if not self.bot:
+            return {'signals': {}, 'message': 'Bot not initialized'}
+        symbols = symbols or self.bot.api.get_trading_symbols('USDT')
+        results = self.bot.screen(symbols, interval, limit)
+        return {
+            'interval': interval,
+            'signals': {
+                symbol: {'signal': signal, 'confidence': confidence}
+                for symbol, (signal, confidence) in results.items()
+            }
+        }
+
+    def metrics(self, format='text', **labels):
+        return REGISTRY.summary() if format == 'json' else REGISTRY.render(**labels)
+
+
+class EngineServer:
+    """Runs an Engine for web workers in other processes.
+
+    Commands arrive over a local socket (a Unix socket by default) from
+    engine_client.EngineClient, one handler thread per connection; only
+    names in Engine.COMMANDS are accepted. Reads never reach this process:
+    the engine's state is written to a snapshot file every `interval` seconds,
+    and right after each bot event, whenever it changed. Web workers only read
+    that file, so dashboard load does not compete with trading.
+    """
+
+    def __init__(self, engine=None, address=None, snapshot_path=None, interval=1.0, events_kept=100):
+        self.engine = engine or Engine()
+        self.address = address or engine_address()
+        self.snapshot_path = snapshot_path or engine_snapshot_path()
+        self.interval = interval
+        self.events = deque(maxlen=events_kept)
+        # Keeps increasing across restarts, so clients never mistake new events for ones they have seen
+        self._sequence = itertools.count(time.time_ns() // 1000)
+        self._last_written = None
+        self._listener = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.engine.add_listener(self._on_event)
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        finally:
+            self.close()
+
+    def start(self):
+        family = 'AF_UNIX' if isinstance(self.address, str) else 'AF_INET'
+        if family == 'AF_UNIX':
+            os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        self._listener = Listener(self.address, family=family, authkey=authkey())
+        if family == 'AF_UNIX':
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._snapshot_loop, daemon=True).start()
+        logger.info(f"Engine listening on {self.address}, snapshots in {self.snapshot_path}")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._listener:
+            self._listener.close()
+        # A ShardedEngine also has worker processes to shut down
+        close = getattr(self.engine, 'close', None)
+        if close:
+            close()
+        else:
+            self.engine.stop()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"Error accepting engine connection: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        with connection:
+            while not self._stop.is_set():
+                try:
+                    name, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if name not in Engine.COMMANDS:
+                        raise ValueError(f"Unknown engine command: {name}")
+                    reply = (True, getattr(self.engine, name)(**kwargs))
+                except Exception as e:
+                    logger.error(f"Error running engine command {name}: {e}")
+                    reply = (False, str(e))
+                try:
+                    connection.send(reply)
+                except OSError:
+                    return
+                self._wake.set()
+
+    def _on_event(self, event, data):
+        if event == 'trade':
+            self.events.append([next(self._sequence), event, data])
+        self._wake.set()
+
+    def _snapshot_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Error writing engine snapshot: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def write_snapshot(self):
+        snapshot = self.engine.snapshot()
+        snapshot['events'] = list(self.events)
+        data = json.dumps(snapshot, default=str)
+        if data == self._last_written:
+            return
+        # Readers only ever see a whole file: write a temporary one and rename it over the old one
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.snapshot_path)
+        self._last_written = data
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    engine = None
+    shards = int(os.getenv('ENGINE_SHARDS', 1))
+    if shards > 1:
+        from sharding import ShardedEngine
+        engine = ShardedEngine(shards)
+    EngineServer(engine, interval=float(os.getenv('ENGINE_SNAPSHOT_INTERVAL', 1))).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import os
+import json
+import threading
+import logging
+from multiprocessing.connection import Client
+from config import DEFAULT_CONFIG
+from engine import EMPTY_STATISTICS, engine_address, engine_snapshot_path, authkey
+
+logger = logging.getLogger(__name__)
+
+
+class EngineError(Exception):
+    """The engine process is unreachable or failed to run a command"""
+
+
+class EngineClient:
+    """Web-tier side of an Engine running in another process (see engine.EngineServer).
+
+    It has the same methods as Engine. Commands go over the engine's local
+    socket, on one connection per thread. Reads come from the snapshot file
+    the engine keeps up to date; it is parsed again only after it has been
+    replaced, so any number of requests and web workers can read it without
+    reaching the engine.
+    """
+
+    api = None
+
+    def __init__(self, address=None, snapshot_path=None):
+        self.address = address or engine_address()
+        self.snapshot_path = snapshot_path or engine_snapshot_path()
+        self._local = threading.local()
+        self._snapshot = (None, None)
+        self._last_event = None
+        self._lock = threading.Lock()
+
+    def call(self, name, **kwargs):
+        """Run an engine command and return its result; reconnects once if the connection was lost"""
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.send((name, kwargs))
+                ok, result = connection.recv()
+                break
+            except (EOFError, OSError) as e:
+                self._local.connection = None
+                if attempt:
+                    raise EngineError(f"Engine connection lost: {e}")
+        if not ok:
+            raise EngineError(result)
+        return result
+
+    def start(self, **params):
+        return self.call('start', **params)
+
+    def stop(self):
+        return self.call('stop')
+
+    def update_config(self, changes):
+        return self.call('update_config', changes=changes)
+
+    def update_position(self, symbol, stop_loss=None, take_profit=None):
+        return self.call('update_position', symbol=symbol, stop_loss=stop_loss, take_profit=take_profit)
+
+    def create_position(self, symbol, quantity, entry_price):
+        return self.call('create_position', symbol=symbol, quantity=quantity, entry_price=entry_price)
+
+    def close_position(self, symbol):
+        return self.call('close_position', symbol=symbol)
+
+    def screen(self, symbols=None, interval='15m', limit=100):
+        return self.call('screen', symbols=symbols, interval=interval, limit=limit)
+
+    def metrics(self, format='text'):
+        return self.call('metrics', format=format)
+
+    # Reads, served from the snapshot file
+
+    def snapshot(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return _offline_snapshot()
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached_version, snapshot = self._snapshot
+        if version != cached_version:
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading engine snapshot: {e}")
+                return snapshot or _offline_snapshot()
+            self._snapshot = (version, snapshot)
+        return snapshot
+
+    def status(self):
+        return self.snapshot()['status']
+
+    def positions(self):
+        return self.snapshot()['positions']
+
+    def statistics(self):
+        return self.snapshot()['statistics']
+
+    def config(self):
+        return self.snapshot()['config']
+
+    def signals(self):
+        return self.snapshot()['signals']
+
+    def scheduler_metrics(self):
+        return self.snapshot()['scheduler']
+
+    def new_events(self):
+        """Bot events (trades) published since the previous call, as [(event, data)]"""
+        events = self.snapshot().get('events', [])
+        with self._lock:
+            last = self._last_event
+            if events:
+                self._last_event = events[-1][0]
+            if last is None:
+                # Only events that happen from now on; the status already shows earlier trades
+                self._last_event = self._last_event or 0
+                return []
+        return [(event, data) for sequence, event, data in events if sequence > last]
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            family = 'AF_UNIX' if isinstance(self.address, str) else 'AF_INET'
+            try:
+                connection = Client(self.address, family=family, authkey=authkey())
+            except OSError as e:
+                raise EngineError(f"Engine not reachable at {self.address}: {e}")
+            self._local.connection = connection
+        return connection
+
+
+def _offline_snapshot():
+    return {
+        'status': {'is_running': False, 'message': 'Engine not running'},
+        'positions': [],
+        'statistics': dict(EMPTY_STATISTICS),
+        'config': dict(DEFAULT_CONFIG),
+        'signals': {},
+        'scheduler': {'pairs': [], 'metrics': {}},
+        'events': []
+    }
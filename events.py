@@ -0,0 +1,105 @@
+import json
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroadcaster:
+    """Fans dashboard updates out to Server-Sent Events clients.
+
+    State events (status, positions, statistics) come from one `snapshot`
+    call per interval, made only while someone is connected, and are sent
+    only when their payload changed. The exchange is therefore queried once
+    per interval no matter how many browsers are open. Bot events such as
+    trades are pushed as they happen and trigger an immediate snapshot.
+    """
+
+    def __init__(self, snapshot, interval=3.0, keepalive=15.0, queue_size=100):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        client = queue.Queue(self.queue_size)
+        with self._lock:
+            for message in self._latest.values():
+                client.put_nowait(message)
+            self._subscribers.add(client)
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+                self._thread.start()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._subscribers.discard(client)
+
+    def publish(self, event, data):
+        self._send(event, _format(event, data))
+
+    def notify(self, event, data):
+        """Listener for bot events: push the event and refresh state right away"""
+        self.publish(event, data)
+        self.refresh()
+
+    def refresh(self):
+        self._wake.set()
+
+    def stream(self, client):
+        """SSE response body for one subscribed client"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    yield client.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(client)
+
+    def _send(self, event, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for client in subscribers:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # A slow client loses its oldest update rather than holding up everyone else
+                try:
+                    client.get_nowait()
+                    client.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _snapshot_loop(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                for event, data in self.snapshot().items():
+                    message = _format(event, data)
+                    if self._latest.get(event) != message:
+                        self._latest[event] = message
+                        self._send(event, message)
+            except Exception as e:
+                logger.error(f"Error building live update: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def _format(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
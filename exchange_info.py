@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import threading
+import logging
+from decimal import Decimal
+from order_sizing import OrderSizer
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolFilters:
+    """Numeric trading rules for one symbol, parsed once from its exchange info entry.
+
+    Sizes, prices and notionals are exact Decimals made from the raw filter
+    strings; the symbol's OrderSizer is built from them, so both always agree.
+    """
+
+    __slots__ = ('symbol', 'status', 'base_asset', 'quote_asset',
+                 'min_qty', 'max_qty', 'step_size',
+                 'min_price', 'max_price', 'tick_size',
+                 'min_notional', 'sizer', 'raw')
+
+    def __init__(self, info):
+        filters = {f['filterType']: f for f in info.get('filters', [])}
+        lot_size = filters.get('LOT_SIZE', {})
+        price_filter = filters.get('PRICE_FILTER', {})
+        notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+
+        self.symbol = info['symbol']
+        self.status = info.get('status')
+        self.base_asset = info.get('baseAsset')
+        self.quote_asset = info.get('quoteAsset')
+        self.min_qty = Decimal(lot_size.get('minQty', '0'))
+        self.max_qty = Decimal(lot_size.get('maxQty', '0'))
+        self.step_size = Decimal(lot_size.get('stepSize', '0')).normalize()
+        self.min_price = Decimal(price_filter.get('minPrice', '0'))
+        self.max_price = Decimal(price_filter.get('maxPrice', '0'))
+        self.tick_size = Decimal(price_filter.get('tickSize', '0')).normalize()
+        self.min_notional = Decimal(notional.get('minNotional', '0'))
+        self.raw = info
+        self.sizer = OrderSizer(self)
+
+
+class ExchangeInfoCache:
+    """TTL cache of the exchange info payload, indexed by symbol.
+
+    Reads never block on the network once data is loaded: an expired entry is
+    served while a refresh runs in the background. The last payload is kept in
+    an on-disk snapshot so a cold start has symbol rules before the first
+    download completes.
+    """
+
+    def __init__(self, fetch, ttl=3600, snapshot_path=None, retry_delay=30):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.retry_delay = retry_delay
+        self.symbols = {}
+        self.filters = {}
+        self.updated_at = 0.0
+        self._next_background_refresh = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._refresh_thread = None
+        self._stop = threading.Event()
+
+        self._load_snapshot()
+
+    @property
+    def expired(self):
+        return time.time() - self.updated_at > self.ttl
+
+    def get(self, symbol):
+        self._ensure_fresh()
+        return self.symbols.get(symbol)
+
+    def get_filters(self, symbol):
+        self._ensure_fresh()
+        return self.filters.get(symbol)
+
+    def list_symbols(self, quote_asset=None, status='TRADING'):
+        self._ensure_fresh()
+        return [
+            f.symbol for f in self.filters.values()
+            if (status is None or f.status == status) and (quote_asset is None or f.quote_asset == quote_asset)
+        ]
+
+    def refresh(self, force=True):
+        """Download and index the exchange info; returns False if the download failed"""
+        with self._refreshing:
+            if not force and self.symbols and not self.expired:
+                return True
+            exchange_info = self.fetch()
+            if not exchange_info:
+                return False
+            self._index(exchange_info['symbols'], time.time())
+            self._save_snapshot(exchange_info)
+            return True
+
+    def start(self, interval=None):
+        """Refresh periodically in a background thread"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._stop.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, args=(interval or self.ttl,), daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _ensure_fresh(self):
+        if not self.symbols:
+            self.refresh(force=False)
+        elif self.expired and time.time() >= self._next_background_refresh and not self._refreshing.locked():
+            self._next_background_refresh = time.time() + self.retry_delay
+            threading.Thread(target=self._refresh_quietly, daemon=True).start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh(force=False)
+        except Exception as e:
+            logger.error(f"Error refreshing exchange info: {e}")
+
+    def _refresh_loop(self, interval):
+        while not self._stop.is_set():
+            if self.expired:
+                self._refresh_quietly()
+            self._stop.wait(min(interval, max(self.ttl - (time.time() - self.updated_at), 1)))
+
+    def _index(self, symbols, updated_at):
+        index = {s['symbol']: s for s in symbols}
+        filters = {s['symbol']: SymbolFilters(s) for s in symbols}
+        with self._lock:
+            self.symbols = index
+            self.filters = filters
+            self.updated_at = updated_at
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self._index(snapshot['exchange_info']['symbols'], snapshot['updated_at'])
+            logger.info(f"Loaded {len(self.symbols)} symbols from exchange info snapshot")
+        except Exception as e:
+            logger.error(f"Error loading exchange info snapshot: {e}")
+
+    def _save_snapshot(self, exchange_info):
+        if not self.snapshot_path:
+            return
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated_at': self.updated_at, 'exchange_info': exchange_info}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Error saving exchange info snapshot: {e}")
@@ -0,0 +1,505 @@
+import time
+import bisect
+import random
+import threading
+import logging
+from decimal import Decimal
+import numpy as np
+from candles import Candles, interval_seconds, candle_open_time
+from resampler import resample, bucket_open_time
+from exchange_info import ExchangeInfoCache
+from price_cache import PriceCache
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedClock:
+    """Virtual time (seconds) for replays.
+
+    It only moves when advanced. With a speed factor, advancing also sleeps
+    seconds / speed of real time, so speed=600 plays ten minutes per second.
+    Without one, replays run as fast as the bot can keep up.
+    """
+
+    def __init__(self, start=0.0, speed=None):
+        self.now = float(start)
+        self.speed = speed
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        if self.speed:
+            time.sleep(seconds / self.speed)
+        self.now += seconds
+
+
+class _PricePath:
+    """Intrabar price path of one symbol's replayed candles.
+
+    Within each candle the price moves in straight lines open -> low -> high ->
+    close when it closed up, and open -> high -> low -> close when it closed
+    down. This is the usual backtest convention: it touches every extreme and
+    is deterministic.
+    """
+
+    def __init__(self, candles):
+        self.open_time = candles.open_time.astype(np.int64)
+        self.open = candles.open.astype(np.float64)
+        self.high = candles.high.astype(np.float64)
+        self.low = candles.low.astype(np.float64)
+        self.close = candles.close.astype(np.float64)
+        self.volume = candles.volume.astype(np.float64)
+        self.interval_ms = int(np.min(np.diff(self.open_time))) if len(self.open_time) > 1 else 60000
+        self.end_time = int(self.open_time[-1]) + self.interval_ms
+
+    def locate(self, t):
+        """(candle index, fraction of it elapsed) at time t (ms), clamped to the replayed range"""
+        if t >= self.end_time:
+            return len(self.open_time) - 1, 1.0
+        i = max(int(np.searchsorted(self.open_time, t, side='right')) - 1, 0)
+        return i, min(max((t - self.open_time[i]) / self.interval_ms, 0.0), 1.0)
+
+    def vertices(self, i):
+        if self.close[i] >= self.open[i]:
+            return self.open[i], self.low[i], self.high[i], self.close[i]
+        return self.open[i], self.high[i], self.low[i], self.close[i]
+
+    def price_at(self, t):
+        i, fraction = self.locate(t)
+        points = self.vertices(i)
+        x = fraction * 3
+        k = min(int(x), 2)
+        return float(points[k] + (points[k + 1] - points[k]) * (x - k))
+
+    def range(self, t0, t1):
+        """(low, high) of the path between t0 and t1"""
+        values = [self.price_at(t0), self.price_at(t1)]
+        i0, _ = self.locate(t0)
+        i1, _ = self.locate(t1)
+        for i in {i0, i1}:
+            points = self.vertices(i)
+            for k in (1, 2):
+                if t0 < self.open_time[i] + k * self.interval_ms / 3 < t1:
+                    values.append(points[k])
+        if i1 - i0 > 1:
+            values.append(self.low[i0 + 1:i1].min())
+            values.append(self.high[i0 + 1:i1].max())
+        return float(min(values)), float(max(values))
+
+    def forming(self, i, t):
+        """The candle i as the exchange would report it at time t, before it has closed"""
+        low, high = self.range(int(self.open_time[i]), t)
+        _, fraction = self.locate(t)
+        return self.open[i], high, low, self.price_at(t), self.volume[i] * fraction
+
+
+class SimulatedExchange:
+    """Local matching engine behind the BinanceAPI interface, replaying historical candles.
+
+    Prices follow each symbol's candles (see _PricePath) on a SimulatedClock.
+    Market orders fill at the price `latency` seconds after submission, moved
+    against the taker by `slippage`. When an order book snapshot is loaded
+    for that moment, they instead walk its levels. Limit orders rest, with
+    their funds locked, until the path crosses their price. Fees are charged
+    in the quote asset, taker for market orders and maker for resting fills.
+    The same candles, settings and seed always produce the same fills.
+
+    `run(bot, interval)` replays the whole range through a TradingBot built
+    with `api=exchange, clock=exchange.clock`.
+    """
+
+    simulated = True
+
+    def __init__(self, candles, balances=None, exchange_info=None, fee_rate=0.001, maker_fee_rate=None,
+                 slippage=0.0005, latency=0.0, latency_jitter=0.0, order_books=None, start_time=None,
+                 speed=None, seed=0, quote_asset='USDT'):
+        self._paths = {symbol: _PricePath(Candles.from_klines(c)) for symbol, c in candles.items() if len(c)}
+        if not self._paths:
+            raise ValueError("SimulatedExchange needs candles for at least one symbol")
+        self.base_interval_ms = min(path.interval_ms for path in self._paths.values())
+        self.end_time = max(path.end_time for path in self._paths.values())
+        first = min(int(path.open_time[0]) for path in self._paths.values())
+
+        self.clock = SimulatedClock((start_time if start_time is not None else first) / 1000, speed)
+        self.quote_asset = quote_asset
+        self.fee_rate = fee_rate
+        self.maker_fee_rate = fee_rate if maker_fee_rate is None else maker_fee_rate
+        self.slippage = slippage
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.balances = {asset: [float(free), 0.0] for asset, free in (balances or {quote_asset: 10000.0}).items()}
+        self.order_books = {symbol: sorted(books, key=lambda b: b[0]) for symbol, books in (order_books or {}).items()}
+        self.open_orders = {}
+        self.fills = []
+        self.fees_paid = 0.0
+        self._order_ids = iter(range(1, 1 << 62))
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+
+        self._symbol_info = {
+            symbol: info for symbol, info in
+            ((s['symbol'], s) for s in (exchange_info or {}).get('symbols', []))
+            if symbol in self._paths
+        }
+        for symbol in self._paths:
+            self._symbol_info.setdefault(symbol, default_symbol_info(symbol, quote_asset))
+        self.exchange_info = ExchangeInfoCache(self.get_exchange_info, ttl=float('inf'))
+        self.prices = PriceCache(self.get_symbol_tickers)
+
+    @classmethod
+    def from_store(cls, store, symbols, interval='1m', start_time=None, end_time=None, **kwargs):
+        """Replay candles from a CandleStore"""
+        return cls({symbol: store.read(symbol, interval, start_time, end_time) for symbol in symbols}, **kwargs)
+
+    @property
+    def now_ms(self):
+        return int(round(self.clock.time() * 1000))
+
+    # BinanceAPI interface
+
+    def get_account_info(self):
+        with self._lock:
+            return {
+                'canTrade': True,
+                'updateTime': self.now_ms,
+                'balances': [{'asset': asset, 'free': _fmt(free), 'locked': _fmt(locked)}
+                             for asset, (free, locked) in self.balances.items()]
+            }
+
+    def get_balance(self, symbol='USDT'):
+        with self._lock:
+            return self.balances.get(symbol, [0.0, 0.0])[0]
+
+    def get_symbol_ticker(self, symbol):
+        if symbol not in self._paths:
+            logger.error(f"Error getting ticker for {symbol}: unknown symbol")
+            return None
+        return {'symbol': symbol, 'price': _fmt(self.current_price(symbol))}
+
+    def get_symbol_tickers(self, symbols=None):
+        return [self.get_symbol_ticker(symbol) for symbol in (symbols or self._paths) if symbol in self._paths]
+
+    def get_price(self, symbol):
+        return self.prices.get(symbol)
+
+    def get_klines(self, symbol, interval, limit=100, start_time=None, end_time=None):
+        """Candles up to the current simulated time, the last one still forming, in Binance's row format"""
+        path = self._paths.get(symbol)
+        if path is None:
+            logger.error(f"Error getting klines for {symbol}: unknown symbol")
+            return []
+        period_ms = interval_seconds(interval) * 1000
+        if period_ms % path.interval_ms:
+            logger.error(f"Error getting klines for {symbol}: {interval} is not a multiple of the replayed candles")
+            return []
+
+        now = min(self.now_ms, path.end_time)
+        if now < path.open_time[0]:
+            return []
+        current, _ = path.locate(now)
+        forming = now < path.end_time
+
+        # Only the base candles that can make up the last `limit` candles, starting on a candle boundary
+        lo = max(current - (limit + 1) * (period_ms // path.interval_ms), 0)
+        lo = int(np.searchsorted(path.open_time, bucket_open_time(int(path.open_time[lo]), interval), side='left'))
+        hi = current if forming else current + 1
+        columns = [getattr(path, name)[lo:hi] for name in ('open_time', 'open', 'high', 'low', 'close', 'volume')]
+        if forming:
+            row = (path.open_time[current],) + path.forming(current, now)
+            columns = [np.append(column, value) for column, value in zip(columns, row)]
+        candles = Candles(*columns, columns[0] + path.interval_ms - 1)
+        if period_ms != path.interval_ms:
+            candles = resample(candles, interval)
+
+        rows = [
+            [int(t), _fmt(o), _fmt(h), _fmt(l), _fmt(c), _fmt(v), int(t) + period_ms - 1, _fmt(v * c), 0, '0', '0', '0']
+            for t, o, h, l, c, v in zip(candles.open_time, candles.open, candles.high, candles.low, candles.close,
+                                        candles.volume)
+            if (start_time is None or t >= start_time) and (end_time is None or t <= end_time)
+        ]
+        return rows[-limit:]
+
+    def place_order(self, symbol, side, quantity, order_type='MARKET', price=None):
+        try:
+            return self._place(symbol, side, float(quantity), order_type, None if price is None else float(price))
+        except SimulatedOrderError as e:
+            logger.error(f"Error placing {side} order for {symbol}: {e}")
+            return None
+
+    def get_open_orders(self, symbol=None):
+        with self._lock:
+            return [dict(order) for order in self.open_orders.values() if symbol is None or order['symbol'] == symbol]
+
+    def cancel_order(self, symbol, order_id):
+        with self._lock:
+            order = self.open_orders.get(order_id)
+            if order is None or order['symbol'] != symbol:
+                logger.error(f"Error canceling order {order_id}: unknown order")
+                return None
+            del self.open_orders[order_id]
+            self._unlock(order)
+            order['status'] = 'CANCELED'
+            return dict(order)
+
+    def get_exchange_info(self):
+        return {'timezone': 'UTC', 'serverTime': self.now_ms, 'symbols': list(self._symbol_info.values())}
+
+    def get_symbol_info(self, symbol):
+        return self.exchange_info.get(symbol)
+
+    def get_symbol_filters(self, symbol):
+        return self.exchange_info.get_filters(symbol)
+
+    def get_order_sizer(self, symbol):
+        symbol_filters = self.get_symbol_filters(symbol)
+        return symbol_filters.sizer if symbol_filters else None
+
+    def get_trading_symbols(self, quote_asset='USDT'):
+        return self.exchange_info.list_symbols(quote_asset=quote_asset)
+
+    # Replay
+
+    def current_price(self, symbol):
+        return self._paths[symbol].price_at(self.now_ms)
+
+    def advance(self, seconds):
+        """Move the clock forward, fill resting limit orders the path crossed and publish the new prices"""
+        start = self.now_ms
+        self.clock.advance(seconds)
+        end = self.now_ms
+        with self._lock:
+            for order in sorted(self.open_orders.values(), key=lambda o: o['orderId']):
+                low, high = self._paths[order['symbol']].range(start, end)
+                limit_price = float(order['price'])
+                if (order['side'] == 'BUY' and low <= limit_price) or (order['side'] == 'SELL' and high >= limit_price):
+                    del self.open_orders[order['orderId']]
+                    self._unlock(order)
+                    self._fill(order, [(limit_price, float(order['origQty']))], self.maker_fee_rate)
+        for symbol in self._paths:
+            self.prices.update(symbol, self.current_price(symbol))
+
+    def run(self, bot, interval='15m', symbols=None, until=None, tick=None, on_cycle=None):
+        """Replay from the current time to `until` (ms, default the end of the data), running
+        bot.run_cycle for every symbol just after each `interval` candle closes.
+
+        Prices are published every `tick` seconds (default one replayed candle), and
+        the protective exits they trigger finish before the clock moves on. The bot's
+        own background threads are not started; the replay drives it directly.
+        """
+        symbols = list(symbols or self._paths)
+        until = min(until or self.end_time, self.end_time)
+        tick = tick or self.base_interval_ms / 1000
+        period = interval_seconds(interval)
+        next_cycle = candle_open_time(self.clock.time(), interval) + period
+        cycles = 0
+
+        was_running = bot.is_running
+        bot.is_running = True
+        started = time.perf_counter()
+        try:
+            while self.now_ms < until:
+                self.advance(min(tick, next_cycle - self.clock.time(), (until - self.now_ms) / 1000))
+                bot.monitor.flush()
+                if self.clock.time() >= next_cycle:
+                    for symbol in symbols:
+                        bot.run_cycle(symbol, interval)
+                    bot.monitor.flush()
+                    next_cycle += period
+                    cycles += 1
+                    if on_cycle:
+                        on_cycle(self)
+        finally:
+            bot.is_running = was_running
+
+        summary = self.summary()
+        summary.update({'cycles': cycles, 'wall_seconds': time.perf_counter() - started})
+        return summary
+
+    def equity(self):
+        """Account value in the quote asset at current prices"""
+        with self._lock:
+            total = 0.0
+            for asset, (free, locked) in self.balances.items():
+                if asset == self.quote_asset:
+                    total += free + locked
+                else:
+                    symbol = asset + self.quote_asset
+                    if symbol in self._paths:
+                        total += (free + locked) * self.current_price(symbol)
+            return total
+
+    def summary(self):
+        with self._lock:
+            return {
+                'time': self.now_ms,
+                'equity': self.equity(),
+                'balances': {asset: free + locked for asset, (free, locked) in self.balances.items()},
+                'orders_filled': len(self.fills),
+                'open_orders': len(self.open_orders),
+                'fees_paid': self.fees_paid
+            }
+
+    def _place(self, symbol, side, quantity, order_type, price):
+        info = self._symbol_info.get(symbol)
+        if info is None or symbol not in self._paths:
+            raise SimulatedOrderError(f"Invalid symbol {symbol}")
+        if side not in ('BUY', 'SELL'):
+            raise SimulatedOrderError(f"Invalid side {side}")
+        sizer = self.get_order_sizer(symbol)
+        if quantity <= 0 or quantity < sizer.min_qty or sizer.floor_quantity(quantity) != Decimal(str(quantity)):
+            raise SimulatedOrderError("Filter failure: LOT_SIZE")
+
+        order = {
+            'symbol': symbol,
+            'orderId': next(self._order_ids),
+            'clientOrderId': f"sim-{self.now_ms}",
+            'transactTime': self.now_ms,
+            'price': _fmt(price or 0),
+            'origQty': _fmt(quantity),
+            'executedQty': '0',
+            'cummulativeQuoteQty': '0',
+            'status': 'NEW',
+            'timeInForce': 'GTC',
+            'type': order_type,
+            'side': side,
+            'fills': []
+        }
+
+        with self._lock:
+            fill_time = self.now_ms + int(self._latency() * 1000)
+            market = self._paths[symbol].price_at(fill_time)
+            if not sizer.is_valid(quantity, price or market):
+                raise SimulatedOrderError("Filter failure: NOTIONAL")
+
+            if order_type == 'MARKET':
+                self._check_funds(symbol, side, quantity, market * (1 + self.slippage))
+                return self._fill(order, self._market_fills(symbol, side, quantity, market, fill_time), self.fee_rate)
+
+            if order_type != 'LIMIT' or price is None:
+                raise SimulatedOrderError(f"Unsupported order type {order_type}")
+            if (side == 'BUY' and price >= market) or (side == 'SELL' and price <= market):
+                # Marketable limit: takes liquidity immediately, never past its limit
+                self._check_funds(symbol, side, quantity, price)
+                fills = [(min(p, price) if side == 'BUY' else max(p, price), q)
+                         for p, q in self._market_fills(symbol, side, quantity, market, fill_time)]
+                return self._fill(order, fills, self.fee_rate)
+
+            self._check_funds(symbol, side, quantity, price)
+            self._lock_funds(order)
+            self.open_orders[order['orderId']] = order
+            return dict(order)
+
+    def _market_fills(self, symbol, side, quantity, price, fill_time):
+        """[(price, qty)] for a market order: walk the latest book snapshot, or the path price plus slippage"""
+        book = self._book_at(symbol, fill_time)
+        if book:
+            levels = book['asks'] if side == 'BUY' else book['bids']
+            fills, remaining = [], quantity
+            for level_price, level_qty in levels:
+                take = min(remaining, float(level_qty))
+                fills.append((float(level_price), take))
+                remaining -= take
+                if remaining <= 0:
+                    return fills
+            if fills:
+                # Deeper than the snapshot: the rest fills at its last level
+                fills.append((fills[-1][0], remaining))
+                return fills
+        return [(price * (1 + self.slippage) if side == 'BUY' else price * (1 - self.slippage), quantity)]
+
+    def _book_at(self, symbol, t):
+        books = self.order_books.get(symbol)
+        if not books:
+            return None
+        i = bisect.bisect_right([b[0] for b in books], t) - 1
+        return books[i][1] if i >= 0 else None
+
+    def _fill(self, order, fills, fee_rate):
+        base, quote = self._assets(order['symbol'])
+        quantity = sum(q for _, q in fills)
+        notional = sum(p * q for p, q in fills)
+        fee = notional * fee_rate
+        if order['side'] == 'BUY':
+            self._credit(quote, -(notional + fee))
+            self._credit(base, quantity)
+        else:
+            self._credit(base, -quantity)
+            self._credit(quote, notional - fee)
+        self.fees_paid += fee
+
+        order.update({
+            'status': 'FILLED',
+            'executedQty': _fmt(quantity),
+            'cummulativeQuoteQty': _fmt(notional),
+            'fills': [{'price': _fmt(p), 'qty': _fmt(q), 'commission': _fmt(p * q * fee_rate),
+                       'commissionAsset': quote} for p, q in fills]
+        })
+        self.fills.append({'time': self.now_ms, 'symbol': order['symbol'], 'side': order['side'],
+                           'quantity': quantity, 'price': notional / quantity, 'fee': fee})
+        return dict(order)
+
+    def _check_funds(self, symbol, side, quantity, price):
+        base, quote = self._assets(symbol)
+        if side == 'BUY':
+            needed, asset = quantity * price * (1 + self.fee_rate), quote
+        else:
+            needed, asset = quantity, base
+        if self.balances.get(asset, [0.0, 0.0])[0] + 1e-12 < needed:
+            raise SimulatedOrderError(f"Account has insufficient balance for requested action ({asset})")
+
+    def _lock_funds(self, order):
+        asset, amount = self._reserved(order)
+        balance = self.balances.setdefault(asset, [0.0, 0.0])
+        balance[0] -= amount
+        balance[1] += amount
+
+    def _unlock(self, order):
+        asset, amount = self._reserved(order)
+        balance = self.balances.setdefault(asset, [0.0, 0.0])
+        balance[0] += amount
+        balance[1] -= amount
+
+    def _reserved(self, order):
+        base, quote = self._assets(order['symbol'])
+        quantity = float(order['origQty'])
+        if order['side'] == 'BUY':
+            return quote, quantity * float(order['price']) * (1 + self.maker_fee_rate)
+        return base, quantity
+
+    def _credit(self, asset, amount):
+        self.balances.setdefault(asset, [0.0, 0.0])[0] += amount
+
+    def _assets(self, symbol):
+        info = self._symbol_info[symbol]
+        return info['baseAsset'], info['quoteAsset']
+
+    def _latency(self):
+        if not self.latency_jitter:
+            return self.latency
+        return max(0.0, self.latency + self._random.uniform(-self.latency_jitter, self.latency_jitter))
+
+
+class SimulatedOrderError(Exception):
+    pass
+
+
+def default_symbol_info(symbol, quote_asset='USDT'):
+    """Exchange info entry with permissive spot-like filters, for symbols replayed without real exchange info"""
+    return {
+        'symbol': symbol,
+        'status': 'TRADING',
+        'baseAsset': symbol[:-len(quote_asset)] if symbol.endswith(quote_asset) else symbol,
+        'quoteAsset': quote_asset,
+        'baseAssetPrecision': 8,
+        'quotePrecision': 8,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001', 'maxPrice': '10000000.00000000', 'tickSize': '0.00000001'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00001000', 'maxQty': '9000000.00000000', 'stepSize': '0.00001000'},
+            {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'}
+        ]
+    }
+
+
+def _fmt(value):
+    return f"{float(value):.8f}"
@@ -0,0 +1,281 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+
+class SMA:
+    """Rolling simple moving average over the last `period` values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self._updates = 0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def value(self):
+        return self.total / self.period if self.ready else None
+
+    def update(self, price):
+        if self.ready:
+            self.total -= self.window[0]
+        self.window.append(price)
+        self.total += price
+
+        # Re-sum once per window so rounding error cannot accumulate
+        self._updates += 1
+        if self._updates >= self.period:
+            self.total = sum(self.window)
+            self._updates = 0
+        return self.value
+
+    def peek(self, price):
+        if len(self.window) < self.period - 1:
+            return None
+        total = self.total + price
+        if self.ready:
+            total -= self.window[0]
+        return total / self.period
+
+
+class EMA:
+    """Exponential moving average seeded with the first value (pandas adjust=False)"""
+
+    def __init__(self, period=None, alpha=None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0
+        self.mean = None
+
+    @property
+    def ready(self):
+        return self.count >= (self.period or 1)
+
+    @property
+    def value(self):
+        return self.mean if self.ready else None
+
+    def update(self, price):
+        if self.mean is None:
+            self.mean = price
+        else:
+            self.mean += self.alpha * (price - self.mean)
+        self.count += 1
+        return self.value
+
+    def peek(self, price):
+        if self.count + 1 < (self.period or 1):
+            return None
+        if self.mean is None:
+            return price
+        return self.mean + self.alpha * (price - self.mean)
+
+
+class WilderRSI:
+    """Relative Strength Index with Wilder smoothing, matching ta.momentum.RSIIndicator"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = EMA(period, alpha=1.0 / period)
+        self.avg_loss = EMA(period, alpha=1.0 / period)
+
+    @property
+    def value(self):
+        if not self.avg_gain.ready:
+            return None
+        return self._rsi(self.avg_gain.mean, self.avg_loss.mean)
+
+    def update(self, price):
+        gain, loss = self._move(price)
+        self.avg_gain.update(gain)
+        self.avg_loss.update(loss)
+        self.prev_close = price
+        return self.value
+
+    def peek(self, price):
+        gain, loss = self._move(price)
+        avg_gain = self.avg_gain.peek(gain)
+        if avg_gain is None:
+            return None
+        return self._rsi(avg_gain, self.avg_loss.peek(loss))
+
+    def _move(self, price):
+        if self.prev_close is None:
+            return 0.0, 0.0
+        diff = price - self.prev_close
+        return max(diff, 0.0), max(-diff, 0.0)
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class RollingStats:
+    """Rolling mean and population standard deviation over the last `period` values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def value(self):
+        if not self.ready:
+            return None
+        return self.mean, max(self.m2 / self.period, 0.0) ** 0.5
+
+    def update(self, price):
+        self.mean, self.m2 = self._step(price)
+        self.window.append(price)
+
+        self._updates += 1
+        if self._updates >= self.period:
+            self._resync()
+        return self.value
+
+    def peek(self, price):
+        if len(self.window) < self.period - 1:
+            return None
+        mean, m2 = self._step(price)
+        return mean, max(m2 / self.period, 0.0) ** 0.5
+
+    def _step(self, price):
+        n = len(self.window)
+        if n < self.period:
+            # Welford insertion while the window is filling up
+            mean = self.mean + (price - self.mean) / (n + 1)
+            return mean, self.m2 + (price - self.mean) * (price - mean)
+
+        oldest = self.window[0]
+        mean = self.mean + (price - oldest) / n
+        return mean, self.m2 + (price - oldest) * (price - mean + oldest - self.mean)
+
+    def _resync(self):
+        n = len(self.window)
+        self.mean = sum(self.window) / n
+        self.m2 = sum((x - self.mean) ** 2 for x in self.window)
+        self._updates = 0
+
+
+class BollingerBands:
+    """Incremental Bollinger Bands, matching ta.volatility.BollingerBands (ddof=0)"""
+
+    def __init__(self, period=20, std_dev=2):
+        self.period = period
+        self.std_dev = std_dev
+        self.stats = RollingStats(period)
+
+    @property
+    def value(self):
+        return self._bands(self.stats.value)
+
+    def update(self, price):
+        self.stats.update(price)
+        return self.value
+
+    def peek(self, price):
+        return self._bands(self.stats.peek(price))
+
+    def _bands(self, stats):
+        if stats is None:
+            return None
+        mean, std = stats
+        return mean + self.std_dev * std, mean, mean - self.std_dev * std
+
+
+class IndicatorState:
+    """Indicators for one symbol/interval, fed once per closed candle in open-time order"""
+
+    def __init__(self, indicators):
+        self.indicators = indicators
+        self.last_open_time = None
+
+    def continues(self, open_times):
+        """Whether the closed candles in open_times overlap what has already been fed"""
+        if self.last_open_time is None:
+            return True
+        if not len(open_times):
+            return False
+        return open_times[0] <= self.last_open_time <= open_times[-1]
+
+    def first_new(self, open_times):
+        """Index of the first candle in open_times that has not been fed yet"""
+        if self.last_open_time is None:
+            return 0
+        return int(np.searchsorted(open_times, self.last_open_time, side='right'))
+
+    def feed(self, open_times, closes):
+        for price in closes:
+            for indicator in self.indicators:
+                indicator.update(price)
+        if len(open_times):
+            self.last_open_time = int(open_times[-1])
+
+
+def sma_series(close, period):
+    """Full simple moving average series; NaN until `period` values are available"""
+    return pd.Series(close).rolling(period).mean().to_numpy()
+
+
+def rsi_series(close, period=14):
+    """Full Wilder RSI series over the whole history, same definition as WilderRSI"""
+    diff = np.diff(close, prepend=close[:1])
+    gains = pd.Series(np.maximum(diff, 0.0))
+    losses = pd.Series(np.maximum(-diff, 0.0))
+    avg_gain = gains.ewm(alpha=1.0 / period, min_periods=period, adjust=False).mean().to_numpy()
+    avg_loss = losses.ewm(alpha=1.0 / period, min_periods=period, adjust=False).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    rsi[np.isnan(avg_gain)] = np.nan
+    return rsi
+
+
+def rsi_last(close, period=14):
+    """Wilder RSI at the last column of a (symbols x candles) matrix, one step per candle across all rows.
+
+    Same result as rsi_series(close)[:, -1] without building the full series.
+    NaN left-padding is skipped; rows with fewer than `period` moves are NaN.
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    alpha = 1.0 / period
+    avg_gain = np.full(len(close), np.nan)
+    avg_loss = np.full(len(close), np.nan)
+    prev = np.full(len(close), np.nan)
+    count = np.zeros(len(close), dtype=np.int64)
+
+    for column in close.T:
+        live = ~np.isnan(column)
+        diff = np.where(np.isnan(prev), 0.0, column - prev)
+        gain = np.maximum(diff, 0.0)
+        loss = np.maximum(-diff, 0.0)
+        first = live & (count == 0)
+        avg_gain = np.where(first, gain, np.where(live, avg_gain + alpha * (gain - avg_gain), avg_gain))
+        avg_loss = np.where(first, loss, np.where(live, avg_loss + alpha * (loss - avg_loss), avg_loss))
+        count += live
+        prev = np.where(live, column, prev)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    rsi[count < period] = np.nan
+    return rsi
+
+
+def bollinger_series(close, period=20, std_dev=2):
+    """Full (upper, middle, lower) band series using the population standard deviation"""
+    rolling = pd.Series(close).rolling(period)
+    middle = rolling.mean().to_numpy()
+    std = rolling.std(ddof=0).to_numpy()
+    return middle + std_dev * std, middle, middle - std_dev * std
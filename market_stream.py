@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import websocket
+from candles import Candles, interval_seconds
+from resampler import Resampler, can_resample
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WS_URL = 'wss://stream.binance.com:9443'
+
+
+class CandleBuffer:
+    """Rolling in-memory candles for one symbol/interval, newest last"""
+
+    def __init__(self, maxlen=500):
+        self.rows = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def last_open_time(self):
+        return self.rows[-1][0] if self.rows else None
+
+    def seed(self, klines):
+        """Merge in candles from REST or a store; rows older than the buffer go in front of it"""
+        if isinstance(klines, Candles):
+            klines = zip(*(getattr(klines, name).tolist() for name in Candles.__slots__))
+        rows = [self._row(kline) for kline in klines]
+        with self.lock:
+            # The stream may have delivered newer candles before a seed finished
+            first_open_time = self.rows[0][0] if self.rows else None
+            if first_open_time is not None:
+                older = [row for row in rows if row[0] < first_open_time]
+                if older:
+                    self.rows = deque(older + list(self.rows), maxlen=self.rows.maxlen)
+                rows = [row for row in rows if row[0] >= first_open_time]
+            for row in rows:
+                self._apply(row)
+
+    def apply(self, row):
+        """Insert or replace a candle row; returns False for rows older than the buffer"""
+        with self.lock:
+            return self._apply(row)
+
+    def candles(self):
+        with self.lock:
+            if not self.rows:
+                return Candles.empty()
+            columns = np.array(self.rows, dtype=np.float64).T.copy()
+        return Candles(
+            columns[0].astype(np.int64), columns[1], columns[2], columns[3],
+            columns[4], columns[5], columns[6].astype(np.int64)
+        )
+
+    def _apply(self, row):
+        last_open_time = self.last_open_time
+        if last_open_time is None or row[0] > last_open_time:
+            self.rows.append(row)
+        elif row[0] == last_open_time:
+            self.rows[-1] = row
+        else:
+            return False
+        return True
+
+    @staticmethod
+    def _row(kline):
+        return [int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]),
+                float(kline[4]), float(kline[5]), int(kline[6])]
+
+
+class KlineStream:
+    """Binance combined kline/ticker stream feeding per symbol/interval candle buffers.
+
+    Buffers are seeded over REST in the background, then kept current from the
+    socket; after a reconnect only the candles since each buffer's last one
+    are fetched. `on_candle(symbol, interval, candles, forming)` fires when a
+    candle closes (once its buffer is seeded), or on every kline update when
+    `evaluate_on='tick'`; forming is False when the last candle is the one
+    that just closed. `on_ticker(symbol, price)` fires for mini-ticker updates
+    of subscribed tickers. With a CandleStore, warm-up reads stored history and
+    only downloads what is missing, and every closed candle is appended to the
+    store.
+
+    Intervals that are multiples of `base_interval` (1m by default; None turns
+    this off) are not streamed themselves. Each symbol gets one base kline
+    stream, and a Resampler builds all of its higher timeframes from it. Their
+    buffers are still seeded over REST.
+    """
+
+    def __init__(self, api, on_candle=None, on_ticker=None, evaluate_on='close', store=None,
+                 base_url=None, buffer_size=500, reconnect_delay=1.0, max_reconnect_delay=60.0, base_interval='1m',
+                 seed_workers=4):
+        self.api = api
+        self.store = store
+        self.on_candle = on_candle
+        self.on_ticker = on_ticker
+        self.evaluate_on = evaluate_on
+        self.base_url = (base_url or os.getenv('BINANCE_WS_URL', DEFAULT_WS_URL)).rstrip('/')
+        self.buffer_size = buffer_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.base_interval = base_interval
+        self.buffers = {}
+        self.resamplers = {}
+        self.quiet = set()
+        # Buffers still being seeded; on_candle waits for their history
+        self.seeding = set()
+        self.tickers = set()
+        self.connected = threading.Event()
+        self.lock = threading.Lock()
+        self._ws = None
+        self._ws_streams = set()
+        self._thread = None
+        self._running = False
+        self._request_id = 0
+        self._seeder = ThreadPoolExecutor(max_workers=seed_workers, thread_name_prefix='kline-seed')
+
+    def subscribe(self, symbol, interval, notify=True):
+        """Keep symbol/interval candles current; with notify=False they are kept for
+        get_candles (e.g. a strategy's higher timeframes) without calling on_candle"""
+        key = (symbol.upper(), interval)
+        with self.lock:
+            if key in self.buffers:
+                if notify:
+                    self.quiet.discard(key)
+                return self.buffers[key]
+            streams = self._kline_streams()
+            buffer = CandleBuffer(self.buffer_size)
+            self.buffers[key] = buffer
+            if not notify:
+                self.quiet.add(key)
+            if self._resampled(interval):
+                self.resamplers.setdefault(key[0], Resampler(base_interval=self.base_interval)).add(interval)
+            new_streams = self._kline_streams() - streams
+            self.seeding.add(key)
+
+        # Seeding is REST (and disk) work; the caller does not wait for it
+        self._seeder.submit(self._seed, key, buffer)
+        if new_streams:
+            self._send_subscription('SUBSCRIBE', sorted(new_streams))
+        return buffer
+
+    def unsubscribe(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self.lock:
+            streams = self._kline_streams()
+            if self.buffers.pop(key, None) is None:
+                return
+            self.quiet.discard(key)
+            resampler = self.resamplers.get(key[0])
+            if resampler and self._resampled(interval):
+                resampler.remove(interval)
+                if not resampler.intervals:
+                    del self.resamplers[key[0]]
+            gone = streams - self._kline_streams()
+        if gone:
+            self._send_subscription('UNSUBSCRIBE', sorted(gone))
+
+    def subscribe_ticker(self, symbol):
+        symbol = symbol.upper()
+        with self.lock:
+            if symbol in self.tickers:
+                return
+            self.tickers.add(symbol)
+        self._send_subscription('SUBSCRIBE', [self._ticker_stream(symbol)])
+
+    def get_candles(self, symbol, interval):
+        buffer = self.buffers.get((symbol.upper(), interval))
+        return buffer.candles() if buffer else None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._ws:
+            self._ws.close()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.connected.clear()
+
+    def _run(self):
+        delay = self.reconnect_delay
+        first_connect = True
+        while self._running:
+            streams = self._streams()
+            if not streams:
+                time.sleep(0.1)
+                continue
+
+            if not first_connect:
+                # Anything that closed while we were disconnected is only available over REST
+                list(self._seeder.map(lambda item: self._backfill(*item), list(self.buffers.items())))
+            first_connect = False
+
+            started = time.monotonic()
+            self._ws_streams = set(streams)
+            self._ws = websocket.WebSocketApp(
+                f"{self.base_url}/stream?streams={'/'.join(streams)}",
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self._ws.run_forever(ping_interval=30, ping_timeout=10)
+            self.connected.clear()
+
+            if not self._running:
+                break
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            logger.warning(f"Kline stream disconnected, reconnecting in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _streams(self):
+        with self.lock:
+            return sorted(self._kline_streams()) + [self._ticker_stream(symbol) for symbol in self.tickers]
+
+    def _kline_streams(self):
+        return {
+            self._kline_stream(symbol, self.base_interval if self._resampled(interval) else interval)
+            for symbol, interval in self.buffers
+        }
+
+    def _resampled(self, interval):
+        return self.base_interval is not None and can_resample(interval, self.base_interval)
+
+    def _seed(self, key, buffer):
+        symbol, interval = key
+        limit = self.buffer_size
+        try:
+            if self.store:
+                period_ms = interval_seconds(interval) * 1000
+                self.store.backfill(self.api, symbol, interval, int(time.time() * 1000) - limit * period_ms)
+                buffer.seed(self.store.read(symbol, interval, limit=limit))
+                # Stored history is closed candles only; fetch the one still forming
+                limit = 2
+
+            klines = self.api.get_klines(symbol, interval, limit=limit)
+            if klines:
+                buffer.seed(klines)
+                self._prime(symbol, interval, klines)
+            else:
+                logger.warning(f"Could not seed candle buffer for {symbol} {interval}")
+        except Exception as e:
+            logger.error(f"Error seeding candle buffer for {symbol} {interval}: {e}")
+        finally:
+            self.seeding.discard(key)
+
+    def _backfill(self, key, buffer):
+        """After a reconnect, fetch only the candles from buffer's last one (forming when the stream dropped) on"""
+        symbol, interval = key
+        last_open_time = buffer.last_open_time
+        now_ms = int(time.time() * 1000)
+        period_ms = interval_seconds(interval) * 1000
+        if last_open_time is None or now_ms - last_open_time >= self.buffer_size * period_ms:
+            return self._seed(key, buffer)
+        try:
+            klines = self.api.get_klines(symbol, interval, limit=(now_ms - last_open_time) // period_ms + 1,
+                                         start_time=last_open_time)
+            if not klines:
+                return
+            buffer.seed(klines)
+            if self.store:
+                self.store.append(symbol, interval, [kline for kline in klines if int(kline[6]) < now_ms])
+            self._prime(symbol, interval, klines)
+        except Exception as e:
+            logger.error(f"Error backfilling candle buffer for {symbol} {interval}: {e}")
+
+    def _prime(self, symbol, interval, klines):
+        resampler = self.resamplers.get(symbol)
+        if resampler and interval in resampler.intervals:
+            # Continue the forming candle from the base candle forming inside it
+            base = self.api.get_klines(symbol, self.base_interval, limit=1)
+            if base:
+                resampler.prime(interval, CandleBuffer._row(klines[-1]), CandleBuffer._row(base[-1]))
+
+    def _send_subscription(self, method, params):
+        if not self.connected.is_set():
+            return
+        self._request_id += 1
+        try:
+            self._ws.send(json.dumps({'method': method, 'params': params, 'id': self._request_id}))
+        except Exception as e:
+            logger.error(f"Error sending {method} for {params}: {e}")
+
+    def _on_open(self, ws):
+        self.connected.set()
+        missed = [stream for stream in self._streams() if stream not in self._ws_streams]
+        if missed:
+            self._send_subscription('SUBSCRIBE', missed)
+        logger.info(f"Kline stream connected ({len(self.buffers)} kline, {len(self.tickers)} ticker streams)")
+
+    def _on_message(self, ws, message):
+        try:
+            payload = json.loads(message)
+            event = payload.get('data', payload)
+            event_type = event.get('e') if isinstance(event, dict) else None
+            if event_type == 'kline':
+                self._handle_kline(event)
+            elif event_type == '24hrMiniTicker':
+                if self.on_ticker:
+                    self.on_ticker(event['s'], float(event['c']))
+        except Exception as e:
+            logger.error(f"Error handling stream message: {e}")
+
+    def _handle_kline(self, event):
+        k = event['k']
+        key = (k['s'], k['i'])
+        row = [int(k['t']), float(k['o']), float(k['h']), float(k['l']),
+               float(k['c']), float(k['v']), int(k['T'])]
+        resampler = self.resamplers.get(key[0]) if key[1] == self.base_interval else None
+
+        buffer = self.buffers.get(key)
+        if buffer is not None and not buffer.apply(row):
+            return
+        if buffer is None and resampler is None:
+            return
+
+        if self.on_ticker:
+            self.on_ticker(key[0], row[4])
+        if buffer is not None:
+            self._candle_updated(key, buffer, row, k['x'])
+        if resampler is not None:
+            for interval, resampled_row, closed in resampler.update(row, k['x']):
+                resampled_key = (key[0], interval)
+                resampled_buffer = self.buffers.get(resampled_key)
+                if resampled_buffer is not None and resampled_buffer.apply(resampled_row):
+                    self._candle_updated(resampled_key, resampled_buffer, resampled_row, closed)
+
+    def _candle_updated(self, key, buffer, row, closed):
+        if closed and self.store:
+            self.store.append(key[0], key[1], [row])
+        if self.on_candle and key not in self.quiet and key not in self.seeding and (closed or self.evaluate_on == 'tick'):
+            self.on_candle(key[0], key[1], buffer.candles(), forming=not closed)
+
+    def _on_error(self, ws, error):
+        logger.error(f"Kline stream error: {error}")
+
+    def _on_close(self, ws, status_code, message):
+        self.connected.clear()
+
+    @staticmethod
+    def _kline_stream(symbol, interval):
+        return f"{symbol.lower()}@kline_{interval}"
+
+    @staticmethod
+    def _ticker_stream(symbol):
+        return f"{symbol.lower()}@miniTicker"
@@ -0,0 +1,224 @@
+import os
+import time
+import threading
+import functools
+
+ENABLED = os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+# Seconds; spans a sub-millisecond strategy pass up to a slow REST call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels) if ENABLED else _NOOP_TIMER
+
+    def quantile(self, q, **labels):
+        """Approximate quantile by linear interpolation inside the bucket that holds it"""
+        with self._lock:
+            series = self.series.get(tuple(sorted(labels.items())))
+            if not series:
+                return None
+            counts = list(series[0])
+        total = sum(counts)
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for count, upper in zip(counts, self.buckets + (float('inf'),)):
+            if count and cumulative + count >= rank:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = upper
+        return lower
+
+    def render(self, extra=()):
+        lines = []
+        with self._lock:
+            items = [(extra + key, list(series[0]), series[1]) for key, series in self.series.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for count, bound in zip(counts, self.buckets + (float('inf'),)):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+    def summary(self):
+        with self._lock:
+            keys = list(self.series)
+        result = []
+        for key in keys:
+            labels = dict(key)
+            counts, total = self.series[key]
+            count = sum(counts)
+            result.append({
+                'labels': labels,
+                'count': count,
+                'mean': total / count if count else 0,
+                'p50': self.quantile(0.5, **labels),
+                'p99': self.quantile(0.99, **labels)
+            })
+        return result
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.series[key] = self.series.get(key, 0) + value
+
+    def render(self, extra=()):
+        with self._lock:
+            return [f"{self.name}{_labels(extra + key)} {value}" for key, value in self.series.items()]
+
+    def summary(self):
+        with self._lock:
+            return [{'labels': dict(key), 'value': value} for key, value in self.series.items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def counter(self, name, help=''):
+        return self._get(Counter, name, help)
+
+    def render(self, **labels):
+        """All metrics in the Prometheus text exposition format; labels are added to every series"""
+        extra = tuple(sorted(labels.items()))
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render(extra))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        return {name: metric.summary() for name, metric in list(self.metrics.items())}
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+
+REGISTRY = Registry()
+
+
+def histogram(name, help='', buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help, buckets)
+
+
+def counter(name, help=''):
+    return REGISTRY.counter(name, help)
+
+
+def timed(name, help='', **labels):
+    """Decorator recording each call's duration in histogram `name`; returns the function untouched when disabled"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        metric = histogram(name, help)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+def timer(name, help='', **labels):
+    """Context manager recording the duration of its block in histogram `name`"""
+    if not ENABLED:
+        return _NOOP_TIMER
+    return histogram(name, help).time(**labels)
+
+
+def observe(name, value, help='', **labels):
+    if ENABLED:
+        histogram(name, help).observe(value, **labels)
+
+
+def inc(name, value=1, help='', **labels):
+    if ENABLED:
+        counter(name, help).inc(value, **labels)
+
+
+class _Timer:
+    __slots__ = ('metric', 'labels', 'started')
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def _labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in key) + '}'
@@ -0,0 +1,159 @@
+import os
+import csv
+import json
+import random
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from candles import Candles
+from strategies import create_strategy
+from backtest import run_backtest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRIDS = {
+    'sma': {
+        'short_period': [5, 10, 15, 20, 30],
+        'long_period': [30, 50, 75, 100, 150, 200]
+    },
+    'rsi': {
+        'period': [7, 10, 14, 21, 28],
+        'oversold': [20, 25, 30, 35],
+        'overbought': [65, 70, 75, 80]
+    },
+    'bollinger': {
+        'period': [10, 15, 20, 30, 50],
+        'std_dev': [1.5, 2, 2.5, 3]
+    },
+    'combined': {
+        'sma.short_period': [10, 20, 30],
+        'sma.long_period': [50, 100],
+        'rsi.period': [14, 21],
+        'rsi.oversold': [25, 30],
+        'rsi.overbought': [70, 75],
+        'bollinger.period': [20, 30],
+        'bollinger.std_dev': [2, 2.5]
+    }
+}
+
+_COLUMNS = Candles.__slots__
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+
+def optimize(strategy_name, candles, grid=None, samples=None, config=None, metric='total_profit',
+             workers=None, results_path=None, seed=None, **backtest_kwargs):
+    """Backtest every parameter combination of grid (or `samples` random ones) across a process pool.
+
+    The candle columns are placed in one shared memory block that every worker
+    maps once, so tasks only carry their parameter dict. Returns the results
+    ranked best first by `metric`, and writes them to results_path (.csv or .json).
+    """
+    combinations = parameter_combinations(strategy_name, grid, samples, seed)
+    if not combinations:
+        return []
+
+    data = np.vstack([getattr(candles, name).astype(np.float64) for name in _COLUMNS])
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        workers = workers or os.cpu_count()
+        chunksize = max(1, len(combinations) // (workers * 8))
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shm.name, data.shape, strategy_name, config, backtest_kwargs)
+        ) as executor:
+            results = list(executor.map(_evaluate, combinations, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: r['statistics'][metric], reverse=True)
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+
+    if results_path:
+        write_results(results, results_path)
+    logger.info(f"Evaluated {len(results)} parameter sets for {strategy_name}")
+    return results
+
+
+def parameter_combinations(strategy_name, grid=None, samples=None, seed=None):
+    grid = grid or DEFAULT_GRIDS[strategy_name]
+    names = list(grid)
+    combinations = [
+        dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))
+    ]
+    combinations = [params for params in combinations if _valid(params)]
+
+    if samples is not None and samples < len(combinations):
+        combinations = random.Random(seed).sample(combinations, samples)
+    return combinations
+
+
+def build_strategy(strategy_name, params):
+    if strategy_name != 'combined':
+        return create_strategy(strategy_name, **params)
+
+    nested = {}
+    for key, value in params.items():
+        group, name = key.split('.', 1)
+        nested.setdefault(f"{group}_params", {})[name] = value
+    return create_strategy(strategy_name, **nested)
+
+
+def write_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        return
+
+    param_names = sorted({name for r in results for name in r['params']})
+    stat_names = list(results[0]['statistics']) if results else []
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank'] + param_names + stat_names)
+        for r in results:
+            writer.writerow([r['rank']] + [r['params'].get(n) for n in param_names] +
+                            [r['statistics'][n] for n in stat_names])
+
+
+def _valid(params):
+    short_period = params.get('short_period', params.get('sma.short_period'))
+    long_period = params.get('long_period', params.get('sma.long_period'))
+    if short_period is not None and long_period is not None and short_period >= long_period:
+        return False
+    oversold = params.get('oversold', params.get('rsi.oversold'))
+    overbought = params.get('overbought', params.get('rsi.overbought'))
+    if oversold is not None and overbought is not None and oversold >= overbought:
+        return False
+    return True
+
+
+def _init_worker(shm_name, shape, strategy_name, config, backtest_kwargs):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    columns = dict(zip(_COLUMNS, data))
+    columns['open_time'] = columns['open_time'].astype(np.int64)
+    columns['close_time'] = columns['close_time'].astype(np.int64)
+
+    _worker['shm'] = shm
+    _worker['candles'] = Candles(**columns)
+    _worker['strategy_name'] = strategy_name
+    _worker['config'] = config
+    _worker['backtest_kwargs'] = backtest_kwargs
+
+
+def _evaluate(params):
+    strategy = build_strategy(_worker['strategy_name'], params)
+    result = run_backtest(strategy, _worker['candles'], _worker['config'], **_worker['backtest_kwargs'])
+    return {'params': params, 'statistics': result.statistics()}
@@ -0,0 +1,71 @@
+from decimal import Decimal, ROUND_DOWN
+
+ZERO = Decimal(0)
+
+
+class OrderSizer:
+    """Exact order quantities and prices for one symbol.
+
+    Built once per exchange info refresh from the symbol's SymbolFilters, so
+    step and tick sizes are the exact Decimals parsed there and never go
+    through float. Quantities are always rounded down to the step, which
+    means an order never exceeds its budget and never fails LOT_SIZE. A
+    quantity under minQty or a value under the minimum notional comes back
+    as zero instead of being rounded up.
+    """
+
+    __slots__ = ('symbol', 'step_size', 'min_qty', 'max_qty', 'tick_size', 'min_price', 'max_price',
+                 'min_notional', 'quantity_places', 'price_places')
+
+    def __init__(self, filters):
+        """filters: the symbol's exchange_info.SymbolFilters"""
+        self.symbol = filters.symbol
+        self.step_size = filters.step_size
+        self.min_qty = filters.min_qty
+        self.max_qty = filters.max_qty
+        self.tick_size = filters.tick_size
+        self.min_price = filters.min_price
+        self.max_price = filters.max_price
+        self.min_notional = filters.min_notional
+        self.quantity_places = _places(self.step_size, filters.raw.get('baseAssetPrecision', 8))
+        self.price_places = _places(self.tick_size, filters.raw.get('quotePrecision', 8))
+
+    def floor_quantity(self, quantity):
+        """quantity rounded down to the step size and capped at maxQty"""
+        quantity = _floor(Decimal(str(quantity)), self.step_size, self.quantity_places)
+        if self.max_qty and quantity > self.max_qty:
+            quantity = _floor(self.max_qty, self.step_size, self.quantity_places)
+        return quantity
+
+    def order_quantity(self, amount, price):
+        """Largest valid quantity worth at most `amount` at `price`, or 0 if none passes the filters"""
+        price = Decimal(str(price))
+        if price <= 0:
+            return ZERO
+        quantity = self.floor_quantity(Decimal(str(amount)) / price)
+        return quantity if self.is_valid(quantity, price) else ZERO
+
+    def is_valid(self, quantity, price):
+        quantity = Decimal(str(quantity))
+        return quantity > 0 and quantity >= self.min_qty and quantity * Decimal(str(price)) >= self.min_notional
+
+    def floor_price(self, price):
+        return _floor(Decimal(str(price)), self.tick_size, self.price_places)
+
+    def format_quantity(self, quantity):
+        return f"{Decimal(str(quantity)):.{self.quantity_places}f}"
+
+    def format_price(self, price):
+        return f"{Decimal(str(price)):.{self.price_places}f}"
+
+
+def _places(step, default):
+    if not step:
+        return int(default)
+    return max(0, -step.as_tuple().exponent)
+
+
+def _floor(value, step, places):
+    if step:
+        return (value // step) * step
+    return value.quantize(Decimal(1).scaleb(-places), rounding=ROUND_DOWN)
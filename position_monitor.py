@@ -0,0 +1,127 @@
+import time
+import bisect
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from metrics import observe
+
+logger = logging.getLogger(__name__)
+
+
+class PositionMonitor:
+    """Watches every tracked position's stop-loss and take-profit on each price tick.
+
+    Levels are kept per symbol in two sorted lists, so a tick only bisects and
+    visits the levels it actually crossed. A crossed level is removed from
+    the index and its exit handed to a single worker thread. The tick
+    (usually the stream thread) is never blocked on an order.
+    `on_trigger(symbol, key, reason, price)` is called there.
+    """
+
+    def __init__(self, on_trigger):
+        self.on_trigger = on_trigger
+        self._stops = {}
+        self._targets = {}
+        self._levels = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='exits')
+        self._poll_thread = None
+        self._stop = threading.Event()
+
+    @property
+    def symbols(self):
+        with self._lock:
+            return {symbol for symbol, _ in self._levels}
+
+    def track(self, symbol, stop_loss, take_profit, key=None):
+        key = key or symbol
+        with self._lock:
+            self._remove(symbol, key)
+            self._levels[(symbol, key)] = (stop_loss, take_profit)
+            if stop_loss:
+                _insert(self._stops.setdefault(symbol, ([], [])), stop_loss, key)
+            if take_profit:
+                _insert(self._targets.setdefault(symbol, ([], [])), take_profit, key)
+
+    def untrack(self, symbol, key=None):
+        with self._lock:
+            self._remove(symbol, key or symbol)
+
+    def on_price(self, symbol, price):
+        if symbol not in self._stops and symbol not in self._targets:
+            return
+
+        triggered = {}
+        with self._lock:
+            if symbol in self._targets:
+                levels, keys = self._targets[symbol]
+                # A target fires at or above its level: every level <= price
+                for key in keys[:bisect.bisect_right(levels, price)]:
+                    triggered[key] = 'Take Profit'
+            if symbol in self._stops:
+                levels, keys = self._stops[symbol]
+                # A stop fires at or below its level: every level >= price
+                for key in keys[bisect.bisect_left(levels, price):]:
+                    triggered[key] = 'Stop Loss'
+            for key in triggered:
+                self._remove(symbol, key)
+
+        ticked_at = time.perf_counter()
+        for key, reason in triggered.items():
+            self._executor.submit(self._fire, symbol, key, reason, price, ticked_at)
+
+    def start(self, prices, interval=2.0):
+        """Poll `prices` for tracked symbols that get no live ticks (e.g. the REST feed)"""
+        if self._poll_thread and self._poll_thread.is_alive():
+            return
+        self._stop.clear()
+        self._poll_thread = threading.Thread(target=self._poll_loop, args=(prices, interval), daemon=True)
+        self._poll_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def flush(self, timeout=None):
+        """Wait until every exit already handed to the worker has been handled"""
+        self._executor.submit(lambda: None).result(timeout)
+
+    def _poll_loop(self, prices, interval):
+        while not self._stop.wait(interval):
+            symbols = self.symbols
+            if symbols:
+                # Fresh stream prices are served from memory; only stale ones cost a (batched) request,
+                # and every refreshed price reaches on_price through the cache listeners
+                prices.get_many(list(symbols), max_age=interval)
+
+    def _fire(self, symbol, key, reason, price, ticked_at):
+        try:
+            self.on_trigger(symbol, key, reason, price)
+        except Exception as e:
+            logger.error(f"Error handling {reason} for {symbol}: {e}")
+        observe('protective_exit_seconds', time.perf_counter() - ticked_at,
+                'Price tick crossing a level to its exit being handled', reason=reason)
+
+    def _remove(self, symbol, key):
+        levels = self._levels.pop((symbol, key), None)
+        if levels is None:
+            return
+        stop_loss, take_profit = levels
+        for index, level in ((self._stops, stop_loss), (self._targets, take_profit)):
+            if level and symbol in index:
+                levels, keys = index[symbol]
+                i = bisect.bisect_left(levels, level)
+                while i < len(levels) and levels[i] == level:
+                    if keys[i] == key:
+                        del levels[i]
+                        del keys[i]
+                        break
+                    i += 1
+                if not levels:
+                    del index[symbol]
+
+
+def _insert(index, level, key):
+    levels, keys = index
+    i = bisect.bisect_right(levels, level)
+    levels.insert(i, level)
+    keys.insert(i, key)
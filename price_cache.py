@@ -0,0 +1,94 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PriceCache:
+    """Last known price per symbol, fed by the market stream and by batched ticker downloads.
+
+    A price younger than max_age is served from memory. Older or missing
+    prices are refreshed together in one `fetch(symbols)` call, and callers
+    that arrive while a refresh is running wait for it instead of issuing their
+    own. If the exchange cannot be reached, prices up to max_stale old are
+    still served; anything older is treated as unknown.
+    """
+
+    def __init__(self, fetch, max_age=5.0, max_stale=60.0, retry_delay=5.0):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.retry_delay = retry_delay
+        self.prices = {}
+        self.listeners = []
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def add_listener(self, callback):
+        """Register callback(symbol, price), called for every newer price"""
+        self.listeners.append(callback)
+
+    def update(self, symbol, price, timestamp=None):
+        timestamp = timestamp or time.time()
+        price = float(price)
+        with self._lock:
+            current = self.prices.get(symbol)
+            if current is not None and current[1] > timestamp:
+                return
+            self.prices[symbol] = (price, timestamp)
+        for callback in self.listeners:
+            try:
+                callback(symbol, price)
+            except Exception as e:
+                logger.error(f"Error in price listener for {symbol}: {e}")
+
+    def age(self, symbol):
+        entry = self.prices.get(symbol)
+        return time.time() - entry[1] if entry else None
+
+    def get(self, symbol, max_age=None):
+        return self.get_many([symbol], max_age).get(symbol)
+
+    def get_many(self, symbols, max_age=None):
+        """{symbol: price} for symbols, refreshing stale ones in one batched request"""
+        max_age = self.max_age if max_age is None else max_age
+        if self._stale(symbols, max_age) and time.time() >= self._retry_at:
+            self.refresh(symbols, max_age)
+
+        now = time.time()
+        prices = {}
+        for symbol in symbols:
+            entry = self.prices.get(symbol)
+            if entry and now - entry[1] <= max(max_age, self.max_stale):
+                prices[symbol] = entry[0]
+        return prices
+
+    def refresh(self, symbols=None, max_age=0):
+        with self._refreshing:
+            # Another caller may have refreshed these while we waited for the lock
+            if symbols is not None:
+                symbols = self._stale(symbols, max_age)
+                if not symbols:
+                    return True
+            try:
+                tickers = self.fetch(symbols)
+            except Exception as e:
+                logger.error(f"Error refreshing prices: {e}")
+                tickers = None
+            if not tickers:
+                self._retry_at = time.time() + self.retry_delay
+                return False
+
+            now = time.time()
+            for ticker in tickers:
+                self.update(ticker['symbol'], ticker['price'], now)
+            return True
+
+    def _stale(self, symbols, max_age):
+        now = time.time()
+        return [
+            symbol for symbol in symbols
+            if symbol not in self.prices or now - self.prices[symbol][1] > max_age
+        ]
@@ -0,0 +1,128 @@
+import threading
+import numpy as np
+from candles import Candles, interval_seconds, candle_open_time
+
+RESAMPLE_INTERVALS = ('5m', '15m', '1h', '4h', '1d')
+
+
+def can_resample(interval, base_interval='1m'):
+    """Whether interval candles can be built from base_interval candles"""
+    try:
+        period, base = interval_seconds(interval), interval_seconds(base_interval)
+    except ValueError:
+        return False
+    return period > base and period % base == 0
+
+
+def resample(candles, interval):
+    """Candles grouped into interval candles in one pass; a trailing incomplete group is the forming candle"""
+    candles = Candles.from_klines(candles)
+    if not len(candles):
+        return Candles.empty()
+    period_ms = interval_seconds(interval) * 1000
+    buckets = bucket_open_time(candles.open_time, interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    open_time = buckets[starts]
+    return Candles(
+        open_time,
+        candles.open[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        candles.close[ends],
+        np.add.reduceat(candles.volume, starts),
+        open_time + period_ms - 1
+    )
+
+
+def bucket_open_time(open_time, interval):
+    """Open time (ms) of the interval candle containing open_time (ms); works on arrays too"""
+    return candle_open_time(open_time // 1000, interval) * 1000
+
+
+class Resampler:
+    """Higher-timeframe candles for one symbol, built incrementally from its base (1m) candle updates.
+
+    For each interval it keeps the running aggregate of the closed base candles
+    in the current bucket. A forming base update is merged into a copy of it, so
+    every update costs O(intervals). An interval candle closes together with the
+    base candle that ends its bucket, or when the next bucket starts (a gap in the
+    base feed). Rows are [open_time, open, high, low, close, volume, close_time].
+    """
+
+    def __init__(self, intervals=(), base_interval='1m'):
+        self.base_interval = base_interval
+        self.base_period_ms = interval_seconds(base_interval) * 1000
+        self._partial = {}
+        self._closed_through = {}
+        self._lock = threading.Lock()
+        for interval in intervals:
+            self.add(interval)
+
+    @property
+    def intervals(self):
+        return list(self._partial)
+
+    def add(self, interval):
+        if not can_resample(interval, self.base_interval):
+            raise ValueError(f"Cannot build {interval} candles from {self.base_interval}")
+        with self._lock:
+            self._partial.setdefault(interval, None)
+            self._closed_through.setdefault(interval, None)
+
+    def remove(self, interval):
+        with self._lock:
+            self._partial.pop(interval, None)
+            self._closed_through.pop(interval, None)
+
+    def prime(self, interval, candle_row, base_row):
+        """Resume from an interval candle and the base candle forming inside it, both fetched over REST.
+
+        The closed part of the bucket is the interval candle minus the forming
+        base candle's volume; its high and low may already include that base
+        candle's extremes, which later updates can only extend.
+        """
+        with self._lock:
+            if interval not in self._partial:
+                return
+            bucket = bucket_open_time(base_row[0], interval)
+            if bucket != candle_row[0] or base_row[0] == bucket:
+                self._partial[interval] = None
+            else:
+                partial = list(candle_row)
+                partial[5] = max(candle_row[5] - base_row[5], 0.0)
+                self._partial[interval] = partial
+            self._closed_through[interval] = base_row[0] - self.base_period_ms
+
+    def update(self, row, closed):
+        """Apply one base candle update; returns [(interval, row, closed)] for every interval it changed"""
+        updates = []
+        with self._lock:
+            for interval, partial in self._partial.items():
+                closed_through = self._closed_through[interval]
+                if closed_through is not None and row[0] <= closed_through:
+                    continue
+
+                bucket = bucket_open_time(row[0], interval)
+                period_ms = interval_seconds(interval) * 1000
+                if partial is not None and partial[0] != bucket:
+                    # The base candle that should have closed this bucket never arrived
+                    updates.append((interval, partial, True))
+                    partial = None
+
+                merged = _merge(partial, row, bucket, period_ms)
+                candle_closed = closed and row[6] + 1 >= bucket + period_ms
+                if closed:
+                    self._partial[interval] = None if candle_closed else merged
+                    self._closed_through[interval] = row[0]
+                else:
+                    self._partial[interval] = partial
+                updates.append((interval, merged, candle_closed))
+        return updates
+
+
+def _merge(partial, row, bucket, period_ms):
+    if partial is None:
+        return [bucket, row[1], row[2], row[3], row[4], row[5], bucket + period_ms - 1]
+    return [bucket, partial[1], max(partial[2], row[2]), min(partial[3], row[3]), row[4],
+            partial[5] + row[5], bucket + period_ms - 1]
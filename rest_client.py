@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from binance.client import Client
+from metrics import observe, inc
+
+logger = logging.getLogger(__name__)
+
+# Request weights of the endpoints this bot uses; anything else counts as 1.
+# The limiter is corrected from the X-MBX-USED-WEIGHT-1M header after every
+# response, so these only need to be close.
+ENDPOINT_WEIGHTS = {
+    'klines': 2,
+    'ticker/price': 4,
+    'exchangeInfo': 20,
+    'account': 20,
+    'openOrders': 6,
+    'allOrders': 20,
+    'myTrades': 20
+}
+
+RATE_LIMIT_STATUS = (429, 418)
+SERVER_ERROR_STATUS = (500, 502, 503, 504)
+RETRY_STATUS = RATE_LIMIT_STATUS + SERVER_ERROR_STATUS
+
+
+class WeightLimiter:
+    """Token bucket over Binance's per-minute request weight budget.
+
+    Tokens refill continuously at capacity per window. After each response the
+    bucket is clamped to what the exchange reports as remaining, and a 429/418
+    Retry-After pauses every caller until the ban lifts.
+    """
+
+    def __init__(self, capacity=1200, window=60.0, headroom=0.1):
+        self.capacity = capacity * (1 - headroom)
+        self.rate = self.capacity / window
+        self.tokens = self.capacity
+        self.used_weight = 0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        started = None
+        while True:
+            wait = self.try_acquire(weight)
+            if wait <= 0:
+                if started is not None:
+                    observe('binance_rate_limit_wait_seconds', time.monotonic() - started, 'Time spent waiting for request weight')
+                return
+            started = started or time.monotonic()
+            time.sleep(min(wait, 1.0))
+
+    def try_acquire(self, weight=1):
+        """Take weight tokens if available and return 0, otherwise return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self.paused_until - now
+            if wait > 0:
+                return wait
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return 0
+            return (weight - self.tokens) / self.rate
+
+    def observe(self, used_weight):
+        """Clamp the bucket to the weight the exchange says is left this minute"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.used_weight = used_weight
+            self.tokens = min(self.tokens, self.capacity - used_weight)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PooledClient(Client):
+    """python-binance Client with a pooled keep-alive session, weight limiting,
+    coalescing of identical concurrent GETs and retries on 429/418 (and 5xx for GETs, see is_retryable)"""
+
+    def __init__(self, api_key=None, api_secret=None, pool_size=None, max_retries=3, limiter=None, **kwargs):
+        self.pool_size = pool_size or int(os.getenv('BINANCE_POOL_SIZE', 20))
+        self.max_retries = max_retries
+        self.limiter = limiter or WeightLimiter(int(os.getenv('BINANCE_WEIGHT_LIMIT', 1200)))
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        super().__init__(api_key, api_secret, **kwargs)
+
+    def _init_session(self):
+        session = requests.Session()
+        session.headers.update(self._get_headers())
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        if method != 'get' or signed:
+            return self._send(method, uri, signed, force_params, **kwargs)
+
+        key = (uri, repr(sorted((kwargs.get('data') or {}).items())))
+        with self._in_flight_lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._send(method, uri, signed, force_params, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+
+    def _send(self, method, uri, signed, force_params=False, **kwargs):
+        weight = endpoint_weight(uri, kwargs.get('data'))
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(weight)
+            # Signed requests are rebuilt each attempt so the timestamp stays valid
+            request_kwargs = self._get_request_kwargs(method, signed, force_params, **dict(kwargs, data=dict(kwargs.get('data') or {})))
+            response = getattr(self.session, method)(uri, **request_kwargs)
+            self.response = response
+
+            used_weight = response.headers.get('x-mbx-used-weight-1m')
+            if used_weight is not None:
+                self.limiter.observe(int(used_weight))
+            inc('binance_http_responses_total', help='REST responses by status code', status=response.status_code)
+
+            if not is_retryable(method, response.status_code) or attempt == self.max_retries:
+                return self._handle_response(response)
+
+            delay = retry_delay(response.headers, attempt)
+            if response.status_code in (429, 418):
+                self.limiter.pause(delay)
+            logger.warning(f"{response.status_code} from {uri}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def is_retryable(method, status):
+    """Whether a response with this status may be retried.
+
+    429/418 are rejected before execution, so any request can be sent again.
+    A 5xx leaves the outcome unknown (an order may already have filled), so
+    only GETs are retried; anything else surfaces the error instead.
+    """
+    if status in RATE_LIMIT_STATUS:
+        return True
+    return status in SERVER_ERROR_STATUS and method.lower() == 'get'
+
+
+def endpoint_weight(uri, params=None):
+    endpoint = uri.split('/api/v3/')[-1].split('?')[0]
+    if endpoint == 'ticker/price' and params and 'symbol' in params:
+        return 2
+    if endpoint == 'openOrders' and not (params and 'symbol' in params):
+        return 80
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+
+def retry_delay(headers, attempt):
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(2 ** attempt, 30)
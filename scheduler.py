@@ -0,0 +1,185 @@
+import time
+import heapq
+import random
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from candles import interval_seconds, candle_open_time
+
+logger = logging.getLogger(__name__)
+
+
+class PairMetrics:
+    def __init__(self):
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.avg_lag = None
+        self.last_duration = None
+        self.last_run = None
+        self.next_run = None
+
+    def record(self, lag, duration):
+        self.runs += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.avg_lag = lag if self.avg_lag is None else self.avg_lag * 0.9 + lag * 0.1
+        self.last_duration = duration
+        self.last_run = time.time()
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'last_lag': self.last_lag,
+            'avg_lag': self.avg_lag,
+            'max_lag': self.max_lag,
+            'last_duration': self.last_duration,
+            'last_run': self.last_run,
+            'next_run': self.next_run
+        }
+
+
+class CycleScheduler:
+    """Runs bot cycles for many symbol/interval pairs on a bounded thread pool.
+
+    Each pair is evaluated shortly after its candle closes (`close_delay` plus up
+    to `jitter` seconds, so hundreds of pairs don't hit the API in the same
+    instant). Pairs that are due together (up to `batch_size`) go out as one job
+    through bot.run_cycles, which fetches their klines concurrently; a lone pair
+    goes through bot.run_cycle. While `max_pending` jobs are already waiting for
+    a worker, due pairs stay queued until one frees up; their lag shows up in
+    the metrics. A pair that is still running when its next slot comes up is
+    skipped rather than queued behind itself.
+    """
+
+    def __init__(self, bot, max_workers=8, close_delay=1.0, jitter=2.0, max_pending=None, batch_size=50):
+        self.bot = bot
+        self.max_workers = max_workers
+        self.close_delay = close_delay
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self.max_pending = max_pending if max_pending is not None else max_workers * 2
+
+        self.metrics = {}
+        self._heap = []
+        self._in_flight = set()
+        self._pending = 0
+        self._executor = None
+        self._thread = None
+        self._running = False
+        self._cond = threading.Condition()
+
+    @property
+    def pairs(self):
+        with self._cond:
+            return list(self.metrics)
+
+    def add(self, symbol, interval, run_now=False):
+        key = (symbol, interval)
+        interval_seconds(interval)
+        with self._cond:
+            if key in self.metrics:
+                return
+            self.metrics[key] = PairMetrics()
+            self._schedule(key, time.time() + random.uniform(0, self.jitter) if run_now else None)
+            self._cond.notify()
+
+    def remove(self, symbol, interval):
+        with self._cond:
+            self.metrics.pop((symbol, interval), None)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cycle')
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=False):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def get_metrics(self):
+        with self._cond:
+            return {f"{symbol}_{interval}": m.to_dict() for (symbol, interval), m in self.metrics.items()}
+
+    def _schedule(self, key, due=None):
+        if due is None:
+            interval = key[1]
+            period = interval_seconds(interval)
+            boundary = candle_open_time(time.time(), interval) + period
+            due = boundary + self.close_delay + random.uniform(0, self.jitter)
+        self.metrics[key].next_run = due
+        heapq.heappush(self._heap, (due, key))
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                due, key = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                if self._pending >= self.max_pending:
+                    self._cond.wait()
+                    continue
+
+                batch = []
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                    due, key = heapq.heappop(self._heap)
+                    metrics = self.metrics.get(key)
+                    if metrics is None or metrics.next_run != due:
+                        continue
+
+                    if key in self._in_flight:
+                        metrics.skipped += 1
+                        logger.warning(f"Skipping cycle for {key[0]} {key[1]}: previous run still busy")
+                    else:
+                        self._in_flight.add(key)
+                        batch.append((key, due))
+                    self._schedule(key)
+
+                if batch:
+                    self._pending += 1
+                    self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        started = time.time()
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify()
+        try:
+            if len(batch) == 1:
+                self.bot.run_cycle(*batch[0][0])
+            else:
+                self.bot.run_cycles([key for key, _ in batch])
+            failed = False
+        except Exception as e:
+            logger.error(f"Error running cycles for {', '.join(f'{s} {i}' for (s, i), _ in batch)}: {e}")
+            failed = True
+        finally:
+            with self._cond:
+                for key, due in batch:
+                    self._in_flight.discard(key)
+                    metrics = self.metrics.get(key)
+                    if metrics:
+                        metrics.record(started - due, time.time() - started)
+                        if failed:
+                            metrics.errors += 1
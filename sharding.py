@@ -0,0 +1,567 @@
+import os
+import time
+import bisect
+import hashlib
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from binance_api import BinanceAPI
+from rest_client import WeightLimiter
+from engine import Engine
+from config import DEFAULT_CONFIG
+from state_store import StateStore
+from trade_stats import TradeStatistics
+from metrics import REGISTRY, inc
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """Consistent hashing of keys (symbols) onto nodes (shards).
+
+    Each node owns `replicas` points on a ring of md5 hashes, so the mapping
+    depends only on the node names: it is the same after a restart, and
+    adding or removing a node only moves the keys that node gains or loses.
+    """
+
+    def __init__(self, nodes, replicas=256):
+        self.nodes = list(nodes)
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key):
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[i]
+
+    def assign(self, keys):
+        """{node: [keys]} for every node, keys in the order given"""
+        assignment = {node: [] for node in self.nodes}
+        for key in keys:
+            assignment[self.node_for(key)].append(key)
+        return assignment
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class RiskCoordinator:
+    """Global risk limits for shards that all trade from one USDT balance.
+
+    Before a shard sizes an entry it reserves the amount here. A reservation
+    is capped at max_position_size of the whole balance and at what other
+    shards have not already reserved, so concurrent entries on different
+    shards never commit more than the account holds. It is released once the
+    order is done, and the balance is re-read before the next reservation.
+    """
+
+    def __init__(self, api, config=None, balance_max_age=5.0):
+        self.api = api
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.balance_max_age = balance_max_age
+        self._reserved = {}
+        self._balance = None
+        # Bumped whenever an order may have changed the balance
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reserved(self):
+        with self._lock:
+            return dict(self._reserved)
+
+    def reserve(self, symbol, amount):
+        """The part of amount (USDT) symbol's entry may spend; 0.0 if that is under min_order_amount"""
+        while True:
+            # The balance is read without the lock, so other shards' reservations never wait on REST
+            balance, generation = self._current_balance()
+            with self._lock:
+                if generation != self._generation:
+                    # An order finished meanwhile, so that balance may already be spent
+                    continue
+                available = balance - sum(self._reserved.values())
+                granted = min(amount, balance * self.config['max_position_size'], available)
+                if granted < self.config['min_order_amount']:
+                    granted = 0.0
+                else:
+                    self._reserved[symbol] = self._reserved.get(symbol, 0.0) + granted
+                break
+        inc('risk_reservations_total', help='Entry reservations asked of the risk coordinator',
+            result='granted' if granted else 'rejected')
+        return granted
+
+    def release(self, symbol):
+        with self._lock:
+            self._reserved.pop(symbol, None)
+            # The order may have spent part of the balance
+            self._balance = None
+            self._generation += 1
+
+    def update_config(self, changes):
+        with self._lock:
+            self.config.update(changes)
+
+    def _current_balance(self):
+        """(balance, generation it was read in), re-read if older than balance_max_age"""
+        with self._lock:
+            cached, generation = self._balance, self._generation
+        if cached is None or time.monotonic() - cached[1] > self.balance_max_age:
+            cached = (self.api.get_balance('USDT'), time.monotonic())
+            with self._lock:
+                if generation == self._generation:
+                    self._balance = cached
+        return cached[0], generation
+
+
+class CoordinatorLink:
+    """A shard's side of a pipe to the coordinator: risk reservations, request weight and bot events"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    def reserve(self, symbol, amount):
+        return self.call('reserve', symbol, amount) or 0.0
+
+    def release(self, symbol):
+        self.call('release', symbol)
+
+    def notify(self, event, data):
+        try:
+            with self._lock:
+                self._connection.send(('event', (event, data)))
+        except (OSError, ValueError) as e:
+            logger.error(f"Error forwarding {event} to the coordinator: {e}")
+
+    def call(self, method, *args):
+        """method's result on the coordinator, or None if it cannot be reached"""
+        try:
+            with self._lock:
+                self._connection.send((method, args))
+                return self._connection.recv()
+        except (EOFError, OSError) as e:
+            # Without the coordinator nothing may be reserved: entries are refused, exits still run
+            logger.error(f"Coordinator unreachable for {method}: {e}")
+            return None
+
+
+class CoordinatedLimiter(WeightLimiter):
+    """A shard's REST weight limiter, drawing on the coordinator's budget.
+
+    Binance counts request weight per IP, so every shard takes its tokens
+    from the coordinator's WeightLimiter, over a pipe of its own, and reports
+    the used weight and bans it sees there. If the coordinator cannot be
+    reached, the shard falls back to its own share of the budget (capacity).
+    """
+
+    def __init__(self, link, capacity):
+        super().__init__(capacity)
+        self._link = link
+
+    def try_acquire(self, weight=1):
+        wait = self._link.call('try_acquire', weight)
+        return super().try_acquire(weight) if wait is None else wait
+
+    def observe(self, used_weight):
+        # used_weight is the whole IP's, so it only means something to the shared bucket
+        self._link.call('observe', used_weight)
+
+    def pause(self, seconds):
+        super().pause(seconds)
+        self._link.call('pause', seconds)
+
+
+def _run_shard(name, commands, upstream, weight, state_dir, api_factory, shards):
+    """Entry point of a shard process: an Engine for the symbols the ring gives it"""
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - {name} - %(name)s - %(levelname)s - %(message)s')
+    store = StateStore(os.path.join(state_dir, name))
+    if store.is_empty:
+        # Write an empty snapshot so the shard never imports the unsharded bot_state.json
+        store.load()
+        store.compact()
+    link = CoordinatorLink(upstream)
+    api = api_factory() if api_factory else BinanceAPI.shared()
+    if isinstance(api, BinanceAPI):
+        api.client.limiter = CoordinatedLimiter(CoordinatorLink(weight),
+                                                int(os.getenv('BINANCE_WEIGHT_LIMIT', 1200)) // shards)
+    engine = Engine(bot_options={'state_store': store, 'allocator': link, 'api': api})
+    engine.add_listener(link.notify)
+
+    while True:
+        try:
+            command, kwargs = commands.recv()
+        except (EOFError, OSError):
+            break
+        if command == 'exit':
+            break
+        try:
+            if command == 'snapshot':
+                result = _shard_snapshot(engine)
+            elif command in Engine.COMMANDS:
+                result = getattr(engine, command)(**kwargs)
+            else:
+                raise ValueError(f"Unknown shard command: {command}")
+            reply = (True, result)
+        except Exception as e:
+            logger.error(f"Error running {command}: {e}")
+            reply = (False, str(e))
+        commands.send(reply)
+    engine.stop()
+    commands.close()
+
+
+def _shard_snapshot(engine):
+    snapshot = engine.snapshot()
+    bot = engine.bot
+    # Raw statistics so the coordinator can merge them exactly, and every held symbol
+    # (status only lists positions with a known price)
+    snapshot['stats'] = bot.stats.to_dict() if bot else {}
+    snapshot['held'] = list(bot.positions) if bot else []
+    return snapshot
+
+
+class ShardWorker:
+    """One shard process, with its command pipe and the thread serving its upstream pipe"""
+
+    def __init__(self, name, coordinator, state_dir, api_factory=None, context=None):
+        context = context or multiprocessing.get_context('spawn')
+        self.name = name
+        self.coordinator = coordinator
+        self._commands, shard_commands = context.Pipe()
+        self._upstream, shard_upstream = context.Pipe()
+        # Weight is taken before every REST request, so it has its own pipe rather than queueing behind reservations
+        self._weight, shard_weight = context.Pipe()
+        self._lock = threading.Lock()
+        self._handlers = {
+            'reserve': coordinator.risk.reserve,
+            'release': coordinator.risk.release,
+            'try_acquire': coordinator.limiter.try_acquire,
+            'observe': coordinator.limiter.observe,
+            'pause': coordinator.limiter.pause
+        }
+        self.process = context.Process(target=_run_shard, name=name, daemon=True,
+                                       args=(name, shard_commands, shard_upstream, shard_weight, state_dir,
+                                             api_factory, len(coordinator.ring.nodes)))
+        self.process.start()
+        threading.Thread(target=self._serve_upstream, args=(self._upstream,), daemon=True).start()
+        threading.Thread(target=self._serve_upstream, args=(self._weight,), daemon=True).start()
+
+    def call(self, command, **kwargs):
+        with self._lock:
+            try:
+                self._commands.send((command, kwargs))
+                ok, result = self._commands.recv()
+            except (EOFError, OSError) as e:
+                raise RuntimeError(f"{self.name} is not running: {e}")
+        if not ok:
+            raise RuntimeError(f"{self.name}: {result}")
+        return result
+
+    def close(self, timeout=10):
+        try:
+            self.call('exit')
+        except RuntimeError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def _serve_upstream(self, connection):
+        while True:
+            try:
+                method, args = connection.recv()
+            except (EOFError, OSError):
+                return
+            if method == 'event':
+                self.coordinator.on_shard_event(self.name, *args)
+                continue
+            try:
+                result = self._handlers[method](*args)
+            except Exception as e:
+                logger.error(f"Error handling {method} from {self.name}: {e}")
+                result = None
+            connection.send(result)
+
+
+class ShardedEngine:
+    """An Engine whose symbols are spread over worker processes.
+
+    Symbols go to shards by consistent hashing, so a symbol (and its saved
+    position) lands on the same shard after a restart; when the number of
+    shards changes, saved positions are first moved to their new owners (see
+    rehome_positions). Every shard runs its
+    own bot: data feed, strategy evaluation, protective exits and state store
+    (STATE_DIR/shard-N). Entries go through the RiskCoordinator here, which
+    owns the shared balance, and REST requests draw on one weight budget here
+    (see CoordinatedLimiter). It has the same methods as Engine and can be
+    served by engine.EngineServer (ENGINE_SHARDS=N python engine.py).
+    """
+
+    def __init__(self, shards=None, state_dir=None, api_factory=None):
+        """api_factory, a picklable callable, builds each shard's API (and the coordinator's);
+        the shared BinanceAPI otherwise"""
+        shards = shards or os.cpu_count()
+        state_dir = state_dir or os.getenv('STATE_DIR', 'data/state')
+        api = api_factory() if api_factory else BinanceAPI.shared()
+        # The risk config is the engine's config; it is kept in a store of its own
+        self.store = StateStore(os.path.join(state_dir, 'coordinator'))
+        self.risk = RiskCoordinator(api, self.store.load()['config'])
+        if isinstance(api, BinanceAPI):
+            # The coordinator's own requests count against the same budget
+            self.limiter = api.client.limiter
+        else:
+            self.limiter = WeightLimiter(int(os.getenv('BINANCE_WEIGHT_LIMIT', 1200)))
+        self.listeners = []
+        self.ring = HashRing([f"shard-{i}" for i in range(shards)])
+        rehome_positions(state_dir, self.ring)
+        self.workers = {name: ShardWorker(name, self, state_dir, api_factory) for name in self.ring.nodes}
+        self._holders = {}
+        self._pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='shard-call')
+
+    @property
+    def api(self):
+        return self.risk.api
+
+    def add_listener(self, callback):
+        """Register callback(event, data) for the bot events of every shard"""
+        self.listeners.append(callback)
+
+    def on_shard_event(self, shard, event, data):
+        if event == 'position':
+            # Commands about a position go to the shard holding it, even if the ring has since moved its symbol
+            if data['position']:
+                self._holders[data['symbol']] = shard
+            else:
+                self._holders.pop(data['symbol'], None)
+        for callback in self.listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                logger.error(f"Error in {event} listener: {e}")
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+        self._pool.shutdown()
+        self.store.compact()
+        self.store.close()
+
+    def shard_for(self, symbol):
+        """The shard a command about symbol goes to: the one holding its position, else its ring owner"""
+        return self.workers[self._holders.get(symbol) or self.ring.node_for(symbol)]
+
+    # Commands
+
+    def start(self, symbols=None, symbol='BTCUSDT', **params):
+        assignment = self.ring.assign(symbols or [symbol])
+        results = self._each(lambda worker: worker.call('start', symbols=assignment[worker.name], **params))
+        started = [name for name, result in results.items() if result['success']]
+        if not started:
+            return next(iter(results.values()))
+        # Shards size orders with the coordinator's config, the one that is persisted and shown
+        config = dict(self.risk.config)
+        self._each(lambda worker: worker.call('update_config', changes=config), started)
+        logger.info(f"Started {len(started)} shards: " +
+                    ', '.join(f"{name} ({len(assignment[name])} symbols)" for name in started))
+        return {'success': True, 'message': f'Bot started successfully on {len(started)} shards'}
+
+    def stop(self):
+        results = self._each(lambda worker: worker.call('stop'))
+        stopped = [name for name, result in results.items() if result['success']]
+        if not stopped:
+            return {'success': False, 'message': 'Bot is not running'}
+        return {'success': True, 'message': 'Bot stopped successfully'}
+
+    def update_config(self, changes):
+        self.risk.update_config(changes)
+        try:
+            self.store.set_config(dict(self.risk.config))
+        except Exception as e:
+            logger.error(f"Error persisting config: {e}")
+        results = self._each(lambda worker: worker.call('update_config', changes=changes))
+        return next(iter(results.values()))
+
+    def update_position(self, symbol, stop_loss=None, take_profit=None):
+        return self.shard_for(symbol).call('update_position', symbol=symbol, stop_loss=stop_loss,
+                                           take_profit=take_profit)
+
+    def create_position(self, symbol, quantity, entry_price):
+        return self.shard_for(symbol).call('create_position', symbol=symbol, quantity=quantity,
+                                           entry_price=entry_price)
+
+    def close_position(self, symbol):
+        return self.shard_for(symbol).call('close_position', symbol=symbol)
+
+    def screen(self, symbols=None, interval='15m', limit=100):
+        """Each shard screens its own part of the universe, all at once"""
+        assignment = self.ring.assign(symbols or self.api.get_trading_symbols('USDT'))
+        results = self._each(lambda worker: worker.call('screen', symbols=assignment[worker.name],
+                                                        interval=interval, limit=limit),
+                             [name for name, part in assignment.items() if part])
+        signals = {}
+        for result in results.values():
+            signals.update(result.get('signals', {}))
+        return {'interval': interval, 'signals': signals}
+
+    def metrics(self, format='text'):
+        if format == 'json':
+            results = self._each(lambda worker: worker.call('metrics', format='json'))
+            return dict(results, coordinator=REGISTRY.summary())
+        results = self._each(lambda worker: worker.call('metrics', shard=worker.name))
+        return merge_rendered(list(results.values()) + [REGISTRY.render(shard='coordinator')])
+
+    # Reads
+
+    def snapshot(self):
+        snapshots = self._each(_try_snapshot)
+        self._holders = {symbol: name for name, snapshot in snapshots.items() if snapshot
+                         for symbol in snapshot['held']}
+        snapshots = [snapshot for snapshot in snapshots.values() if snapshot]
+        if not snapshots:
+            raise RuntimeError("No shard is running")
+
+        status = _merge_status([s['status'] for s in snapshots])
+        statistics = _merge_statistics(snapshots)
+        scheduler = {'pairs': [], 'metrics': {}}
+        signals = {}
+        for snapshot in snapshots:
+            scheduler['pairs'] += snapshot['scheduler']['pairs']
+            scheduler['metrics'].update(snapshot['scheduler']['metrics'])
+            signals.update(snapshot['signals'])
+        return {
+            'status': status,
+            'positions': status.get('positions', []),
+            'statistics': statistics,
+            'config': dict(self.risk.config),
+            'signals': signals,
+            'scheduler': scheduler
+        }
+
+    def status(self):
+        return self.snapshot()['status']
+
+    def positions(self):
+        return self.snapshot()['positions']
+
+    def statistics(self):
+        return self.snapshot()['statistics']
+
+    def config(self):
+        return dict(self.risk.config)
+
+    def signals(self):
+        return self.snapshot()['signals']
+
+    def scheduler_metrics(self):
+        return self.snapshot()['scheduler']
+
+    def _each(self, call, names=None):
+        """{shard name: call(worker)} for the named shards (all by default), run concurrently"""
+        names = self.ring.nodes if names is None else names
+        futures = {name: self._pool.submit(call, self.workers[name]) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def rehome_positions(state_dir, ring):
+    """Move every position saved in a STATE_DIR/shard-* dir to the shard that owns its symbol now.
+
+    Runs before the shards start. Without it, lowering ENGINE_SHARDS (or any
+    change of the ring) would leave positions in dirs no shard loads, and
+    their stop-loss and take-profit would never be armed again. A symbol
+    held with different positions by two shards is not guessed at: starting
+    is refused until that is resolved. Returns the number of positions moved.
+    """
+    names = sorted(name for name in (os.listdir(state_dir) if os.path.isdir(state_dir) else [])
+                   if name.startswith('shard-') and os.path.isdir(os.path.join(state_dir, name)))
+    stores = {}
+    changed = set()
+    moved = 0
+    try:
+        for name in names:
+            stores[name] = StateStore(os.path.join(state_dir, name))
+            stores[name].load()
+        for name in names:
+            for symbol, position in list(stores[name].positions.items()):
+                owner = ring.node_for(symbol)
+                if owner == name:
+                    continue
+                if owner not in stores:
+                    stores[owner] = StateStore(os.path.join(state_dir, owner))
+                    stores[owner].load()
+                held = stores[owner].positions.get(symbol)
+                if held is not None and held != position:
+                    raise RuntimeError(f"{symbol} has different open positions in {name} and {owner}; "
+                                       f"remove one of them before starting")
+                # Added to its owner before it is removed here, so a crash in between loses nothing
+                stores[owner].set_position(symbol, position)
+                stores[name].set_position(symbol, None)
+                changed.update((name, owner))
+                moved += 1
+                logger.info(f"Moved the {symbol} position from {name} to {owner}")
+        for name in changed:
+            stores[name].compact()
+    finally:
+        for store in stores.values():
+            store.close()
+    return moved
+
+
+def _try_snapshot(worker):
+    try:
+        return worker.call('snapshot')
+    except RuntimeError as e:
+        logger.error(f"Leaving {worker.name} out of the snapshot: {e}")
+        return None
+
+
+def _merge_status(statuses):
+    running = [status for status in statuses if 'strategy' in status]
+    if not running:
+        return statuses[0]
+    positions = [position for status in running for position in status['positions']]
+    trades = sorted((trade for status in running for trade in status['recent_trades']), key=lambda t: t['timestamp'])
+    # Every shard reads the same account, so any one's balance will do
+    usdt_balance = running[0]['usdt_balance']
+    return {
+        'is_running': any(status['is_running'] for status in running),
+        'test_mode': running[0]['test_mode'],
+        'strategy': running[0]['strategy'],
+        'usdt_balance': usdt_balance,
+        'total_value': usdt_balance + sum(position['value'] for position in positions),
+        'positions': positions,
+        'recent_trades': trades[-10:],
+        'shards': len(running)
+    }
+
+
+def _merge_statistics(snapshots):
+    stats = TradeStatistics()
+    active_positions = 0
+    for snapshot in snapshots:
+        stats.merge(TradeStatistics.from_dict(snapshot['stats']))
+        active_positions += snapshot['statistics'].get('active_positions', 0)
+    statistics = stats.summary()
+    statistics['active_positions'] = active_positions
+    return statistics
+
+
+def merge_rendered(texts):
+    """Prometheus texts from several processes as one exposition, with each metric's HELP and TYPE once"""
+    metrics = {}
+    for text in texts:
+        name = None
+        for line in text.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                name = line.split(' ', 3)[2]
+                header, _ = metrics.setdefault(name, ([], []))
+                if line not in header:
+                    header.append(line)
+            elif line and name:
+                metrics[name][1].append(line)
+    lines = []
+    for header, series in metrics.values():
+        lines.extend(header)
+        lines.extend(series)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,128 @@
+import time
+import queue
+import threading
+import functools
+import logging
+from types import MappingProxyType
+from concurrent.futures import Future
+from metrics import observe
+
+logger = logging.getLogger(__name__)
+
+
+class StateSnapshot:
+    """One immutable version of the bot state.
+
+    positions and config are read-only mappings and recent_trades is a tuple.
+    The position and trade dicts inside are shared between versions and are
+    never modified once published: the writer always replaces them.
+    """
+
+    __slots__ = ('version', 'positions', 'config', 'recent_trades')
+
+    def __init__(self, version=0, positions=None, config=None, recent_trades=()):
+        self.version = version
+        self.positions = MappingProxyType(dict(positions or {}))
+        self.config = MappingProxyType(dict(config or {}))
+        self.recent_trades = tuple(recent_trades)
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        values['version'] = self.version + 1
+        return StateSnapshot(**values)
+
+
+class StateEngine:
+    """Single writer for positions, config and recent trades.
+
+    Every change runs as a command on one writer thread, in submission order.
+    Each change publishes a new StateSnapshot by swapping a single reference,
+    so readers on any thread just take `snapshot` and never lock or see a
+    half-applied change. Commands should only change state and journal it:
+    anything slow, such as an order round-trip, belongs before the command,
+    since every other command waits behind the one running.
+    """
+
+    def __init__(self, positions=None, config=None, recent_trades=(), recent_limit=1000, name='state-writer'):
+        self.recent_limit = recent_limit
+        self._snapshot = StateSnapshot(0, positions, config, tuple(recent_trades)[-recent_limit:])
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def in_writer(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the writer; returns a Future of its result"""
+        future = Future()
+        self._queue.put((fn, args, kwargs, future, time.perf_counter()))
+        return future
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """Run fn on the writer and wait for its result; runs inline when already on the writer"""
+        if self.in_writer:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+
+    # State changes; only valid on the writer thread (from inside a command)
+
+    def set_position(self, symbol, position):
+        positions = dict(self._writable().positions)
+        if position is None:
+            positions.pop(symbol, None)
+        else:
+            positions[symbol] = position
+        self._publish(positions=MappingProxyType(positions))
+
+    def set_config(self, config):
+        self._publish(config=MappingProxyType(dict(self._writable().config, **config)))
+
+    def add_trade(self, trade):
+        self._publish(recent_trades=(self._writable().recent_trades + (trade,))[-self.recent_limit:])
+
+    def reset(self, positions=None, config=None, recent_trades=()):
+        self._writable()
+        self._publish(positions=MappingProxyType(dict(positions or {})),
+                      config=MappingProxyType(dict(config or {})),
+                      recent_trades=tuple(recent_trades)[-self.recent_limit:])
+
+    def _writable(self):
+        if not self.in_writer:
+            raise RuntimeError("Bot state can only be changed by its writer thread; go through StateEngine.call")
+        return self._snapshot
+
+    def _publish(self, **changes):
+        self._snapshot = self._snapshot.replace(**changes)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, future, queued_at = item
+            observe('state_command_wait_seconds', time.perf_counter() - queued_at,
+                    'Time a state command waited for the writer thread')
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+def command(method):
+    """Make a method of an object with an `engine` run as a StateEngine command"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.engine.call(method, self, *args, **kwargs)
+    return wrapper
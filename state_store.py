@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from trade_stats import TradeStatistics
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+class JournalFile:
+    """Append-only JSON lines file with a configurable fsync policy"""
+
+    def __init__(self, path, fsync='batch', fsync_interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._file = None
+
+    def open(self):
+        """Drop a torn trailing line left by a crash, then open for appending"""
+        if os.path.exists(self.path):
+            with open(self.path, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                end = size
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                if end != size:
+                    logger.warning(f"Discarding incomplete record at the end of {self.path}")
+                    f.truncate(end)
+        self._file = open(self.path, 'ab')
+
+    @property
+    def size(self):
+        with self._lock:
+            self._file.flush()
+            return self._file.tell()
+
+    def append(self, record):
+        line = json.dumps(record, separators=(',', ':')).encode() + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync == 'always':
+                os.fsync(self._file.fileno())
+            elif self.fsync == 'batch':
+                self._dirty = True
+                if self._timer is None:
+                    self._timer = threading.Timer(self.fsync_interval, self.sync)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def sync(self):
+        with self._lock:
+            self._timer = None
+            if self._dirty and self._file:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def truncate(self):
+        with self._lock:
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+
+    def read(self, offset=0):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable record in {self.path}")
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+        self.sync()
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class StateStore:
+    """Durable bot state: an append-only trade journal plus snapshot + event log for positions and config.
+
+    Every trade is one appended line in trades.jsonl and is never rewritten, so
+    history is unbounded; running statistics over it are kept in `stats` and
+    saved with each snapshot. Position and config changes are appended to
+    events.jsonl as absolute values. Compaction writes snapshot.json atomically
+    (temp file + rename) and then empties the event log. Replaying events on top
+    of the snapshot is idempotent, so a crash between those two steps is harmless.
+    """
+
+    def __init__(self, directory=None, fsync=None, fsync_interval=1.0, compact_every=1000, recent_trades=1000):
+        self.directory = directory or os.getenv('STATE_DIR', 'data/state')
+        self.compact_every = compact_every
+        self.recent_trades_limit = recent_trades
+        fsync = fsync or os.getenv('STATE_FSYNC', 'batch')
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.snapshot_path = os.path.join(self.directory, 'snapshot.json')
+        self.trades = JournalFile(os.path.join(self.directory, 'trades.jsonl'), fsync, fsync_interval)
+        self.events = JournalFile(os.path.join(self.directory, 'events.jsonl'), fsync, fsync_interval)
+
+        self.positions = {}
+        self.config = {}
+        self.recent_trades = deque(maxlen=recent_trades)
+        self.trade_count = 0
+        self.stats = TradeStatistics()
+        self._events_since_snapshot = 0
+        self._lock = threading.RLock()
+
+    @property
+    def is_empty(self):
+        return not os.path.exists(self.snapshot_path) and not os.path.exists(self.trades.path)
+
+    def load(self, legacy_path=None):
+        """Rebuild state from the snapshot, the event log and trades appended since the snapshot.
+
+        On first use, an old single-file bot_state.json at legacy_path is imported.
+        """
+        with self._lock:
+            import_legacy = legacy_path and self.is_empty and os.path.exists(legacy_path)
+            trades_offset = 0
+            stats_in_snapshot = False
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r') as f:
+                    snapshot = json.load(f)
+                self.positions = snapshot.get('positions', {})
+                self.config = snapshot.get('config', {})
+                self.recent_trades.extend(snapshot.get('recent_trades', []))
+                self.trade_count = snapshot.get('trade_count', len(self.recent_trades))
+                trades_offset = snapshot.get('trades_offset', 0)
+                if 'stats' in snapshot:
+                    self.stats = TradeStatistics.from_dict(snapshot['stats'])
+                    stats_in_snapshot = True
+
+            self.trades.open()
+            self.events.open()
+
+            for event in self.events.read():
+                self._apply(event)
+                self._events_since_snapshot += 1
+            if not stats_in_snapshot and trades_offset:
+                # Snapshot predates statistics; rebuild them from the whole journal once
+                for trade in self.trades.read():
+                    self.stats.add(trade)
+            for trade in self.trades.read(trades_offset):
+                self.recent_trades.append(trade)
+                self.trade_count += 1
+                if stats_in_snapshot or not trades_offset:
+                    self.stats.add(trade)
+
+            if import_legacy:
+                self._import_legacy(legacy_path)
+
+            return {
+                'positions': dict(self.positions),
+                'config': dict(self.config),
+                'recent_trades': list(self.recent_trades)
+            }
+
+    def append_trade(self, trade):
+        with self._lock:
+            self.trades.append(trade)
+            self.recent_trades.append(trade)
+            self.trade_count += 1
+            self.stats.add(trade)
+            self._after_event()
+
+    def set_position(self, symbol, position):
+        self._record({'type': 'position', 'symbol': symbol, 'position': position})
+
+    def set_config(self, config):
+        self._record({'type': 'config', 'config': config})
+
+    def iter_trades(self):
+        """Every trade ever recorded, oldest first"""
+        self.trades.sync()
+        return self.trades.read()
+
+    def compact(self):
+        with self._lock:
+            snapshot = {
+                'positions': self.positions,
+                'config': self.config,
+                'recent_trades': list(self.recent_trades),
+                'trade_count': self.trade_count,
+                'trades_offset': self.trades.size,
+                'stats': self.stats.to_dict(),
+                'saved_at': time.time()
+            }
+            self.trades.sync()
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self.events.truncate()
+            self._events_since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            self.trades.close()
+            self.events.close()
+
+    def _import_legacy(self, path):
+        with open(path, 'r') as f:
+            state = json.load(f)
+        with self._lock:
+            for trade in state.get('trades_history', []):
+                self.trades.append(trade)
+                self.recent_trades.append(trade)
+                self.trade_count += 1
+                self.stats.add(trade)
+            self.positions = dict(state.get('positions', {}))
+            self.compact()
+        logger.info(f"Imported {path} into {self.directory}")
+
+    def _record(self, event):
+        with self._lock:
+            self.events.append(event)
+            self._apply(event)
+            self._after_event()
+
+    def _apply(self, event):
+        if event['type'] == 'position':
+            if event['position'] is None:
+                self.positions.pop(event['symbol'], None)
+            else:
+                self.positions[event['symbol']] = dict(event['position'])
+        elif event['type'] == 'config':
+            self.config = dict(event['config'])
+
+    def _after_event(self):
+        self._events_since_snapshot += 1
+        if self._events_since_snapshot >= self.compact_every:
+            self.compact()
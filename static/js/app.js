@@ -1,4 +1,5 @@
 let updateInterval = null;
+let liveSource = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     const startBtn = document.getElementById('start-btn');
@@ -11,9 +12,39 @@ document.addEventListener('DOMContentLoaded', function() {
     
     loadSymbols();
     updateStatus();
-    setInterval(updateStatus, 5000);
+    connectLiveUpdates();
 });
 
+function connectLiveUpdates() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    liveSource = new EventSource('/api/stream');
+    liveSource.addEventListener('status', event => renderStatus(JSON.parse(event.data)));
+    liveSource.addEventListener('trade', event => {
+        const trade = JSON.parse(event.data);
+        showNotification(`${trade.action} ${trade.symbol} at $${trade.price.toFixed(2)}`, 'success');
+    });
+    liveSource.onopen = stopPolling;
+    // EventSource reconnects on its own; poll in the meantime so the page keeps updating
+    liveSource.onerror = startPolling;
+}
+
+function startPolling() {
+    if (!updateInterval) {
+        updateInterval = setInterval(updateStatus, 5000);
+    }
+}
+
+function stopPolling() {
+    if (updateInterval) {
+        clearInterval(updateInterval);
+        updateInterval = null;
+    }
+}
+
 async function startBot() {
     const strategy = document.getElementById('strategy').value;
     const symbol = document.getElementById('symbol').value;
@@ -73,36 +104,37 @@ async function stopBot() {
 async function updateStatus() {
     try {
         const response = await fetch('/api/status');
-        const data = await response.json();
-        
-        const statusText = document.getElementById('status-text');
-        const statusDot = document.getElementById('status-dot');
-        
-        if (data.is_running) {
-            statusText.textContent = data.test_mode ? 'Running (Test Mode)' : 'Running (Live)';
-            statusDot.className = 'online';
-            document.getElementById('start-btn').disabled = true;
-            document.getElementById('stop-btn').disabled = false;
-        } else {
-            statusText.textContent = 'Offline';
-            statusDot.className = 'offline';
-            document.getElementById('start-btn').disabled = false;
-            document.getElementById('stop-btn').disabled = true;
-        }
-        
-        if (data.usdt_balance !== undefined) {
-            document.getElementById('usdt-balance').textContent = data.usdt_balance.toFixed(2);
-            document.getElementById('total-value').textContent = data.total_value.toFixed(2);
-        }
-        
-        updatePositions(data.positions || []);
-        updateTrades(data.recent_trades || []);
-        
+        renderStatus(await response.json());
     } catch (error) {
         console.error('Error updating status:', error);
     }
 }
 
+function renderStatus(data) {
+    const statusText = document.getElementById('status-text');
+    const statusDot = document.getElementById('status-dot');
+    
+    if (data.is_running) {
+        statusText.textContent = data.test_mode ? 'Running (Test Mode)' : 'Running (Live)';
+        statusDot.className = 'online';
+        document.getElementById('start-btn').disabled = true;
+        document.getElementById('stop-btn').disabled = false;
+    } else {
+        statusText.textContent = 'Offline';
+        statusDot.className = 'offline';
+        document.getElementById('start-btn').disabled = false;
+        document.getElementById('stop-btn').disabled = true;
+    }
+    
+    if (data.usdt_balance !== undefined) {
+        document.getElementById('usdt-balance').textContent = data.usdt_balance.toFixed(2);
+        document.getElementById('total-value').textContent = data.total_value.toFixed(2);
+    }
+    
+    updatePositions(data.positions || []);
+    updateTrades(data.recent_trades || []);
+}
+
 function updatePositions(positions) {
     const tbody = document.getElementById('positions-body');
     
@@ -1,18 +1,15 @@
 let profitChart = null;
 let winLossChart = null;
 let currentEditSymbol = null;
+let updateInterval = null;
+let liveSource = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeCharts();
     loadStatistics();
     loadPositions();
     loadSymbols();
-    
-    // Update data every 5 seconds
-    setInterval(() => {
-        loadStatistics();
-        loadPositions();
-    }, 5000);
+    connectLiveUpdates();
     
     // Modal handlers
     document.getElementById('add-position-btn').addEventListener('click', openAddModal);
@@ -28,6 +25,36 @@ document.addEventListener('DOMContentLoaded', function() {
     };
 });
 
+function connectLiveUpdates() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    liveSource = new EventSource('/api/stream');
+    liveSource.addEventListener('statistics', event => renderStatistics(JSON.parse(event.data)));
+    liveSource.addEventListener('positions', event => renderPositions(JSON.parse(event.data).positions));
+    liveSource.onopen = stopPolling;
+    // EventSource reconnects on its own; poll in the meantime so the page keeps updating
+    liveSource.onerror = startPolling;
+}
+
+function startPolling() {
+    if (!updateInterval) {
+        updateInterval = setInterval(() => {
+            loadStatistics();
+            loadPositions();
+        }, 5000);
+    }
+}
+
+function stopPolling() {
+    if (updateInterval) {
+        clearInterval(updateInterval);
+        updateInterval = null;
+    }
+}
+
 function initializeCharts() {
     // Profit/Loss Chart
     const profitCtx = document.getElementById('profitChart').getContext('2d');
@@ -107,69 +134,72 @@ function initializeCharts() {
 async function loadStatistics() {
     try {
         const response = await fetch('/api/statistics');
-        const stats = await response.json();
-        
-        // Update statistics
-        document.getElementById('total-trades').textContent = stats.total_trades;
-        document.getElementById('win-rate').textContent = stats.win_rate.toFixed(1) + '%';
-        document.getElementById('total-profit').textContent = '$' + stats.total_profit.toFixed(2);
-        document.getElementById('active-positions').textContent = stats.active_positions;
-        
-        document.getElementById('best-trade').textContent = '$' + stats.best_trade.toFixed(2);
-        document.getElementById('worst-trade').textContent = '$' + stats.worst_trade.toFixed(2);
-        document.getElementById('avg-profit').textContent = '$' + stats.average_profit.toFixed(2);
-        document.getElementById('total-volume').textContent = '$' + stats.total_volume.toFixed(2);
-        
-        // Update win/loss chart
-        winLossChart.data.datasets[0].data = [stats.winning_trades, stats.losing_trades];
-        winLossChart.update();
-        
-        // Update profit chart (would need trade history endpoint for real data)
-        updateProfitChart();
-        
+        renderStatistics(await response.json());
     } catch (error) {
         console.error('Error loading statistics:', error);
     }
 }
 
+function renderStatistics(stats) {
+    // Update statistics
+    document.getElementById('total-trades').textContent = stats.total_trades;
+    document.getElementById('win-rate').textContent = stats.win_rate.toFixed(1) + '%';
+    document.getElementById('total-profit').textContent = '$' + stats.total_profit.toFixed(2);
+    document.getElementById('active-positions').textContent = stats.active_positions;
+    
+    document.getElementById('best-trade').textContent = '$' + stats.best_trade.toFixed(2);
+    document.getElementById('worst-trade').textContent = '$' + stats.worst_trade.toFixed(2);
+    document.getElementById('avg-profit').textContent = '$' + stats.average_profit.toFixed(2);
+    document.getElementById('total-volume').textContent = '$' + stats.total_volume.toFixed(2);
+    
+    // Update win/loss chart
+    winLossChart.data.datasets[0].data = [stats.winning_trades, stats.losing_trades];
+    winLossChart.update();
+    
+    // Update profit chart (would need trade history endpoint for real data)
+    updateProfitChart();
+}
+
 async function loadPositions() {
     try {
         const response = await fetch('/api/positions');
         const data = await response.json();
-        
-        const tbody = document.getElementById('positions-mgmt-body');
-        
-        if (data.positions.length === 0) {
-            tbody.innerHTML = '<tr><td colspan="8" class="no-data">No open positions</td></tr>';
-            return;
-        }
-        
-        tbody.innerHTML = data.positions.map(position => {
-            const pnlClass = position.pnl >= 0 ? 'profit-positive' : 'profit-negative';
-            return `
-                <tr>
-                    <td>${position.symbol}</td>
-                    <td>${position.quantity.toFixed(6)}</td>
-                    <td>$${position.entry_price.toFixed(2)}</td>
-                    <td>$${position.current_price.toFixed(2)}</td>
-                    <td class="${pnlClass}">$${position.pnl.toFixed(2)} (${position.pnl_percentage.toFixed(2)}%)</td>
-                    <td>$${position.stop_loss.toFixed(2)}</td>
-                    <td>$${position.take_profit.toFixed(2)}</td>
-                    <td>
-                        <div class="position-actions">
-                            <button class="btn-small btn-edit" onclick="editPosition('${position.symbol}', ${position.stop_loss}, ${position.take_profit})">Edit</button>
-                            <button class="btn-small btn-close" onclick="closePosition('${position.symbol}')">Close</button>
-                        </div>
-                    </td>
-                </tr>
-            `;
-        }).join('');
-        
+        renderPositions(data.positions);
     } catch (error) {
         console.error('Error loading positions:', error);
     }
 }
 
+function renderPositions(positions) {
+    const tbody = document.getElementById('positions-mgmt-body');
+    
+    if (positions.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="8" class="no-data">No open positions</td></tr>';
+        return;
+    }
+    
+    tbody.innerHTML = positions.map(position => {
+        const pnlClass = position.pnl >= 0 ? 'profit-positive' : 'profit-negative';
+        return `
+            <tr>
+                <td>${position.symbol}</td>
+                <td>${position.quantity.toFixed(6)}</td>
+                <td>$${position.entry_price.toFixed(2)}</td>
+                <td>$${position.current_price.toFixed(2)}</td>
+                <td class="${pnlClass}">$${position.pnl.toFixed(2)} (${position.pnl_percentage.toFixed(2)}%)</td>
+                <td>$${position.stop_loss.toFixed(2)}</td>
+                <td>$${position.take_profit.toFixed(2)}</td>
+                <td>
+                    <div class="position-actions">
+                        <button class="btn-small btn-edit" onclick="editPosition('${position.symbol}', ${position.stop_loss}, ${position.take_profit})">Edit</button>
+                        <button class="btn-small btn-close" onclick="closePosition('${position.symbol}')">Close</button>
+                    </div>
+                </td>
+            </tr>
+        `;
+    }).join('');
+}
+
 async function loadSymbols() {
     try {
         const response = await fetch('/api/symbols');
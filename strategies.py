@@ -1,19 +1,68 @@
-import pandas as pd
 import numpy as np
-from ta.trend import SMAIndicator, EMAIndicator
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
+from candles import Candles
+from indicators import SMA, WilderRSI, BollingerBands, IndicatorState, sma_series, rsi_series, rsi_last, bollinger_series
+from metrics import timed
 import logging
 
 logger = logging.getLogger(__name__)
 
+HOLD, BUY, SELL = 0, 1, -1
+SIGNAL_NAMES = {HOLD: 'HOLD', BUY: 'BUY', SELL: 'SELL'}
+
 
 class TradingStrategy:
+    # Higher intervals whose candles analyze_timeframes() also looks at
+    timeframes = ()
+    
     def __init__(self, name):
         self.name = name
+        self._states = {}
         
-    def analyze(self, klines):
-        raise NotImplementedError("Strategy must implement analyze method")
+    @timed('strategy_analyze_seconds', 'Strategy evaluation latency via analyze()')
+    def analyze(self, klines, key=None):
+        return self.analyze_candles(Candles.from_klines(klines), key)
+    
+    def analyze_candles(self, candles, key=None):
+        raise NotImplementedError("Strategy must implement analyze_candles method")
+    
+    def analyze_timeframes(self, candles, higher, key=None):
+        """Like analyze_candles, with {interval: Candles} of the strategy's higher timeframes available"""
+        return self.analyze_candles(candles, key)
+    
+    def signal_series(self, candles):
+        """Signal codes (BUY/SELL/HOLD) and confidences for every bar of candles in one pass"""
+        raise NotImplementedError("Strategy must implement signal_series method")
+    
+    def analyze_batch(self, close, high=None, low=None):
+        """Signal codes and confidences at the last bar for every row of a (symbols x candles) matrix.
+        
+        Rows with less history are left-padded with NaN. Each row gets the
+        result analyze_candles would give for it without a key.
+        """
+        raise NotImplementedError("Strategy must implement analyze_batch method")
+    
+    def create_indicators(self):
+        return []
+    
+    def reset(self, key=None):
+        if key is None:
+            self._states.clear()
+        else:
+            self._states.pop(key, None)
+    
+    def _sync_indicators(self, candles, key=None):
+        """Feed the closed candles (all but the last one) not yet seen for key into its indicators"""
+        open_times = candles.open_time[:-1]
+        
+        state = self._states.get(key) if key is not None else None
+        if state is None or not state.continues(open_times):
+            state = IndicatorState(self.create_indicators())
+            if key is not None:
+                self._states[key] = state
+        
+        start = state.first_new(open_times)
+        state.feed(open_times[start:], candles.close[start:-1].tolist())
+        return state.indicators
 
 
 class SimpleMAStrategy(TradingStrategy):
@@ -22,21 +71,43 @@ class SimpleMAStrategy(TradingStrategy):
         self.short_period = short_period
         self.long_period = long_period
     
-    def analyze(self, klines):
-        if len(klines) < self.long_period:
-            return 'HOLD', 0.0
+    def create_indicators(self):
+        return [SMA(self.short_period), SMA(self.long_period)]
+    
+    def signal_series(self, candles):
+        close = candles.close
+        sma_short = sma_series(close, self.short_period)
+        sma_long = sma_series(close, self.long_period)
+        
+        with np.errstate(invalid='ignore'):
+            buy = (sma_short > sma_long) & (close > sma_short)
+            sell = (sma_short < sma_long) & (close < sma_short)
+            spread = np.minimum(np.abs(sma_short - sma_long) / sma_long * 100, 100)
+        
+        return _to_series(buy, sell, spread, spread)
+    
+    def analyze_batch(self, close, high=None, low=None):
+        close = _as_matrix(close)
+        current_price = close[:, -1]
+        sma_short = close[:, -self.short_period:].mean(axis=1)
+        sma_long = close[:, -self.long_period:].mean(axis=1) if close.shape[1] >= self.long_period else np.full(len(close), np.nan)
         
-        df = self._klines_to_df(klines)
+        with np.errstate(invalid='ignore'):
+            buy = (sma_short > sma_long) & (current_price > sma_short)
+            sell = (sma_short < sma_long) & (current_price < sma_short)
+            spread = np.minimum(np.abs(sma_short - sma_long) / sma_long * 100, 100)
         
-        sma_short = SMAIndicator(close=df['close'], window=self.short_period)
-        sma_long = SMAIndicator(close=df['close'], window=self.long_period)
+        return _to_series(buy, sell, spread, spread)
+    
+    def analyze_candles(self, candles, key=None):
+        if len(candles) < self.long_period:
+            return 'HOLD', 0.0
         
-        df['sma_short'] = sma_short.sma_indicator()
-        df['sma_long'] = sma_long.sma_indicator()
+        sma_short, sma_long = self._sync_indicators(candles, key)
         
-        current_price = df['close'].iloc[-1]
-        sma_short_value = df['sma_short'].iloc[-1]
-        sma_long_value = df['sma_long'].iloc[-1]
+        current_price = float(candles.close[-1])
+        sma_short_value = sma_short.peek(current_price)
+        sma_long_value = sma_long.peek(current_price)
         
         if sma_short_value > sma_long_value and current_price > sma_short_value:
             signal = 'BUY'
@@ -49,21 +120,6 @@ class SimpleMAStrategy(TradingStrategy):
             confidence = 0.0
         
         return signal, confidence
-    
-    def _klines_to_df(self, klines):
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-        ])
-        
-        df['close'] = pd.to_numeric(df['close'])
-        df['high'] = pd.to_numeric(df['high'])
-        df['low'] = pd.to_numeric(df['low'])
-        df['open'] = pd.to_numeric(df['open'])
-        df['volume'] = pd.to_numeric(df['volume'])
-        
-        return df
 
 
 class RSIStrategy(TradingStrategy):
@@ -73,16 +129,45 @@ class RSIStrategy(TradingStrategy):
         self.oversold = oversold
         self.overbought = overbought
     
-    def analyze(self, klines):
-        if len(klines) < self.period + 1:
-            return 'HOLD', 0.0
+    def create_indicators(self):
+        return [WilderRSI(self.period)]
+    
+    def signal_series(self, candles):
+        rsi = rsi_series(candles.close, self.period)
+        rsi[:self.period] = np.nan
         
-        df = self._klines_to_df(klines)
+        with np.errstate(invalid='ignore'):
+            buy = rsi < self.oversold
+            sell = rsi > self.overbought
         
-        rsi = RSIIndicator(close=df['close'], window=self.period)
-        df['rsi'] = rsi.rsi()
+        return _to_series(
+            buy, sell,
+            (self.oversold - rsi) / self.oversold * 100,
+            (rsi - self.overbought) / (100 - self.overbought) * 100
+        )
+    
+    def analyze_batch(self, close, high=None, low=None):
+        close = _as_matrix(close)
+        rsi = rsi_last(close, self.period)
+        rsi[np.isfinite(close).sum(axis=1) < self.period + 1] = np.nan
         
-        current_rsi = df['rsi'].iloc[-1]
+        with np.errstate(invalid='ignore'):
+            buy = rsi < self.oversold
+            sell = rsi > self.overbought
+        
+        return _to_series(
+            buy, sell,
+            (self.oversold - rsi) / self.oversold * 100,
+            (rsi - self.overbought) / (100 - self.overbought) * 100
+        )
+    
+    def analyze_candles(self, candles, key=None):
+        if len(candles) < self.period + 1:
+            return 'HOLD', 0.0
+        
+        rsi, = self._sync_indicators(candles, key)
+        
+        current_rsi = rsi.peek(float(candles.close[-1]))
         
         if current_rsi < self.oversold:
             signal = 'BUY'
@@ -95,16 +180,6 @@ class RSIStrategy(TradingStrategy):
             confidence = 0.0
         
         return signal, confidence
-    
-    def _klines_to_df(self, klines):
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-        ])
-        
-        df['close'] = pd.to_numeric(df['close'])
-        return df
 
 
 class BollingerBandsStrategy(TradingStrategy):
@@ -113,26 +188,54 @@ class BollingerBandsStrategy(TradingStrategy):
         self.period = period
         self.std_dev = std_dev
     
-    def analyze(self, klines):
-        if len(klines) < self.period:
-            return 'HOLD', 0.0
+    def create_indicators(self):
+        return [BollingerBands(self.period, self.std_dev)]
+    
+    def signal_series(self, candles):
+        close = candles.close
+        upper_band, middle_band, lower_band = bollinger_series(close, self.period, self.std_dev)
+        return self._band_signals(close, upper_band, lower_band)
+    
+    def _band_signals(self, close, upper_band, lower_band):
+        band_width = upper_band - lower_band
         
-        df = self._klines_to_df(klines)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            valid = band_width > 0
+            buy = valid & (close <= lower_band)
+            sell = valid & (close >= upper_band)
+            buy_confidence = np.minimum((lower_band - close) / band_width * 100, 100)
+            sell_confidence = np.minimum((close - upper_band) / band_width * 100, 100)
         
-        bb = BollingerBands(close=df['close'], window=self.period, window_dev=self.std_dev)
+        return _to_series(buy, sell, buy_confidence, sell_confidence)
+    
+    def analyze_batch(self, close, high=None, low=None):
+        close = _as_matrix(close)
+        current_price = close[:, -1]
+        if close.shape[1] < self.period:
+            return _to_series(np.zeros(len(close), bool), np.zeros(len(close), bool), 0.0, 0.0)
         
-        df['bb_upper'] = bb.bollinger_hband()
-        df['bb_middle'] = bb.bollinger_mavg()
-        df['bb_lower'] = bb.bollinger_lband()
+        window = close[:, -self.period:]
+        middle_band = window.mean(axis=1)
+        std = window.std(axis=1)
+        upper_band = middle_band + self.std_dev * std
+        lower_band = middle_band - self.std_dev * std
+        return self._band_signals(current_price, upper_band, lower_band)
+    
+    def analyze_candles(self, candles, key=None):
+        if len(candles) < self.period:
+            return 'HOLD', 0.0
+        
+        bb, = self._sync_indicators(candles, key)
         
-        current_price = df['close'].iloc[-1]
-        upper_band = df['bb_upper'].iloc[-1]
-        lower_band = df['bb_lower'].iloc[-1]
-        middle_band = df['bb_middle'].iloc[-1]
+        current_price = float(candles.close[-1])
+        upper_band, middle_band, lower_band = bb.peek(current_price)
         
         band_width = upper_band - lower_band
         
-        if current_price <= lower_band:
+        if band_width <= 0:
+            signal = 'HOLD'
+            confidence = 0.0
+        elif current_price <= lower_band:
             signal = 'BUY'
             confidence = min((lower_band - current_price) / band_width * 100, 100)
         elif current_price >= upper_band:
@@ -143,33 +246,42 @@ class BollingerBandsStrategy(TradingStrategy):
             confidence = 0.0
         
         return signal, confidence
-    
-    def _klines_to_df(self, klines):
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-        ])
-        
-        df['close'] = pd.to_numeric(df['close'])
-        return df
 
 
 class CombinedStrategy(TradingStrategy):
-    def __init__(self):
+    """Majority vote of SMA, RSI and Bollinger Bands.
+    
+    With timeframes (e.g. ['1h', '4h']) a signal must also survive the same vote
+    on each higher timeframe: an opposing one turns it into HOLD, and agreeing
+    ones are averaged into its confidence. signal_series and analyze_batch, used
+    by backtests and screening, only vote on the interval they are given.
+    """
+    
+    def __init__(self, sma_params=None, rsi_params=None, bollinger_params=None, timeframes=None):
         super().__init__("Combined Strategy")
         self.strategies = [
-            SimpleMAStrategy(),
-            RSIStrategy(),
-            BollingerBandsStrategy()
+            SimpleMAStrategy(**(sma_params or {})),
+            RSIStrategy(**(rsi_params or {})),
+            BollingerBandsStrategy(**(bollinger_params or {}))
         ]
+        self.timeframes = tuple(timeframes or ())
+    
+    def reset(self, key=None):
+        for strategy in self.strategies:
+            strategy.reset(key)
+    
+    def signal_series(self, candles):
+        return _vote([strategy.signal_series(candles) for strategy in self.strategies])
+    
+    def analyze_batch(self, close, high=None, low=None):
+        return _vote([strategy.analyze_batch(close, high, low) for strategy in self.strategies])
     
-    def analyze(self, klines):
+    def analyze_candles(self, candles, key=None):
         signals = []
         confidences = []
         
         for strategy in self.strategies:
-            signal, confidence = strategy.analyze(klines)
+            signal, confidence = strategy.analyze_candles(candles, key)
             signals.append(signal)
             confidences.append(confidence)
         
@@ -186,4 +298,64 @@ class CombinedStrategy(TradingStrategy):
             final_signal = 'HOLD'
             final_confidence = 0.0
         
-        return final_signal, final_confidence
\ No newline at end of file
+        return final_signal, final_confidence
+    
+    def analyze_timeframes(self, candles, higher, key=None):
+        signal, confidence = self.analyze_candles(candles, key)
+        if signal == 'HOLD':
+            return signal, confidence
+        
+        opposite = 'SELL' if signal == 'BUY' else 'BUY'
+        confidences = [confidence]
+        for interval, interval_candles in higher.items():
+            if interval_candles is None or not len(interval_candles):
+                continue
+            higher_signal, higher_confidence = self.analyze_candles(
+                interval_candles, (key, interval) if key is not None else None)
+            if higher_signal == opposite:
+                return 'HOLD', 0.0
+            if higher_signal == signal:
+                confidences.append(higher_confidence)
+        return signal, float(np.mean(confidences))
+
+
+STRATEGIES = {
+    'sma': SimpleMAStrategy,
+    'rsi': RSIStrategy,
+    'bollinger': BollingerBandsStrategy,
+    'combined': CombinedStrategy
+}
+
+
+def create_strategy(name, **params):
+    return STRATEGIES.get(name, CombinedStrategy)(**params)
+
+
+def _vote(series):
+    """Majority vote of (signals, confidences) pairs: at least two agreeing strategies, ahead of the other side"""
+    signals = np.vstack([s for s, _ in series])
+    confidences = np.vstack([c for _, c in series])
+    
+    buy_votes = signals == BUY
+    sell_votes = signals == SELL
+    buy_count = buy_votes.sum(axis=0)
+    sell_count = sell_votes.sum(axis=0)
+    
+    buy = (buy_count > sell_count) & (buy_count >= 2)
+    sell = (sell_count > buy_count) & (sell_count >= 2)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        buy_confidence = (confidences * buy_votes).sum(axis=0) / buy_count
+        sell_confidence = (confidences * sell_votes).sum(axis=0) / sell_count
+    
+    return _to_series(buy, sell, buy_confidence, sell_confidence)
+
+
+def _as_matrix(values):
+    return np.atleast_2d(np.asarray(values, dtype=np.float64))
+
+
+def _to_series(buy, sell, buy_confidence, sell_confidence):
+    signals = np.where(buy, BUY, np.where(sell, SELL, HOLD)).astype(np.int8)
+    confidences = np.where(buy, buy_confidence, np.where(sell, sell_confidence, 0.0))
+    return signals, confidences
\ No newline at end of file
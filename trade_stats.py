@@ -0,0 +1,169 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+WINDOWS = {'24h': 86400, '7d': 7 * 86400}
+BUCKET_SECONDS = 3600
+
+
+class TradeTotals:
+    """Running counts and sums for a set of trades"""
+
+    __slots__ = ('trades', 'closed', 'wins', 'losses', 'profit', 'best', 'worst', 'volume')
+
+    def __init__(self):
+        self.trades = 0
+        self.closed = 0
+        self.wins = 0
+        self.losses = 0
+        self.profit = 0.0
+        self.best = None
+        self.worst = None
+        self.volume = 0.0
+
+    def add(self, trade):
+        self.trades += 1
+        self.volume += (trade.get('quantity') or 0) * (trade.get('price') or 0)
+        profit = trade.get('profit')
+        if profit is None:
+            return
+        self.closed += 1
+        self.profit += profit
+        if profit > 0:
+            self.wins += 1
+        elif profit < 0:
+            self.losses += 1
+        self.best = profit if self.best is None else max(self.best, profit)
+        self.worst = profit if self.worst is None else min(self.worst, profit)
+
+    def merge(self, other):
+        self.trades += other.trades
+        self.closed += other.closed
+        self.wins += other.wins
+        self.losses += other.losses
+        self.profit += other.profit
+        self.volume += other.volume
+        if other.best is not None:
+            self.best = other.best if self.best is None else max(self.best, other.best)
+        if other.worst is not None:
+            self.worst = other.worst if self.worst is None else min(self.worst, other.worst)
+
+    def summary(self):
+        return {
+            'total_trades': self.closed or self.trades,
+            'winning_trades': self.wins,
+            'losing_trades': self.losses,
+            'total_profit': self.profit,
+            'win_rate': self.wins / self.closed * 100 if self.closed else 0,
+            'average_profit': self.profit / self.closed if self.closed else 0,
+            'best_trade': self.best or 0,
+            'worst_trade': self.worst or 0,
+            'total_volume': self.volume
+        }
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        totals = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(totals, name, data[name])
+        return totals
+
+
+class TradeStatistics:
+    """Trade statistics updated one trade at a time.
+
+    Overall, per-symbol and per-strategy totals are plain running sums. The
+    24h/7d windows are built from hourly buckets covering the longest window,
+    so they are accurate to the hour and reading them costs at most 168
+    bucket merges whatever the length of the trade history.
+    """
+
+    def __init__(self):
+        self.totals = TradeTotals()
+        self.by_symbol = {}
+        self.by_strategy = {}
+        self.buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trade):
+        with self._lock:
+            self.totals.add(trade)
+            self.by_symbol.setdefault(trade.get('symbol'), TradeTotals()).add(trade)
+            self.by_strategy.setdefault(trade.get('strategy') or 'unknown', TradeTotals()).add(trade)
+
+            now = time.time()
+            bucket = int(_trade_time(trade) // BUCKET_SECONDS * BUCKET_SECONDS)
+            if bucket < now - max(WINDOWS.values()) - BUCKET_SECONDS:
+                return
+            if bucket not in self.buckets:
+                out_of_order = self.buckets and bucket < next(reversed(self.buckets))
+                self.buckets[bucket] = TradeTotals()
+                if out_of_order:
+                    # Replayed or imported history can arrive unordered; keep buckets sorted
+                    self.buckets = OrderedDict(sorted(self.buckets.items()))
+            self.buckets[bucket].add(trade)
+            self._expire(now)
+
+    def summary(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._expire(now)
+            statistics = self.totals.summary()
+            statistics['by_symbol'] = {s: t.summary() for s, t in self.by_symbol.items()}
+            statistics['by_strategy'] = {s: t.summary() for s, t in self.by_strategy.items()}
+            statistics['windows'] = {}
+            for name, seconds in WINDOWS.items():
+                window = TradeTotals()
+                start = now - seconds
+                for bucket in reversed(self.buckets):
+                    if bucket + BUCKET_SECONDS <= start:
+                        break
+                    window.merge(self.buckets[bucket])
+                statistics['windows'][name] = window.summary()
+            return statistics
+
+    def merge(self, other):
+        """Add the trades counted by other, e.g. another process's statistics"""
+        with self._lock:
+            self.totals.merge(other.totals)
+            for mine, theirs in ((self.by_symbol, other.by_symbol), (self.by_strategy, other.by_strategy)):
+                for key, totals in theirs.items():
+                    mine.setdefault(key, TradeTotals()).merge(totals)
+            for bucket, totals in other.buckets.items():
+                self.buckets.setdefault(bucket, TradeTotals()).merge(totals)
+            self.buckets = OrderedDict(sorted(self.buckets.items()))
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'totals': self.totals.to_dict(),
+                'by_symbol': {s: t.to_dict() for s, t in self.by_symbol.items()},
+                'by_strategy': {s: t.to_dict() for s, t in self.by_strategy.items()},
+                'buckets': [[bucket, t.to_dict()] for bucket, t in self.buckets.items()]
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.totals = TradeTotals.from_dict(data.get('totals', {}))
+        stats.by_symbol = {s: TradeTotals.from_dict(t) for s, t in data.get('by_symbol', {}).items()}
+        stats.by_strategy = {s: TradeTotals.from_dict(t) for s, t in data.get('by_strategy', {}).items()}
+        stats.buckets = OrderedDict((bucket, TradeTotals.from_dict(t)) for bucket, t in data.get('buckets', []))
+        return stats
+
+    def _expire(self, now):
+        oldest = now - max(WINDOWS.values()) - BUCKET_SECONDS
+        while self.buckets and next(iter(self.buckets)) < oldest:
+            self.buckets.popitem(last=False)
+
+
+def _trade_time(trade):
+    try:
+        return datetime.fromisoformat(trade['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
@@ -2,73 +2,151 @@ import time
 import logging
 from datetime import datetime
 from binance_api import BinanceAPI
-from strategies import SimpleMAStrategy, RSIStrategy, BollingerBandsStrategy, CombinedStrategy
-import json
-import os
+from async_binance_api import AsyncBinanceAPI, EventLoopThread
+from strategies import create_strategy, SIGNAL_NAMES
+from candles import Candles, stack, interval_seconds, candle_open_time
+from state_store import StateStore
+from position_monitor import PositionMonitor
+from metrics import timed, timer, observe, inc
+from state_engine import StateEngine, command
+from config import DEFAULT_CONFIG
+import threading
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
 class TradingBot:
-    def __init__(self, strategy='combined', test_mode=True):
-        self.api = BinanceAPI()
+    def __init__(self, strategy='combined', test_mode=True, strategy_params=None, state_store=None, api=None, clock=None,
+                 intrabar=False, allocator=None):
+        """api defaults to the shared BinanceAPI; pass an exchange_simulator.SimulatedExchange
+        (and its clock) to paper trade against simulated fills. With intrabar, signals are also
+        recomputed while a candle is still forming instead of once per closed candle. allocator
+        (see sharding.py) caps each entry when other processes trade from the same balance"""
+        self.api = api or BinanceAPI.shared()
+        self.clock = clock or time
+        self._async_api = None
+        self._event_loop = None
+        self.store = state_store or StateStore()
         self.test_mode = test_mode
         self.is_running = False
-        self.positions = {}
-        self.trades_history = []
-        
-        if strategy == 'sma':
-            self.strategy = SimpleMAStrategy()
-        elif strategy == 'rsi':
-            self.strategy = RSIStrategy()
-        elif strategy == 'bollinger':
-            self.strategy = BollingerBandsStrategy()
-        else:
-            self.strategy = CombinedStrategy()
+        self.listeners = []
+        self.balance_max_age = 30
+        self._balance = None
+        self.exit_retry_delay = 5
+        self.allocator = allocator
+        # Orders for one symbol are placed one at a time (see execute_trade)
+        self._order_locks = {}
+        self.intrabar = intrabar
+        self._signals = {}
+        # callable(symbol, interval) -> Candles or None, e.g. KlineStream.get_candles; REST otherwise
+        self.candle_source = None
+        self.monitor = PositionMonitor(self._protective_exit)
+        self.api.prices.add_listener(self.monitor.on_price)
         
-        self.config = {
-            'max_position_size': 0.1,
-            'stop_loss_percentage': 0.02,
-            'take_profit_percentage': 0.03,
-            'min_order_amount': 10.0
-        }
+        self.strategy = create_strategy(strategy, **(strategy_params or {}))
+        
+        # Positions, config and recent trades are only changed by the engine's writer thread:
+        # methods marked @command run there, everything else reads immutable snapshots
+        self.engine = StateEngine(config=DEFAULT_CONFIG)
         
         self.load_state()
     
+    @property
+    def positions(self):
+        return self.engine.snapshot.positions
+    
+    @property
+    def config(self):
+        return self.engine.snapshot.config
+    
+    @property
+    def trades_history(self):
+        return self.engine.snapshot.recent_trades
+    
+    @command
     def load_state(self):
-        if os.path.exists('bot_state.json'):
-            try:
-                with open('bot_state.json', 'r') as f:
-                    state = json.load(f)
-                    self.positions = state.get('positions', {})
-                    self.trades_history = state.get('trades_history', [])
-            except Exception as e:
-                logger.error(f"Error loading bot state: {e}")
+        try:
+            state = self.store.load(legacy_path='bot_state.json')
+            self.engine.reset(state['positions'], dict(self.config, **state['config']), state['recent_trades'])
+            for symbol, position in self.positions.items():
+                self._track(symbol, position)
+        except Exception as e:
+            logger.error(f"Error loading bot state: {e}")
     
     def save_state(self):
+        """Write a snapshot of positions and config and compact the event log"""
         try:
-            state = {
-                'positions': self.positions,
-                'trades_history': self.trades_history
-            }
-            with open('bot_state.json', 'w') as f:
-                json.dump(state, f, indent=2)
+            self.store.compact()
         except Exception as e:
             logger.error(f"Error saving bot state: {e}")
     
+    def add_listener(self, callback):
+        """Register callback(event, data), called on every trade and position change"""
+        self.listeners.append(callback)
+    
+    def notify(self, event, data):
+        for callback in self.listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                logger.error(f"Error in {event} listener: {e}")
+    
+    @command
+    def set_position(self, symbol, position):
+        self.engine.set_position(symbol, position)
+        if position is None:
+            self.monitor.untrack(symbol)
+        else:
+            self._track(symbol, position)
+        try:
+            self.store.set_position(symbol, position)
+        except Exception as e:
+            logger.error(f"Error persisting position for {symbol}: {e}")
+        self.notify('position', {'symbol': symbol, 'position': position})
+    
+    @command
+    def update_position(self, symbol, stop_loss=None, take_profit=None):
+        position = self.positions.get(symbol)
+        if position is None:
+            return False
+        position = dict(position)
+        if stop_loss is not None:
+            position['stop_loss'] = float(stop_loss)
+        if take_profit is not None:
+            position['take_profit'] = float(take_profit)
+        self.set_position(symbol, position)
+        return True
+    
+    @command
+    def update_config(self, changes):
+        self.engine.set_config(changes)
+        try:
+            self.store.set_config(dict(self.config))
+        except Exception as e:
+            logger.error(f"Error persisting config: {e}")
+    
     def start(self):
         self.is_running = True
+        self.api.exchange_info.start()
+        self.monitor.start(self.api.prices)
         logger.info(f"Trading bot started in {'TEST' if self.test_mode else 'LIVE'} mode")
         logger.info(f"Using strategy: {self.strategy.name}")
     
     def stop(self):
         self.is_running = False
+        self.api.exchange_info.stop()
+        self.monitor.stop()
+        self.save_state()
         logger.info("Trading bot stopped")
     
+    @timed('bot_cycle_seconds', 'run_cycle duration, REST fetch included')
     def run_cycle(self, symbol='BTCUSDT', interval='15m'):
         if not self.is_running:
             return
+        if self._has_current_signal(symbol, interval):
+            inc('signal_cache_total', help='Cycles served from the signal cache', result='skip_fetch')
+            return
         
         try:
             klines = self.api.get_klines(symbol, interval, limit=100)
@@ -76,146 +154,363 @@ class TradingBot:
                 logger.warning(f"No kline data received for {symbol}")
                 return
             
-            signal, confidence = self.strategy.analyze(klines)
-            current_price = float(klines[-1][4])
+            self.evaluate(symbol, interval, Candles.from_klines(klines))
+        
+        except Exception as e:
+            logger.error(f"Error in trading cycle: {e}")
+    
+    def run_cycles(self, pairs, limit=100):
+        """Like run_cycle for many (symbol, interval) pairs, with all klines fetched concurrently"""
+        if not self.is_running:
+            return
+        if not isinstance(self.api, BinanceAPI):
+            # The async client talks to Binance directly; a simulated or mock api is asked pair by pair
+            for symbol, interval in pairs:
+                self.run_cycle(symbol, interval)
+            return
+        
+        pairs = [(symbol, interval) for symbol, interval in pairs if not self._has_current_signal(symbol, interval)]
+        if not pairs:
+            return
+        
+        try:
+            klines = self._run_async(self.async_api.get_klines_many(pairs, limit))
+        except Exception as e:
+            logger.error(f"Error fetching klines for {len(pairs)} pairs: {e}")
+            return
+        
+        for (symbol, interval), pair_klines in klines.items():
+            if pair_klines:
+                self.evaluate(symbol, interval, Candles.from_klines(pair_klines))
+            else:
+                logger.warning(f"No kline data received for {symbol}")
+    
+    def screen(self, symbols, interval='15m', limit=100):
+        """Current {symbol: (signal, confidence)} for many symbols, from one concurrent fetch and one batched analysis"""
+        if isinstance(self.api, BinanceAPI):
+            try:
+                klines = self._run_async(self.async_api.get_klines_many([(s, interval) for s in symbols], limit))
+            except Exception as e:
+                logger.error(f"Error fetching klines for screening: {e}")
+                return {}
+        else:
+            # As in run_cycles, a simulated or mock api is asked symbol by symbol
+            klines = {}
+            for symbol in symbols:
+                try:
+                    klines[(symbol, interval)] = self.api.get_klines(symbol, interval, limit=limit)
+                except Exception as e:
+                    logger.error(f"Error fetching klines of {symbol} for screening: {e}")
+        
+        candles = {symbol: Candles.from_klines(k) for (symbol, _), k in klines.items() if k}
+        if not candles:
+            return {}
+        
+        with timer('strategy_batch_seconds', 'analyze_batch duration', strategy=self.strategy.name):
+            signals, confidences = self.strategy.analyze_batch(
+                stack(list(candles.values()), 'close', limit),
+                stack(list(candles.values()), 'high', limit),
+                stack(list(candles.values()), 'low', limit)
+            )
+        return {
+            symbol: (SIGNAL_NAMES[int(signal)], float(confidence))
+            for symbol, signal, confidence in zip(candles, signals, confidences)
+        }
+    
+    @property
+    def async_api(self):
+        """AsyncBinanceAPI sharing the REST client's weight budget, created on first use; only for a BinanceAPI"""
+        if self._async_api is None:
+            self._async_api = AsyncBinanceAPI(limiter=self.api.client.limiter)
+        return self._async_api
+    
+    def _run_async(self, coro):
+        if self._event_loop is None:
+            self._event_loop = EventLoopThread()
+        return self._event_loop.run(coro)
+    
+    def evaluate(self, symbol, interval, candles, forming=None):
+        """Run the strategy on candles for symbol/interval and act on the signal.
+        
+        forming says whether the last candle is still open; when None it is
+        worked out from its close time. A signal is only acted on the first time
+        it is computed, so candles that bring nothing new are not analyzed or
+        traded again.
+        """
+        if not self.is_running or not len(candles):
+            return
+        
+        received_at = time.perf_counter()
+        try:
+            current_price = float(candles.close[-1])
+            self.api.prices.update(symbol, current_price)
+            
+            result = self._signal(symbol, interval, candles, forming)
+            if result is None:
+                return
+            signal, confidence = result
             
             logger.info(f"{symbol} - Price: ${current_price:.2f}, Signal: {signal}, Confidence: {confidence:.2f}%")
             
+            # Stops and targets are handled by self.monitor on every price update,
+            # including the one above
             if signal != 'HOLD' and confidence > 50:
-                self.execute_trade(symbol, signal, current_price, confidence)
-            
-            self.check_positions(symbol, current_price)
+                self.execute_trade(symbol, signal, current_price, confidence, signal_time=received_at)
             
         except Exception as e:
-            logger.error(f"Error in trading cycle: {e}")
+            logger.error(f"Error evaluating {symbol} {interval}: {e}")
+    
+    def _signal(self, symbol, interval, candles, forming=None):
+        """(signal, confidence) for candles, or None if the cached signal already covers them.
+        
+        Outside intrabar mode a forming last candle is left out, so the signal is
+        computed from closed candles only and at most once per candle close. The
+        cache is keyed by (symbol, interval, strategy) and the open time of the last
+        candle analyzed (plus its close price for an intrabar candle).
+        """
+        if forming is None:
+            forming = candles.close_time[-1] >= self.clock.time() * 1000
+        if forming and not self.intrabar:
+            candles = candles[:-1]
+            if not len(candles):
+                return None
+        
+        version = (int(candles.open_time[-1]), float(candles.close[-1]) if forming and self.intrabar else None)
+        key = (symbol, interval, self.strategy.name)
+        cached = self._signals.get(key)
+        if cached is not None and cached[0] == version:
+            inc('signal_cache_total', help='Cycles served from the signal cache', result='hit')
+            return None
+        
+        higher = {tf: self.get_candles(symbol, tf) for tf in self.strategy.timeframes if tf != interval}
+        with timer('strategy_analyze_seconds', 'Strategy evaluation latency', strategy=self.strategy.name):
+            if higher:
+                signal, confidence = self.strategy.analyze_timeframes(candles, higher, key=(symbol, interval))
+            else:
+                signal, confidence = self.strategy.analyze_candles(candles, key=(symbol, interval))
+        self._signals[key] = (version, signal, confidence)
+        inc('signal_cache_total', help='Cycles served from the signal cache', result='miss')
+        return signal, confidence
+    
+    def get_candles(self, symbol, interval, limit=100):
+        """Candles from candle_source when it has them, otherwise from REST"""
+        if self.candle_source:
+            candles = self.candle_source(symbol, interval)
+            if candles is not None and len(candles):
+                return candles[-limit:]
+        return Candles.from_klines(self.api.get_klines(symbol, interval, limit=limit))
+    
+    def _has_current_signal(self, symbol, interval):
+        """Whether the cached signal already covers the latest closed candle, so fetching klines would add nothing"""
+        if self.intrabar:
+            return False
+        cached = self._signals.get((symbol, interval, self.strategy.name))
+        if cached is None:
+            return False
+        last_closed = candle_open_time(self.clock.time(), interval) - interval_seconds(interval)
+        return cached[0][0] >= last_closed * 1000
     
+    def get_signals(self):
+        """Last computed signal per (symbol, interval)"""
+        return {
+            f"{symbol}_{interval}": {'signal': signal, 'confidence': confidence, 'candle_open_time': version[0]}
+            for (symbol, interval, _), (version, signal, confidence) in list(self._signals.items())
+        }
+    
+    @command
     def create_position(self, symbol, quantity, entry_price):
         """Manually create a position"""
-        self.positions[symbol] = {
+        self.set_position(symbol, {
             'quantity': quantity,
             'entry_price': entry_price,
-            'entry_time': datetime.now().isoformat(),
+            'entry_time': self._now().isoformat(),
             'stop_loss': entry_price * (1 - self.config['stop_loss_percentage']),
             'take_profit': entry_price * (1 + self.config['take_profit_percentage'])
-        }
+        })
         self.record_trade(symbol, 'BUY', entry_price, quantity, self.test_mode)
-        self.save_state()
         logger.info(f"Manually created position: {quantity} {symbol} at ${entry_price:.2f}")
         return True
     
-    def execute_trade(self, symbol, signal, price, confidence):
-        if self.test_mode:
+    @timed('execute_trade_seconds', 'execute_trade duration, order round-trip included')
+    def execute_trade(self, symbol, signal, price, confidence, signal_time=None):
+        """signal_time (a perf_counter() value) is when the data behind the signal arrived, for latency metrics.
+        
+        The order round-trip runs on the calling thread, one order at a time per
+        symbol; only its result goes through the state engine (see _commit_fill),
+        so a slow order never holds up other commands.
+        """
+        if self.test_mode and not getattr(self.api, 'simulated', False):
             logger.info(f"TEST MODE: Would execute {signal} order for {symbol} at ${price:.2f}")
-            self.record_trade(symbol, signal, price, 0.001, self.test_mode)
+            position = self.positions.get(symbol) if signal == 'SELL' else None
+            if position is not None:
+                # Close it as a fill at price would, so a stop or target is not left behind with the position open
+                profit = (price - position['entry_price']) * position['quantity']
+                self._commit_fill(symbol, None, signal, price, position['quantity'], profit)
+            else:
+                self.record_trade(symbol, signal, price, 0.001, self.test_mode)
+            self._observe_order_latency(signal, signal_time)
             return
         
-        try:
+        with self._order_locks.setdefault(symbol, threading.Lock()):
+            try:
+                self._place(symbol, signal, price, signal_time)
+            except Exception as e:
+                logger.error(f"Error executing trade: {e}")
+    
+    def _place(self, symbol, signal, price, signal_time):
+        if signal == 'BUY' and symbol not in self.positions:
             balance = self.api.get_balance('USDT')
+            max_amount = balance * self.config['max_position_size']
+            if self.allocator:
+                max_amount = self.allocator.reserve(symbol, max_amount)
             
-            if signal == 'BUY' and symbol not in self.positions:
-                max_amount = balance * self.config['max_position_size']
-                
+            try:
                 if max_amount < self.config['min_order_amount']:
                     logger.warning(f"Insufficient balance for {symbol}. Available: ${balance:.2f}")
                     return
                 
-                symbol_info = self.api.get_symbol_info(symbol)
-                if not symbol_info:
+                sizer = self.api.get_order_sizer(symbol)
+                if not sizer:
                     return
                 
-                quantity = self.calculate_quantity(max_amount / price, symbol_info)
+                quantity = sizer.order_quantity(max_amount, price)
                 
                 if quantity > 0:
-                    order = self.api.place_order(symbol, 'BUY', quantity)
+                    order = self.api.place_order(symbol, 'BUY', sizer.format_quantity(quantity))
+                    quantity = float(quantity)
                     if order:
-                        self.positions[symbol] = {
+                        self._observe_order_latency(signal, signal_time)
+                        price = fill_price(order, price)
+                        self._commit_fill(symbol, {
                             'quantity': quantity,
                             'entry_price': price,
-                            'entry_time': datetime.now().isoformat(),
+                            'entry_time': self._now().isoformat(),
                             'stop_loss': price * (1 - self.config['stop_loss_percentage']),
                             'take_profit': price * (1 + self.config['take_profit_percentage'])
-                        }
-                        self.record_trade(symbol, signal, price, quantity, self.test_mode)
-                        self.save_state()
+                        }, signal, price, quantity)
                         logger.info(f"Bought {quantity} {symbol} at ${price:.2f}")
-            
-            elif signal == 'SELL' and symbol in self.positions:
-                position = self.positions[symbol]
-                order = self.api.place_order(symbol, 'SELL', position['quantity'])
-                if order:
-                    profit = (price - position['entry_price']) * position['quantity']
-                    del self.positions[symbol]
-                    self.record_trade(symbol, signal, price, position['quantity'], self.test_mode, profit)
-                    self.save_state()
-                    logger.info(f"Sold {position['quantity']} {symbol} at ${price:.2f}, Profit: ${profit:.2f}")
-                    
-        except Exception as e:
-            logger.error(f"Error executing trade: {e}")
-    
-    def check_positions(self, symbol, current_price):
-        if symbol not in self.positions:
-            return
-        
-        position = self.positions[symbol]
+            finally:
+                if self.allocator:
+                    self.allocator.release(symbol)
         
-        if current_price <= position['stop_loss'] or current_price >= position['take_profit']:
-            reason = 'Stop Loss' if current_price <= position['stop_loss'] else 'Take Profit'
-            logger.info(f"{reason} triggered for {symbol} at ${current_price:.2f}")
-            self.execute_trade(symbol, 'SELL', current_price, 100)
+        elif signal == 'SELL' and symbol in self.positions:
+            position = self.positions[symbol]
+            sizer = self.api.get_order_sizer(symbol)
+            quantity = sizer.format_quantity(sizer.floor_quantity(position['quantity'])) if sizer else position['quantity']
+            order = self.api.place_order(symbol, 'SELL', quantity)
+            if order:
+                self._observe_order_latency(signal, signal_time)
+                price = fill_price(order, price)
+                profit = (price - position['entry_price']) * position['quantity']
+                self._commit_fill(symbol, None, signal, price, position['quantity'], profit)
+                logger.info(f"Sold {position['quantity']} {symbol} at ${price:.2f}, Profit: ${profit:.2f}")
     
-    def calculate_quantity(self, raw_quantity, symbol_info):
-        filters = {f['filterType']: f for f in symbol_info['filters']}
-        
-        lot_size = filters.get('LOT_SIZE', {})
-        min_qty = float(lot_size.get('minQty', 0))
-        max_qty = float(lot_size.get('maxQty', 999999))
-        step_size = float(lot_size.get('stepSize', 0))
-        
-        if step_size > 0:
-            quantity = (raw_quantity // step_size) * step_size
-        else:
-            quantity = raw_quantity
+    @command
+    def _commit_fill(self, symbol, position, action, price, quantity, profit=None):
+        """Apply a filled order: the position it leaves symbol with (None once closed) and its trade"""
+        self.set_position(symbol, position)
+        self.record_trade(symbol, action, price, quantity, self.test_mode, profit)
+    
+    def _now(self):
+        return datetime.fromtimestamp(self.clock.time())
+    
+    def _observe_order_latency(self, side, signal_time):
+        if signal_time is not None:
+            observe('signal_to_order_seconds', time.perf_counter() - signal_time,
+                    'Candle data arrival to order acknowledged', side=side)
+    
+    def _track(self, symbol, position):
+        self.monitor.track(symbol, position.get('stop_loss'), position.get('take_profit'))
+    
+    @command
+    def _rearm(self, symbol, position):
+        if self.positions.get(symbol) is position:
+            self._track(symbol, position)
+    
+    def _protective_exit(self, symbol, key, reason, price):
+        """Called by the position monitor when a stop-loss or take-profit level is crossed"""
+        position = self.positions.get(symbol)
+        if position is None:
+            return
+        logger.info(f"{reason} triggered for {symbol} at ${price:.2f}")
+        self.execute_trade(symbol, 'SELL', price, 100)
         
-        return max(min_qty, min(quantity, max_qty))
+        # A failed exit leaves the position open; re-arm its levels after a pause
+        if self.positions.get(symbol) is position:
+            timer = threading.Timer(self.exit_retry_delay, self._rearm, args=(symbol, position))
+            timer.daemon = True
+            timer.start()
     
+    @command
     def record_trade(self, symbol, action, price, quantity, test_mode, profit=None):
         trade = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._now().isoformat(),
             'symbol': symbol,
             'action': action,
             'price': price,
             'quantity': quantity,
             'test_mode': test_mode,
-            'profit': profit
+            'profit': profit,
+            'strategy': self.strategy.name
         }
-        self.trades_history.append(trade)
+        # Full history lives in the trade journal, and its statistics in
+        # self.stats (updated by append_trade); the engine only keeps a recent tail
+        self.engine.add_trade(trade)
         
-        if len(self.trades_history) > 1000:
-            self.trades_history = self.trades_history[-1000:]
+        try:
+            self.store.append_trade(trade)
+        except Exception as e:
+            logger.error(f"Error persisting trade: {e}")
+        self._balance = None
+        self.notify('trade', trade)
     
-    def get_status(self):
-        total_value = 0
+    @property
+    def stats(self):
+        return self.store.stats
+    
+    def get_statistics(self):
+        statistics = self.stats.summary()
+        statistics['active_positions'] = len(self.positions)
+        return statistics
+    
+    def get_positions(self, positions=None):
+        positions = self.positions if positions is None else positions
+        prices = self.api.prices.get_many(list(positions))
         positions_data = []
         
-        for symbol, position in self.positions.items():
-            ticker = self.api.get_symbol_ticker(symbol)
-            if ticker:
-                current_price = float(ticker['price'])
-                position_value = position['quantity'] * current_price
-                total_value += position_value
-                
+        for symbol, position in positions.items():
+            current_price = prices.get(symbol)
+            if current_price is not None:
                 positions_data.append({
                     'symbol': symbol,
                     'quantity': position['quantity'],
                     'entry_price': position['entry_price'],
                     'current_price': current_price,
-                    'value': position_value,
+                    'value': position['quantity'] * current_price,
                     'pnl': (current_price - position['entry_price']) * position['quantity'],
-                    'pnl_percentage': ((current_price - position['entry_price']) / position['entry_price']) * 100
+                    'pnl_percentage': ((current_price - position['entry_price']) / position['entry_price']) * 100,
+                    'stop_loss': position.get('stop_loss', 0),
+                    'take_profit': position.get('take_profit', 0),
+                    'entry_time': position.get('entry_time', '')
                 })
         
-        usdt_balance = self.api.get_balance('USDT')
-        total_value += usdt_balance
+        return positions_data
+    
+    def get_cached_balance(self):
+        """USDT balance for display, re-read at most every balance_max_age seconds and after each trade"""
+        balance = self._balance
+        if balance is None or self.clock.time() - balance[1] > self.balance_max_age:
+            balance = (self.api.get_balance('USDT'), self.clock.time())
+            self._balance = balance
+        return balance[0]
+    
+    def get_status(self):
+        # Positions and trades from the same state version
+        snapshot = self.engine.snapshot
+        positions_data = self.get_positions(snapshot.positions)
+        
+        usdt_balance = self.get_cached_balance()
+        total_value = usdt_balance + sum(p['value'] for p in positions_data)
         
         return {
             'is_running': self.is_running,
@@ -224,5 +519,16 @@ class TradingBot:
             'usdt_balance': usdt_balance,
             'total_value': total_value,
             'positions': positions_data,
-            'recent_trades': self.trades_history[-10:]
-        }
\ No newline at end of file
+            'recent_trades': list(snapshot.recent_trades[-10:])
+        }
+
+
+def fill_price(order, default):
+    """Average fill price of an order response, or default if it does not report one"""
+    try:
+        executed = float(order.get('executedQty', 0))
+        if executed > 0:
+            return float(order['cummulativeQuoteQty']) / executed
+    except (AttributeError, KeyError, TypeError, ValueError):
+        pass
+    return default
\ No newline at end of file